@@ -9,7 +9,7 @@ from alembic import context
 from db.base import Base
 from core.config import get_settings
 # Import models so Base.metadata is populated
-from db.models import user, transaction, request, challenge  # noqa
+from db.models import user, transaction, request, challenge, shop_item, ledger_rollup, transaction_archive, media_blob, shop_reservation, challenge_completion, webhook_inbox, job  # noqa
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
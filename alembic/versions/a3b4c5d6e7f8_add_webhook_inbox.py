@@ -0,0 +1,49 @@
+"""add webhook inbox
+
+Verified webhook deliveries are stored in ``webhook_inbox`` and applied by a
+background worker instead of inside the HTTP request.
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, Sequence[str], None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webhook_inbox',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('svix_id', sa.String(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('svix_id'),
+    )
+    op.create_index('ix_webhook_inbox_pending', 'webhook_inbox', ['id'], unique=False, postgresql_where=sa.text('processed_at IS NULL'))
+    op.create_index('ix_webhook_inbox_processed_at', 'webhook_inbox', ['processed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_inbox_processed_at', table_name='webhook_inbox')
+    op.drop_index('ix_webhook_inbox_pending', table_name='webhook_inbox')
+    op.drop_table('webhook_inbox')
@@ -0,0 +1,54 @@
+"""add transactions_archive
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, Sequence[str], None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transactions_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('admin_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('recipient_id', sa.Integer(), nullable=True),
+        sa.Column('request_id', sa.Integer(), nullable=True),
+        sa.Column('shop_item_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_archive_user_id_created_at', 'transactions_archive', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_transactions_archive_created_at', 'transactions_archive', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Put archived rows back; they are already counted in the rollups
+    op.execute("ALTER TABLE transactions DISABLE TRIGGER transactions_ledger_daily_rollups")
+    op.execute("""
+        INSERT INTO transactions (id, user_id, admin_id, amount, type, description,
+                                  recipient_id, request_id, shop_item_id, created_at)
+        SELECT id, user_id, admin_id, amount, type, description,
+               recipient_id, request_id, shop_item_id, created_at
+        FROM transactions_archive
+    """)
+    op.execute("ALTER TABLE transactions ENABLE TRIGGER transactions_ledger_daily_rollups")
+    op.drop_index('ix_transactions_archive_created_at', table_name='transactions_archive')
+    op.drop_index('ix_transactions_archive_user_id_created_at', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
@@ -0,0 +1,111 @@
+"""move images to media_blobs
+
+Moves the inline base64 ``image`` columns of ``shop_items`` and ``challenges``
+into the content-addressed ``media_blobs`` table and replaces them with an
+``image_hash`` reference.
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import base64
+import binascii
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, Sequence[str], None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('shop_items', 'challenges')
+
+# A frozen copy of the upload path's type sniffing at this revision
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def _sniff_content_type(data: bytes) -> str:
+    for magic, content_type in _MAGIC:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def _decode_image(value: str) -> tuple[bytes, str]:
+    """Raw bytes and sniffed type of a base64 image; a type declared in a
+    ``data:`` URL is never trusted."""
+    if value.startswith("data:"):
+        value = value.partition(",")[2]
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Image is not valid base64") from e
+    if not data:
+        raise ValueError("Image is empty")
+    return data, _sniff_content_type(data)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+
+    bind = op.get_bind()
+    for table in TABLES:
+        op.add_column(table, sa.Column('image_hash', sa.String(length=64), nullable=True))
+        op.create_foreign_key(f'fk_{table}_image_hash', table, 'media_blobs', ['image_hash'], ['hash'])
+
+        rows = bind.execute(sa.text(f"SELECT id, image FROM {table} WHERE image IS NOT NULL AND image <> ''")).all()
+        for row_id, image in rows:
+            try:
+                data, content_type = _decode_image(image)
+            except ValueError as e:
+                raise RuntimeError(f"{table}.id={row_id}: {e}; fix or clear it first") from e
+            digest = hashlib.sha256(data).hexdigest()
+            bind.execute(
+                sa.text(
+                    "INSERT INTO media_blobs (hash, content_type, size, data) "
+                    "VALUES (:hash, :content_type, :size, :data) ON CONFLICT (hash) DO NOTHING"
+                ).bindparams(sa.bindparam('data', type_=sa.LargeBinary())),
+                {"hash": digest, "content_type": content_type, "size": len(data), "data": data},
+            )
+            bind.execute(
+                sa.text(f"UPDATE {table} SET image_hash = :hash WHERE id = :id"),
+                {"hash": digest, "id": row_id},
+            )
+
+        op.drop_column(table, 'image')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('image', sa.Text(), nullable=True))
+        op.execute(f"""
+            UPDATE {table} t
+            SET image = 'data:' || m.content_type || ';base64,' || translate(encode(m.data, 'base64'), E'\\n', '')
+            FROM media_blobs m
+            WHERE m.hash = t.image_hash
+        """)
+        op.drop_constraint(f'fk_{table}_image_hash', table, type_='foreignkey')
+        op.drop_column(table, 'image_hash')
+    op.drop_table('media_blobs')
@@ -0,0 +1,84 @@
+"""add user resource versions
+
+Per-user ``ledger_version`` and ``requests_version`` counters, bumped by
+statement-level triggers on ``transactions`` and ``requests``, used as ETag
+version markers for the /users/me routes.
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d6e7f8a9b0'
+down_revision: Union[str, Sequence[str], None] = 'b4c5d6e7f8a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('ledger_version', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('requests_version', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION users_bump_ledger_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users AS u SET ledger_version = u.ledger_version + 1
+            FROM (
+                SELECT id FROM users WHERE id IN (SELECT user_id FROM new_rows) ORDER BY id FOR NO KEY UPDATE
+            ) AS t
+            WHERE u.id = t.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION users_bump_requests_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users AS u SET requests_version = u.requests_version + 1
+            FROM (
+                SELECT id FROM users
+                WHERE id IN (SELECT sender_id FROM new_rows UNION SELECT recipient_id FROM new_rows)
+                ORDER BY id FOR NO KEY UPDATE
+            ) AS t
+            WHERE u.id = t.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_users_ledger_version
+        AFTER INSERT ON transactions
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_ledger_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER requests_insert_users_requests_version
+        AFTER INSERT ON requests
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_requests_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER requests_update_users_requests_version
+        AFTER UPDATE ON requests
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_requests_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS requests_update_users_requests_version ON requests")
+    op.execute("DROP TRIGGER IF EXISTS requests_insert_users_requests_version ON requests")
+    op.execute("DROP TRIGGER IF EXISTS transactions_users_ledger_version ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS users_bump_requests_version()")
+    op.execute("DROP FUNCTION IF EXISTS users_bump_ledger_version()")
+    op.drop_column('users', 'requests_version')
+    op.drop_column('users', 'ledger_version')
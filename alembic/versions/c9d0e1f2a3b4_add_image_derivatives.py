@@ -0,0 +1,41 @@
+"""add image derivatives
+
+Adds card and thumbnail derivative references next to ``image_hash`` on
+``shop_items`` and ``challenges``. Existing rows keep them empty and fall back
+to the full image until re-uploaded.
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, Sequence[str], None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('shop_items', 'challenges')
+COLUMNS = ('image_card_hash', 'image_thumb_hash')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        for column in COLUMNS:
+            op.add_column(table, sa.Column(column, sa.String(length=64), nullable=True))
+            op.create_foreign_key(f'fk_{table}_{column}', table, 'media_blobs', [column], ['hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        for column in COLUMNS:
+            op.drop_constraint(f'fk_{table}_{column}', table, type_='foreignkey')
+            op.drop_column(table, column)
@@ -0,0 +1,62 @@
+"""add shop stock and reservations
+
+Adds optional ``stock`` and ``per_user_limit`` to ``shop_items``, the
+``shop_reservations`` holds and the ``shop_purchase_counts`` table that
+enforces per-user limits.
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, Sequence[str], None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('shop_items', sa.Column('stock', sa.Integer(), nullable=True))
+    op.add_column('shop_items', sa.Column('per_user_limit', sa.Integer(), nullable=True))
+    op.create_check_constraint('ck_shop_items_stock_non_negative', 'shop_items', 'stock >= 0')
+
+    op.create_table('shop_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['shop_items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_shop_reservations_expires_at', 'shop_reservations', ['expires_at'], unique=False)
+    op.create_index('ix_shop_reservations_user_id', 'shop_reservations', ['user_id'], unique=False)
+
+    op.create_table('shop_purchase_counts',
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('claimed', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['shop_items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('item_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('shop_purchase_counts')
+    op.drop_index('ix_shop_reservations_user_id', table_name='shop_reservations')
+    op.drop_index('ix_shop_reservations_expires_at', table_name='shop_reservations')
+    op.drop_table('shop_reservations')
+    op.drop_constraint('ck_shop_items_stock_non_negative', 'shop_items', type_='check')
+    op.drop_column('shop_items', 'per_user_limit')
+    op.drop_column('shop_items', 'stock')
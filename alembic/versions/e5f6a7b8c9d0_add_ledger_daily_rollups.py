@@ -0,0 +1,82 @@
+"""add ledger_daily_rollups
+
+Revision ID: e5f6a7b8c9d0
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6a7b8c9d0'
+down_revision: Union[str, Sequence[str], None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ledger_daily_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('credited', sa.BigInteger(), nullable=False),
+        sa.Column('debited', sa.BigInteger(), nullable=False),
+        sa.Column('tx_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'type')
+    )
+    op.create_index('ix_ledger_daily_rollups_day_user_id', 'ledger_daily_rollups', ['day', 'user_id'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ledger_daily_rollups_apply() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO ledger_daily_rollups AS r (user_id, day, type, credited, debited, tx_count)
+            SELECT user_id,
+                   (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date,
+                   type,
+                   SUM(GREATEST(amount, 0)),
+                   SUM(LEAST(amount, 0)),
+                   COUNT(*)
+            FROM new_rows
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+            ON CONFLICT (user_id, day, type) DO UPDATE
+            SET credited = r.credited + EXCLUDED.credited,
+                debited = r.debited + EXCLUDED.debited,
+                tx_count = r.tx_count + EXCLUDED.tx_count;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_ledger_daily_rollups
+        AFTER INSERT ON transactions
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ledger_daily_rollups_apply()
+    """)
+
+    # Backfill from the existing ledger
+    op.execute("""
+        INSERT INTO ledger_daily_rollups (user_id, day, type, credited, debited, tx_count)
+        SELECT user_id,
+               (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date,
+               type,
+               SUM(GREATEST(amount, 0)),
+               SUM(LEAST(amount, 0)),
+               COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transactions_ledger_daily_rollups ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS ledger_daily_rollups_apply()")
+    op.drop_index('ix_ledger_daily_rollups_day_user_id', table_name='ledger_daily_rollups')
+    op.drop_table('ledger_daily_rollups')
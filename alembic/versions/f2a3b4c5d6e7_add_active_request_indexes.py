@@ -0,0 +1,32 @@
+"""add partial indexes on active requests
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, Sequence[str], None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_requests_active_created_at', 'requests', ['created_at'], unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_requests_active_sender_id_created_at', 'requests', ['sender_id', 'created_at'], unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_requests_active_recipient_id_created_at', 'requests', ['recipient_id', 'created_at'], unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_requests_active_recipient_id_created_at', table_name='requests')
+    op.drop_index('ix_requests_active_sender_id_created_at', table_name='requests')
+    op.drop_index('ix_requests_active_created_at', table_name='requests')
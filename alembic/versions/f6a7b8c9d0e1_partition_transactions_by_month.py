@@ -0,0 +1,131 @@
+"""partition transactions by month
+
+Converts ``transactions`` into a declarative range-partitioned table on
+``created_at`` with one partition per UTC month, plus a default partition.
+Future partitions are created by ``scripts/manage_partitions.py`` (and at
+app startup).
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, Sequence[str], None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, user_id, admin_id, amount, type, description, recipient_id, request_id, shop_item_id, created_at"
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_rollup_trigger() -> None:
+    op.execute("""
+        CREATE TRIGGER transactions_ledger_daily_rollups
+        AFTER INSERT ON transactions
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ledger_daily_rollups_apply()
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Move the existing heap out of the way. Index names are schema-wide, so
+    # rename the ones the new table will reuse.
+    op.execute("DROP TRIGGER IF EXISTS transactions_ledger_daily_rollups ON transactions")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+    op.execute("ALTER TABLE transactions_legacy RENAME CONSTRAINT transactions_pkey TO transactions_legacy_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_id")
+
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            admin_id INTEGER REFERENCES users (id),
+            amount INTEGER NOT NULL,
+            type VARCHAR NOT NULL,
+            description TEXT,
+            recipient_id INTEGER REFERENCES users (id),
+            request_id INTEGER REFERENCES requests (id),
+            shop_item_id INTEGER REFERENCES shop_items (id),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # Keep the sequence alive when the legacy table is dropped
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+
+    now = datetime.now(timezone.utc)
+    first = bind.execute(sa.text("SELECT min(created_at) FROM transactions_legacy")).scalar() or now
+    first = first.astimezone(timezone.utc)
+    month = date(first.year, first.month, 1)
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE transactions_{month:%Y_%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    op.create_index('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_transactions_created_at', 'transactions', ['created_at'], unique=False)
+
+    # Rollups already include these rows, so copy before recreating the trigger
+    op.execute(f"""
+        INSERT INTO transactions ({COLUMNS})
+        SELECT id, user_id, admin_id, amount, type, description, recipient_id, request_id,
+               shop_item_id, COALESCE(created_at, now())
+        FROM transactions_legacy
+    """)
+    op.execute("DROP TABLE transactions_legacy")
+    _create_rollup_trigger()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transactions_ledger_daily_rollups ON transactions")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey")
+    op.execute("ALTER INDEX ix_transactions_id RENAME TO ix_transactions_partitioned_id")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_user_id_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_created_at")
+
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            admin_id INTEGER REFERENCES users (id),
+            amount INTEGER NOT NULL,
+            type VARCHAR NOT NULL,
+            description TEXT,
+            recipient_id INTEGER REFERENCES users (id),
+            request_id INTEGER REFERENCES requests (id),
+            shop_item_id INTEGER REFERENCES shop_items (id),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT transactions_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
+    _create_rollup_trigger()
@@ -1,22 +1,90 @@
 from __future__ import annotations
 
+import asyncio
+import hmac
+import logging
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes.v1 import api_router
+from core.admission import AdmissionControlMiddleware
 from core.config import get_settings
+from core.http_metrics import MetricsMiddleware, preallocate
 from core.logging import configure_logging
+from core.metrics import CONTENT_TYPE, render_metrics
+from core.profiler import ProfilerMiddleware
+from core.tracing import TracingMiddleware
+from core.tasks import cancel_tasks, run_periodically
 from db.base import Base
 import db.models
-from db.session import engine
+from db.partitions import ensure_partitions
+from db.pool import export_pool_gauges
+from db.session import AsyncSessionLocal, engine
+from services.archive_service import archive_old_transactions
+from services.job_service import run_job_worker
+from services.leaderboard_service import rebuild_leaderboard, reconcile_leaderboard
+from services.media_service import shutdown_image_pool
+from services.request_service import expire_stale_requests
+from services.shop_service import release_expired_reservations
+from services.user_event_service import run_event_listener
+from services.webhook_service import drain_webhook_inbox, purge_webhook_inbox
 
 
 __version__ = "0.1.0"
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def _export_pool_gauges() -> None:
+    export_pool_gauges(engine.pool)
+
+
+async def _reconcile_leaderboard() -> None:
+    async with AsyncSessionLocal() as session:
+        await reconcile_leaderboard(session)
+
+
+async def _ensure_partitions() -> None:
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session, months_ahead=settings.TRANSACTION_PARTITION_MONTHS_AHEAD)
+        await session.commit()
+
+
+async def _archive_transactions() -> None:
+    async with AsyncSessionLocal() as session:
+        await archive_old_transactions(
+            session,
+            older_than_days=settings.TRANSACTION_ARCHIVE_AFTER_DAYS,
+            batch_size=settings.TRANSACTION_ARCHIVE_BATCH_SIZE,
+        )
+
+
+async def _expire_requests() -> None:
+    async with AsyncSessionLocal() as session:
+        await expire_stale_requests(
+            session,
+            older_than_days=settings.REQUEST_EXPIRY_DAYS,
+            batch_size=settings.REQUEST_EXPIRY_BATCH_SIZE,
+        )
+
+
+async def _release_reservations() -> None:
+    async with AsyncSessionLocal() as session:
+        await release_expired_reservations(session)
+
+
+async def _drain_webhook_inbox() -> None:
+    async with AsyncSessionLocal() as session:
+        await drain_webhook_inbox(session)
+
+
+async def _purge_webhook_inbox() -> None:
+    async with AsyncSessionLocal() as session:
+        await purge_webhook_inbox(session, older_than_days=settings.WEBHOOK_INBOX_RETENTION_DAYS)
 
 
 @asynccontextmanager
@@ -26,12 +94,78 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         # Development convenience: ensure tables exist
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        await _ensure_partitions()
+    except Exception:
+        logger.exception("Failed to pre-create transaction partitions")
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await rebuild_leaderboard(session)
+    except Exception:
+        # The leaderboard is rebuilt lazily on first use if this fails
+        logger.exception("Failed to build leaderboard at startup")
+
+    tasks = [
+        asyncio.create_task(
+            run_periodically(
+                "leaderboard-reconcile",
+                settings.LEADERBOARD_RECONCILE_SECONDS,
+                _reconcile_leaderboard,
+            )
+        ),
+        asyncio.create_task(
+            run_periodically("transaction-partitions", 24 * 60 * 60, _ensure_partitions)
+        ),
+        asyncio.create_task(
+            run_periodically("shop-reservations", 30, _release_reservations)
+        ),
+        asyncio.create_task(
+            run_periodically(
+                "webhook-inbox", settings.WEBHOOK_INBOX_POLL_SECONDS, _drain_webhook_inbox
+            )
+        ),
+        asyncio.create_task(
+            run_periodically("webhook-inbox-purge", 60 * 60, _purge_webhook_inbox)
+        ),
+        asyncio.create_task(run_event_listener()),
+    ]
+    if settings.METRICS_ENABLED:
+        # Sampled in every worker, since a scrape reaches only one
+        tasks.append(asyncio.create_task(run_periodically("pool-gauges", 1, _export_pool_gauges)))
+    tasks.extend(
+        asyncio.create_task(run_job_worker(f"app-{i}", AsyncSessionLocal))
+        for i in range(settings.JOB_WORKERS)
+    )
+    if settings.TRANSACTION_ARCHIVE_AFTER_DAYS > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically("transaction-archive", 60 * 60, _archive_transactions)
+            )
+        )
+    if settings.REQUEST_EXPIRY_DAYS > 0:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically("request-expiry", 60 * 60, _expire_requests)
+            )
+        )
     yield
+    await cancel_tasks(tasks)
+    shutdown_image_pool()
 
 
 def create_app() -> FastAPI:
     app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
+    # Innermost, so shed requests are never traced or profiled
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(ProfilerMiddleware)
+
+    # Added before CORS so 503s still carry CORS headers
+    if settings.ADMISSION_CONTROL:
+        app.add_middleware(AdmissionControlMiddleware)
+
     # CORS
     allowed_origins = settings.allowed_origins_list()
     if allowed_origins:
@@ -50,6 +184,21 @@ def create_app() -> FastAPI:
     async def root() -> dict[str, str]:
         return {"name": settings.APP_NAME, "status": "ok"}
 
+    if settings.METRICS_ENABLED:
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics(authorization: str | None = Header(default=None)) -> Response:
+            if settings.METRICS_TOKEN and not hmac.compare_digest(
+                (authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+            ):
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+            export_pool_gauges(engine.pool)
+            return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+        preallocate(app)
+        # Outermost, so it times (and counts) everything including shed requests
+        app.add_middleware(MetricsMiddleware)
+
     return app
 
 
@@ -0,0 +1,251 @@
+"""Admission control: shed low-priority work while the DB pool is saturated.
+
+Requests are classed by route before they reach FastAPI:
+- ``critical``: money moves (transfers, request payments, purchases,
+  payouts, admin balance changes). Always admitted.
+- ``low``: the leaderboard and list endpoints. Rejected with 503 and
+  ``Retry-After`` while the pool is saturated, and capped at
+  ``ADMISSION_LOW_PRIORITY_SHARE`` of the pool's connections at all times.
+- ``normal``: everything else. Rejected only while the pool is saturated
+  and the class already has as many requests in flight as the pool has
+  connections.
+
+The pool counts as saturated from a checkout slower than
+``ADMISSION_POOL_WAIT_MS`` until ``ADMISSION_COOLDOWN_SECONDS`` pass without
+another, or while more checkouts are queued than it has connections.
+Rejected requests never touch the pool, so under a burst the connections go
+to critical work instead of timing out for everyone.
+
+With ``ADMISSION_STALE_SECONDS`` set, the last 200 of a low-priority GET
+(per path, query and credentials) is kept and served, with an ``Age``
+header, in place of the 503.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import get_settings
+from core.metrics import Counter
+from db.pool import pool_stats
+
+settings = get_settings()
+
+CRITICAL = "critical"
+NORMAL = "normal"
+LOW = "low"
+
+# (method, path below API_V1_PREFIX, class); None exempts the route
+_ROUTE_CLASSES: list[tuple[str, str, str | None]] = [
+    ("POST", r"/transactions/transfer", CRITICAL),
+    ("POST", r"/requests/\d+/pay", CRITICAL),
+    ("POST", r"/shop/\d+/purchase", CRITICAL),
+    ("POST", r"/shop/reservations/\d+/confirm", CRITICAL),
+    ("POST", r"/challenges/\d+/completions/approve", CRITICAL),
+    ("POST", r"/admin/users/\d+/balance/(add|subtract)", CRITICAL),
+    ("GET", r"/users/leaderboard", LOW),
+    ("GET", r"/users/?", LOW),
+    ("GET", r"/users/me/(transactions|requests|summary|rank)", LOW),
+    ("GET", r"/shop/?", LOW),
+    ("GET", r"/challenges/?", LOW),
+    ("GET", r"/challenges/\d+/completions", LOW),
+    ("GET", r"/admin/transactions", LOW),
+    # Long-lived, and holds no connection while open
+    ("GET", r"/users/me/stream", None),
+    ("GET", r"/health", None),
+]
+_COMPILED = [(method, re.compile(pattern), cls) for method, pattern, cls in _ROUTE_CLASSES]
+
+# Most stale responses kept, and the largest body worth keeping
+_STALE_ENTRIES = 1024
+_STALE_MAX_BYTES = 256 * 1024
+
+_BUSY_BODY = json.dumps({"detail": "Server is busy, please retry"}).encode()
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests turned away while the DB pool was saturated, by route class and outcome (shed or stale).",
+    ("route_class", "outcome"),
+)
+
+
+def classify(method: str, path: str) -> str | None:
+    """Route class of a request, or ``None`` for routes never shed."""
+    prefix = settings.API_V1_PREFIX
+    if not path.startswith(prefix):
+        return None
+    path = path[len(prefix):]
+    for rule_method, pattern, cls in _COMPILED:
+        if rule_method == method and pattern.fullmatch(path):
+            return cls
+    return NORMAL
+
+
+@dataclass
+class RouteClassStats:
+    in_flight: int = 0
+    admitted: int = 0
+    shed: int = 0
+    served_stale: int = 0
+
+
+@dataclass(frozen=True)
+class _StaleResponse:
+    stored_at: float
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.classes = {cls: RouteClassStats() for cls in (CRITICAL, NORMAL, LOW)}
+        self._stale: OrderedDict[tuple[str, bytes, str], _StaleResponse] = OrderedDict()
+
+    @property
+    def pool_capacity(self) -> int:
+        return settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+    def saturated(self) -> bool:
+        if pool_stats.waiting > self.pool_capacity:
+            return True
+        return time.monotonic() - pool_stats.last_slow_at < settings.ADMISSION_COOLDOWN_SECONDS
+
+    def admit(self, cls: str) -> bool:
+        if cls == CRITICAL:
+            return True
+        stats = self.classes[cls]
+        if cls == LOW:
+            cap = max(1, int(self.pool_capacity * settings.ADMISSION_LOW_PRIORITY_SHARE))
+            return stats.in_flight < cap and not self.saturated()
+        return stats.in_flight < self.pool_capacity or not self.saturated()
+
+    def get_stale(self, key: tuple[str, bytes, str]) -> _StaleResponse | None:
+        entry = self._stale.get(key)
+        if entry is None or time.monotonic() - entry.stored_at > settings.ADMISSION_STALE_SECONDS:
+            return None
+        return entry
+
+    def put_stale(self, key: tuple[str, bytes, str], headers: list[tuple[bytes, bytes]], body: bytes) -> None:
+        self._stale[key] = _StaleResponse(time.monotonic(), headers, body)
+        self._stale.move_to_end(key)
+        while len(self._stale) > _STALE_ENTRIES:
+            self._stale.popitem(last=False)
+
+
+admission = AdmissionController()
+
+
+def _stale_key(scope: Scope) -> tuple[str, bytes, str]:
+    # Responses are per caller; key on a digest of the credentials
+    auth = b""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            auth = value
+            break
+    return scope["path"], scope["query_string"], hashlib.blake2b(auth, digest_size=16).hexdigest()
+
+
+def get_admission_stats() -> dict[str, Any]:
+    waits = sorted(pool_stats.waits)
+    return {
+        "saturated": admission.saturated(),
+        "pool_capacity": admission.pool_capacity,
+        "pool_waiting": pool_stats.waiting,
+        "pool_checkouts": pool_stats.checkouts,
+        "pool_slow_checkouts": pool_stats.slow_checkouts,
+        "pool_wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else None,
+        "classes": [
+            {"route_class": cls, **vars(stats)} for cls, stats in admission.classes.items()
+        ],
+    }
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware applying ``admission`` to HTTP requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cls = classify(scope["method"], scope["path"])
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats = admission.classes[cls]
+        keep_stale = cls == LOW and scope["method"] == "GET" and settings.ADMISSION_STALE_SECONDS > 0
+        if not admission.admit(cls):
+            stale = admission.get_stale(_stale_key(scope)) if keep_stale else None
+            if stale is not None:
+                stats.served_stale += 1
+                ADMISSION_REJECTED.labels(cls, "stale").inc()
+                await _send_stale(send, stale)
+            else:
+                stats.shed += 1
+                ADMISSION_REJECTED.labels(cls, "shed").inc()
+                await _send_busy(send)
+            return
+
+        stats.admitted += 1
+        stats.in_flight += 1
+        try:
+            if keep_stale:
+                await self.app(scope, receive, _recording(scope, send))
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            stats.in_flight -= 1
+
+
+def _recording(scope: Scope, send: Send) -> Send:
+    """Wrap ``send`` to keep a copy of a small 200 for serving stale."""
+    state: dict[str, Any] = {"keep": False, "headers": [], "chunks": [], "size": 0}
+
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            state["keep"] = message["status"] == 200
+            state["headers"] = list(message.get("headers", []))
+        elif message["type"] == "http.response.body" and state["keep"]:
+            body = message.get("body", b"")
+            state["size"] += len(body)
+            if state["size"] > _STALE_MAX_BYTES:
+                state["keep"] = False
+            else:
+                state["chunks"].append(body)
+                if not message.get("more_body", False):
+                    admission.put_stale(_stale_key(scope), state["headers"], b"".join(state["chunks"]))
+        await send(message)
+
+    return wrapped
+
+
+async def _send_busy(send: Send) -> None:
+    retry_after = str(max(1, math.ceil(settings.ADMISSION_COOLDOWN_SECONDS)))
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_BUSY_BODY)).encode()),
+            (b"retry-after", retry_after.encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _BUSY_BODY})
+
+
+async def _send_stale(send: Send, stale: _StaleResponse) -> None:
+    age = str(int(time.monotonic() - stale.stored_at)).encode()
+    headers = [(name, value) for name, value in stale.headers if name.lower() != b"age"]
+    await send({"type": "http.response.start", "status": 200, "headers": [*headers, (b"age", age)]})
+    await send({"type": "http.response.body", "body": stale.body})
@@ -7,6 +7,7 @@ import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import get_settings
+from core.tracing import traced
 from db.session import get_db_session
 from db.models import User
 from repositories import get_user_by_id, get_user_by_email, get_user_by_clerk_id
@@ -16,6 +17,7 @@ settings = get_settings()
 security = HTTPBearer()
 
 
+@traced("dependency")
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db_session),
@@ -109,6 +111,7 @@ async def _authenticate_with_clerk_token(
     return user
 
 
+@traced("dependency")
 async def require_admin(current_user: User = Depends(get_current_user)) -> User:
     """Require the current user to have admin role."""
     if current_user.role != "admin":
@@ -0,0 +1,104 @@
+"""Per-route request metrics for ``GET /metrics``.
+
+``MetricsMiddleware`` counts requests by method, route template and status,
+times them into ``http_request_duration_seconds`` (event streams excepted:
+their duration is how long the client stayed), and tracks requests in flight
+per admission route class. Routes are labelled by template
+(``/api/v1/users/{user_id}``), so series stay bounded by the route table;
+requests no route matched share ``unmatched``.
+"""
+from __future__ import annotations
+
+import time
+import warnings
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.admission import classify
+from core.metrics import Counter, Gauge, Histogram
+
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+_UNMATCHED = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by method, route and status.", ("method", "route", "status")
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route.", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled, by admission route class.", ("route_class",)
+)
+
+
+def route_template(scope: Scope) -> str:
+    """Full path template of the route that handled ``scope``.
+
+    Routers included with a prefix may expose only the part of the template
+    below it, so the prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return _UNMATCHED
+    try:
+        suffix = path_format.format(**{
+            name: route.param_convertors[name].to_string(value)
+            for name, value in scope.get("path_params", {}).items()
+        })
+    except (KeyError, AttributeError, ValueError, AssertionError):
+        return path_format
+    path = scope["path"]
+    if path.endswith(suffix):
+        return path[: len(path) - len(suffix)] + path_format
+    return path_format
+
+
+def preallocate(app: FastAPI) -> None:
+    """Create the latency series of every documented route up front."""
+    with warnings.catch_warnings():
+        # Schema problems are reported where the schema is served
+        warnings.simplefilter("ignore")
+        paths = app.openapi().get("paths", {})
+    for path, operations in paths.items():
+        for method in operations:
+            HTTP_DURATION.labels(method.upper(), path)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording the ``http_*`` metrics."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        in_flight = HTTP_IN_FLIGHT.labels(classify(scope["method"], scope["path"]) or "exempt")
+        # Until a response starts, an exception is what the client will see
+        response: dict[str, Any] = {"status": 500, "streaming": False}
+
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type":
+                        response["streaming"] = value.startswith(b"text/event-stream")
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, wrapped)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            method = scope["method"] if scope["method"] in _METHODS else "other"
+            route = route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(response["status"])).inc()
+            if not response["streaming"]:
+                HTTP_DURATION.labels(method, route).observe(elapsed)
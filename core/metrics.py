@@ -0,0 +1,279 @@
+"""Prometheus metrics, aggregated across worker processes.
+
+Each process keeps its samples in a fixed array of float64 slots. With
+``METRICS_DIR`` set the array is a memory-mapped ``{pid}.values`` file and
+the sample behind each slot is appended to ``{pid}.keys`` (line *n* names
+slot *n*), so ``render_metrics`` in any worker can sum every worker's
+samples. Without it the array lives in process memory and ``/metrics`` shows
+that process only. Point ``METRICS_DIR`` at an empty directory per
+deployment (files of exited workers still count toward counters and
+histograms), and don't preload the app in a forking server: the store must
+be created in the worker.
+
+Updates are a float add into a slot the child already knows: no locks, no
+allocation, no dict lookups on the hot path. They must happen on the event
+loop thread, as every update in this app does. Histogram buckets are stored
+cumulatively, so ``observe`` touches only the buckets at or above the value.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Slots per process; series past this are written to scratch slots that are
+# never exported (and logged once)
+_CAPACITY = 16384
+_SCRATCH = 64
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_key(name: str, labels: Iterable[tuple[str, str]]) -> str:
+    body = ",".join(f'{label}="{_escape(value)}"' for label, value in labels)
+    return f"{name}{{{body}}}" if body else name
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value)) + ".0"
+
+
+class _SlotStore:
+    def __init__(self, directory: str | None) -> None:
+        self._index: dict[str, int] = {}
+        # (family, sample key) of each slot
+        self._entries: list[tuple[str, str]] = []
+        self._keys = None
+        self._overflowed = False
+        size = (_CAPACITY + _SCRATCH) * 8
+        if directory:
+            path = Path(directory)
+            path.mkdir(parents=True, exist_ok=True)
+            pid = os.getpid()
+            # A reused pid replaces the files of the process that had it
+            with open(path / f"{pid}.values", "wb") as f:
+                f.truncate(size)
+            with open(path / f"{pid}.values", "r+b") as f:
+                buffer = mmap.mmap(f.fileno(), size)
+            self._keys = open(path / f"{pid}.keys", "w", encoding="utf-8", buffering=1)
+        else:
+            buffer = bytearray(size)
+        self.values = memoryview(buffer).cast("d")
+
+    def slot(self, family: str, key: str) -> int:
+        index = self._index.get(key)
+        if index is not None:
+            return index
+        if len(self._index) >= _CAPACITY:
+            if not self._overflowed:
+                self._overflowed = True
+                logger.warning("Metrics store full; dropping new series such as %s", key)
+            return _CAPACITY
+        index = self._index[key] = len(self._entries)
+        self._entries.append((family, key))
+        if self._keys is not None:
+            self._keys.write(f"{family}\t{key}\n")
+        return index
+
+    def items(self) -> list[tuple[str, str, float]]:
+        return [(family, key, self.values[i]) for i, (family, key) in enumerate(self._entries)]
+
+
+_store = _SlotStore(settings.METRICS_DIR)
+
+# Registered families, by name
+_families: dict[str, _Metric] = {}
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        if name in _families:
+            raise ValueError(f"Metric {name} is already registered")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        _families[name] = self
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            child = self._children[values] = self._child(tuple(zip(self.labelnames, values)))
+        return child
+
+    @abstractmethod
+    def _child(self, labels: tuple[tuple[str, str], ...]):
+        """The child holding the samples of one label combination."""
+
+    def _slot(self, name: str, labels: Iterable[tuple[str, str]]) -> int:
+        return _store.slot(self.name, _sample_key(name, labels))
+
+
+class _ValueChild:
+    __slots__ = ("_slot",)
+
+    def __init__(self, slot: int) -> None:
+        self._slot = slot
+
+    def inc(self, amount: float = 1.0) -> None:
+        _store.values[self._slot] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        _store.values[self._slot] -= amount
+
+    def set(self, value: float) -> None:
+        _store.values[self._slot] = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self, labels):
+        return _ValueChild(self._slot(self.name, labels))
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Summed over live processes only."""
+
+    kind = "gauge"
+
+    def _child(self, labels):
+        return _ValueChild(self._slot(self.name, labels))
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_buckets", "_sum", "_count")
+
+    def __init__(self, bounds: tuple[float, ...], buckets: int, sum_slot: int, count_slot: int) -> None:
+        self._bounds = bounds
+        # Slots of the cumulative buckets are consecutive: buckets + i is le=bounds[i]
+        self._buckets = buckets
+        self._sum = sum_slot
+        self._count = count_slot
+
+    def observe(self, value: float) -> None:
+        values = _store.values
+        for slot in range(self._buckets + bisect_left(self._bounds, value), self._buckets + len(self._bounds)):
+            values[slot] += 1
+        values[self._sum] += value
+        values[self._count] += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.bounds = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self, labels):
+        slots = [self._slot(f"{self.name}_bucket", (*labels, ("le", _format_float(b)))) for b in self.bounds]
+        sum_slot = self._slot(f"{self.name}_sum", labels)
+        count_slot = self._slot(f"{self.name}_count", labels)
+        if _CAPACITY in (slots[-1], count_slot):
+            # The store filled up part way through
+            return _HistogramChild(self.bounds, _CAPACITY, _CAPACITY, _CAPACITY)
+        return _HistogramChild(self.bounds, slots[0], sum_slot, count_slot)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+
+def _live(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_process(keys_path: Path) -> Iterable[tuple[str, str, float]]:
+    try:
+        lines = keys_path.read_text(encoding="utf-8").split("\n")
+        data = keys_path.with_suffix(".values").read_bytes()
+    except FileNotFoundError:
+        return []
+    values = memoryview(data).cast("d")
+    # The last element is empty, or a line still being written
+    return [
+        (family, key, values[i])
+        for i, (family, _, key) in enumerate(line.partition("\t") for line in lines[:-1])
+        if i < _CAPACITY
+    ]
+
+
+def _collect() -> dict[str, dict[str, float]]:
+    samples: dict[str, dict[str, float]] = {name: {} for name in _families}
+    if not settings.METRICS_DIR:
+        for family, key, value in _store.items():
+            samples[family][key] = value
+        return samples
+    for keys_path in Path(settings.METRICS_DIR).glob("*.keys"):
+        live = None
+        for family, key, value in _read_process(keys_path):
+            metric = _families.get(family)
+            if metric is None:
+                continue
+            if metric.kind == "gauge":
+                if live is None:
+                    live = _live(int(keys_path.stem))
+                if not live:
+                    continue
+            family_samples = samples[family]
+            family_samples[key] = family_samples.get(key, 0.0) + value
+    return samples
+
+
+def render_metrics() -> bytes:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for name, family_samples in _collect().items():
+        metric = _families[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(f"{key} {_format_float(value)}" for key, value in family_samples.items())
+    lines.append("")
+    return "\n".join(lines).encode()
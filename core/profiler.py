@@ -0,0 +1,228 @@
+"""On-demand sampling profiler behind ``POST /admin/profile``.
+
+A daemon thread wakes every ``interval`` seconds and reads the Python stack
+of other threads with ``sys._current_frames``. Nothing is hooked into the
+code being profiled, so it runs at full speed between samples; each sample
+costs one stack walk per thread. There are two modes:
+
+- process: every thread, for a fixed number of seconds. Threads parked in a
+  wait (the event loop's ``select``, idle executor workers) are skipped
+  unless ``idle`` is set.
+- requests: the event loop thread only, and only while the task serving a
+  request being profiled is the one running. ``ProfilerMiddleware`` gives
+  each request its own tally and keeps it if the request's route template
+  (or path) matches, until enough requests have finished.
+
+Results are collapsed stacks, one ``root;...;leaf count`` line per distinct
+stack, as read by flamegraph.pl, speedscope and inferno. One profile runs per
+process at a time.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.exceptions import AlreadyExistsError
+from core.http_metrics import route_template
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (file name, function) of frames a thread sits in while it has nothing to do
+_IDLE_LEAVES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+})
+
+_labels: dict[CodeType, str] = {}
+
+
+def _label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_ROOT + os.sep):
+            path = path[len(_ROOT) + 1:]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        else:
+            path = os.path.basename(path)
+        label = _labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _collapse(frame: FrameType | None, root: str | None = None) -> str:
+    names = []
+    while frame is not None:
+        names.append(_label(frame.f_code))
+        frame = frame.f_back
+    if root is not None:
+        names.append(root)
+    return ";".join(reversed(names))
+
+
+def _idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+@dataclass
+class Profile:
+    stacks: Counter[str] = field(default_factory=Counter)
+    samples: int = 0
+    # Requests profiled (requests mode)
+    requests: int = 0
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float, idle: bool, session: _RequestSession | None) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.idle = idle
+        self.session = session
+        self.profile = Profile()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopping = threading.Event()
+
+    def stop(self) -> Profile:
+        self._stopping.set()
+        self.join()
+        return self.profile
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            if self.session is None:
+                self._sample_threads(me)
+            else:
+                self._sample_request()
+
+    def _sample_threads(self, me: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (not self.idle and _idle(frame)):
+                continue
+            self.profile.stacks[_collapse(frame, names.get(ident, str(ident)))] += 1
+            self.profile.samples += 1
+
+    def _sample_request(self) -> None:
+        task = asyncio.current_task(self._loop)
+        if task is None or task not in self.session.tasks:
+            return
+        frame = sys._current_frames().get(self._loop_thread)
+        # Discard the sample if the loop moved to another task meanwhile
+        if frame is None or asyncio.current_task(self._loop) is not task:
+            return
+        stack = _collapse(frame)
+        # The loop thread may be removing the tally and folding it into the
+        # profile right now
+        with self.session.lock:
+            stacks = self.session.tasks.get(task)
+            if stacks is not None:
+                stacks[stack] += 1
+
+
+@dataclass
+class _RequestSession:
+    route: str
+    limit: int
+    profile: Profile
+    # Task serving each request in progress -> its stacks so far
+    tasks: dict[asyncio.Task, Counter[str]] = field(default_factory=dict)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    # Held by the sampler thread while it counts into a tally, and by the
+    # loop thread while it adds or removes one
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def start(self, task: asyncio.Task) -> None:
+        with self.lock:
+            self.tasks[task] = Counter()
+
+    def finish(self, task: asyncio.Task, scope: Scope) -> None:
+        with self.lock:
+            stacks = self.tasks.pop(task, None)
+        if stacks is None or self.profile.requests >= self.limit:
+            return
+        if self.route not in (route_template(scope), scope["path"]):
+            return
+        self.profile.stacks.update(stacks)
+        self.profile.samples += sum(stacks.values())
+        self.profile.requests += 1
+        if self.profile.requests >= self.limit:
+            self.done.set()
+
+
+_running = False
+_session: _RequestSession | None = None
+
+
+async def profile_process(seconds: float, interval: float, idle: bool = False) -> Profile:
+    """Sample every thread for ``seconds``."""
+    global _running
+    if _running:
+        raise AlreadyExistsError("A profile is already running in this process")
+    _running = True
+    sampler = _Sampler(interval, idle, None)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = sampler.stop()
+        _running = False
+    return profile
+
+
+async def profile_requests(route: str, limit: int, timeout: float, interval: float) -> Profile:
+    """Sample the next ``limit`` requests to ``route`` (a route template
+    such as ``/api/v1/users/leaderboard``, or a literal path), giving up
+    after ``timeout`` seconds with whatever finished by then."""
+    global _running, _session
+    if _running:
+        raise AlreadyExistsError("A profile is already running in this process")
+    _running = True
+    session = _RequestSession(route, limit, Profile())
+    sampler = _Sampler(interval, False, session)
+    _session = session
+    sampler.start()
+    try:
+        await asyncio.wait_for(session.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        _session = None
+        sampler.stop()
+        _running = False
+    return session.profile
+
+
+def render_collapsed(profile: Profile) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in profile.stacks.most_common())
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware giving each request its own tally while a
+    requests-mode profile is running."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        session = _session
+        if session is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        session.start(task)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.finish(task, scope)
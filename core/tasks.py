@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(
+    name: str, interval_seconds: float, func: Callable[[], Awaitable[object]]
+) -> None:
+    """Run ``func`` every ``interval_seconds`` until cancelled, logging failures."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background task %s failed", name)
+
+
+async def cancel_tasks(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,288 @@
+"""Request tracing: how a request's time splits across dependencies,
+services, repositories, SQL statements and serialization.
+
+``TracingMiddleware`` starts a trace for ``TRACE_SAMPLE_RATE`` of requests.
+The trace and the innermost open span live in context variables, so spans
+opened in tasks the request starts nest correctly. Spans come from:
+
+- ``traced``, decorating a coroutine or function;
+- ``trace_module``, applying ``traced`` to the public coroutine functions
+  (and methods of public classes) of a ``services/`` or ``repositories/``
+  module; each such module calls it on its last line;
+- ``instrument_engine``'s SQLAlchemy hooks, one span per statement;
+- ``span`` blocks, such as the one around response serialization.
+
+Outside a sampled request every hook returns after one context variable
+read. Finished traces go to an in-memory ring buffer of the last
+``TRACE_BUFFER_SIZE`` (``GET /admin/traces``) and, with ``TRACE_FILE`` set,
+are appended to that file as JSON lines.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import get_settings
+from core.http_metrics import route_template
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Spans kept per trace; more are counted in ``dropped_spans``
+_MAX_SPANS = 500
+# Characters of SQL kept on a statement span
+_MAX_STATEMENT = 1000
+
+
+@dataclass
+class Span:
+    span_id: int
+    parent_id: int | None
+    name: str
+    kind: str
+    # time.perf_counter() at start, and seconds taken once finished
+    start: float
+    duration: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    started_at: datetime
+    origin: float
+    spans: list[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    def start_span(self, name: str, kind: str, parent: Span | None, attributes: dict[str, Any]) -> Span | None:
+        if len(self.spans) >= _MAX_SPANS:
+            self.dropped_spans += 1
+            return None
+        span = Span(
+            len(self.spans) + 1,
+            parent.span_id if parent is not None else None,
+            name,
+            kind,
+            time.perf_counter(),
+            attributes=attributes,
+        )
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> dict[str, Any]:
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": _ms(root.duration),
+            "status": root.attributes.get("status"),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "kind": s.kind,
+                    "start_ms": _ms(s.start - self.origin),
+                    "duration_ms": _ms(s.duration),
+                    "attributes": s.attributes,
+                    "error": s.error,
+                }
+                for s in self.spans
+            ],
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+# Most recent finished traces, as dicts
+_traces: deque[dict[str, Any]] = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+_trace_file = None
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes: Any) -> Iterator[Span | None]:
+    """Time the block as a child of the current span, if a trace is active."""
+    trace = _trace.get()
+    current = trace.start_span(name, kind, _span.get(), attributes) if trace is not None else None
+    if current is None:
+        yield None
+        return
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _span.reset(token)
+
+
+def traced(kind: str, name: str | None = None) -> Callable[[F], F]:
+    """Record each call of the decorated function as a ``kind`` span."""
+
+    def decorate(func: F) -> F:
+        span_name = name or f"{func.__module__.rpartition('.')[2]}.{func.__qualname__}"
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if _trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def trace_module(module_name: str, kind: str) -> None:
+    """Apply ``traced(kind)`` to the public coroutine functions defined in
+    ``module_name``, and to the public coroutine methods of its classes.
+
+    Called at the bottom of the module, so names imported from it elsewhere
+    are already the traced versions.
+    """
+    module = sys.modules[module_name]
+    for attr, value in list(vars(module).items()):
+        if attr.startswith("_") or getattr(value, "__module__", None) != module_name:
+            continue
+        if inspect.iscoroutinefunction(value):
+            setattr(module, attr, traced(kind)(value))
+        elif inspect.isclass(value):
+            for method_name, method in list(vars(value).items()):
+                if not method_name.startswith("_") and inspect.iscoroutinefunction(method):
+                    setattr(value, method_name, traced(kind)(method))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record every statement ``engine`` runs inside a trace as a ``db`` span."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        trace = _trace.get()
+        if trace is None:
+            return
+        attributes: dict[str, Any] = {"statement": statement[:_MAX_STATEMENT]}
+        if executemany:
+            attributes["executemany"] = len(parameters)
+        context._trace_span = trace.start_span(
+            statement.lstrip().partition(" ")[0].upper(), "db", _span.get(), attributes
+        )
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        current = getattr(context, "_trace_span", None)
+        if current is not None:
+            current.duration = time.perf_counter() - current.start
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _error(exception_context) -> None:
+        current = getattr(exception_context.execution_context, "_trace_span", None)
+        if current is not None:
+            current.duration = time.perf_counter() - current.start
+            current.error = type(exception_context.original_exception).__name__
+
+
+def _record(trace: Trace) -> None:
+    global _trace_file
+    data = trace.to_dict()
+    _traces.append(data)
+    if not settings.TRACE_FILE:
+        return
+    try:
+        if _trace_file is None:
+            _trace_file = open(settings.TRACE_FILE, "a", encoding="utf-8")
+        _trace_file.write(json.dumps(data, default=str) + "\n")
+        _trace_file.flush()
+    except OSError:
+        logger.exception("Failed to write trace to %s", settings.TRACE_FILE)
+
+
+def get_traces(limit: int, route: str | None = None, min_ms: float = 0) -> list[dict[str, Any]]:
+    """Most recent traces first, optionally only those of ``route`` (a
+    template such as ``/api/v1/users/leaderboard``) or slower than ``min_ms``."""
+    found = []
+    for data in reversed(_traces):
+        if route is not None and data["name"].partition(" ")[2] != route:
+            continue
+        if (data["duration_ms"] or 0) < min_ms:
+            continue
+        found.append(data)
+        if len(found) >= limit:
+            break
+    return found
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware starting a trace for sampled HTTP requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= settings.TRACE_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(uuid.uuid4().hex, datetime.now(timezone.utc), time.perf_counter())
+        root = trace.start_span(scope["method"] + " " + scope["path"], "request", None, {})
+        status = 500
+
+        async def wrapped(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-trace-id", trace.trace_id.encode())]}
+            await send(message)
+
+        trace_token = _trace.set(trace)
+        span_token = _span.set(root)
+        try:
+            await self.app(scope, receive, wrapped)
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+            root.duration = time.perf_counter() - root.start
+            root.name = f"{scope['method']} {route_template(scope)}"
+            root.attributes["status"] = status
+            _record(trace)
@@ -0,0 +1,139 @@
+"""Post-commit hooks for ledger and profile writes.
+
+Every ``Transaction`` and ``User`` row flushed by a session is staged on that
+session and handed to the registered listeners once the surrounding database
+transaction commits. Rolled back work is discarded, so listeners only ever see
+data that is durable in Postgres.
+
+Listeners run synchronously inside ``commit()`` and must not do any I/O; they
+are meant for keeping in-process structures (rank indexes, caches) current.
+Writers that bypass the ORM (bulk ``INSERT ... SELECT``, ``COPY``) should call
+``stage_ledger_entries`` / ``stage_user_profiles`` themselves.
+"""
+from __future__ import annotations
+
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.models import Transaction, User
+
+logger = logging.getLogger(__name__)
+
+_STAGED_KEY = "committed_batch"
+
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    user_id: int
+    amount: int
+    type: str
+    created_at: datetime
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    id: int
+    username: str
+    full_name: str | None
+
+
+@dataclass
+class CommitBatch:
+    ledger: list[LedgerEntry] = field(default_factory=list)
+    users: list[UserProfile] = field(default_factory=list)
+
+
+CommitListener = Callable[[CommitBatch], None]
+
+_listeners: list[CommitListener] = []
+
+
+def on_commit(listener: CommitListener) -> CommitListener:
+    """Register a listener for committed ledger/profile writes. Usable as a decorator."""
+    _listeners.append(listener)
+    return listener
+
+
+def _staged(session: Session | AsyncSession) -> CommitBatch:
+    if isinstance(session, AsyncSession):
+        session = session.sync_session
+    batch = session.info.get(_STAGED_KEY)
+    if batch is None:
+        batch = session.info[_STAGED_KEY] = CommitBatch()
+    return batch
+
+
+def stage_ledger_entries(session: Session | AsyncSession, entries: Iterable[LedgerEntry]) -> None:
+    """Stage ledger rows written outside the ORM so listeners see them on commit."""
+    _staged(session).ledger.extend(entries)
+
+
+def stage_user_profiles(session: Session | AsyncSession, profiles: Iterable[UserProfile]) -> None:
+    """Stage user rows written outside the ORM so listeners see them on commit."""
+    _staged(session).users.extend(profiles)
+
+
+@asynccontextmanager
+async def savepoint(session: AsyncSession) -> AsyncIterator[None]:
+    """``session.begin_nested()`` that also forgets rows staged inside it if
+    the savepoint is rolled back, so listeners never see them."""
+    batch = _staged(session)
+    ledger, users = len(batch.ledger), len(batch.users)
+    try:
+        async with session.begin_nested():
+            yield
+    except BaseException:
+        del batch.ledger[ledger:]
+        del batch.users[users:]
+        raise
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_rows(session: Session, flush_context) -> None:
+    # Read straight from __dict__: server defaults are not loaded yet and
+    # touching them would trigger a refresh in the middle of the flush.
+    ledger: list[LedgerEntry] = []
+    users: list[UserProfile] = []
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            state = obj.__dict__
+            ledger.append(
+                LedgerEntry(
+                    user_id=state["user_id"],
+                    amount=state["amount"],
+                    type=state["type"],
+                    created_at=state.get("created_at") or datetime.now(timezone.utc),
+                )
+            )
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User) and "username" in obj.__dict__:
+            state = obj.__dict__
+            users.append(UserProfile(id=state["id"], username=state["username"], full_name=state.get("full_name")))
+    if ledger or users:
+        batch = _staged(session)
+        batch.ledger.extend(ledger)
+        batch.users.extend(users)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_rows(session: Session) -> None:
+    batch = session.info.pop(_STAGED_KEY, None)
+    if batch is None or (not batch.ledger and not batch.users):
+        return
+    for listener in _listeners:
+        try:
+            listener(batch)
+        except Exception:
+            logger.exception("Commit listener %r failed", listener)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_rows(session: Session) -> None:
+    session.info.pop(_STAGED_KEY, None)
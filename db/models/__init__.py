@@ -3,3 +3,10 @@ from .transaction import Transaction
 from .request import Request
 from .challenge import Challenge
 from .shop_item import ShopItem
+from .ledger_rollup import LedgerDailyRollup
+from .transaction_archive import TransactionArchive
+from .media_blob import MediaBlob
+from .shop_reservation import ShopReservation, ShopPurchaseCount
+from .challenge_completion import ChallengeCompletion
+from .webhook_inbox import WebhookInboxEvent
+from .job import Job
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from db.base import Base
+from utils.media import media_url
 
 
 class Challenge(Base):
@@ -10,6 +11,20 @@ class Challenge(Base):
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     reward = Column(Integer, nullable=False)
-    image = Column(Text, nullable=True)
+    # Derivatives of the uploaded image: full size, listing card and thumbnail
+    image_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
+    image_card_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
+    image_thumb_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    @property
+    def image_url(self):
+        return media_url(self.image_hash)
+
+    @property
+    def card_url(self):
+        return media_url(self.image_card_hash or self.image_hash)
+
+    @property
+    def thumbnail_url(self):
+        return media_url(self.image_thumb_hash or self.image_hash)
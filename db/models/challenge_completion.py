@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+from db.base import Base
+
+
+class ChallengeCompletion(Base):
+    """A student's completion of a challenge.
+
+    ``status`` is ``"pending"`` until an admin approves it, then ``"paid"``.
+    One row per (challenge, student); ``paid_at`` is set in the same
+    statement that credits the reward, which is what stops double payment.
+    """
+
+    __tablename__ = "challenge_completions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    challenge_id = Column(Integer, ForeignKey("challenges.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    reward = Column(Integer, nullable=True)
+    approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    paid_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("challenge_id", "user_id", name="uq_challenge_completions_challenge_id_user_id"),
+        Index("ix_challenge_completions_user_id", "user_id"),
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from db.base import Base
+
+
+class Job(Base):
+    """A unit of background work (see ``services.job_service``).
+
+    Jobs are enqueued in the same transaction as the write that needs them
+    and deleted once they succeed. A job that keeps failing ends up with
+    ``status = 'failed'`` and stays for inspection.
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_queued_run_at", "run_at", "id", postgresql_where=text("status = 'queued'")),
+    )
@@ -0,0 +1,75 @@
+from sqlalchemy import BigInteger, Column, Date, DDL, ForeignKey, Index, Integer, String, event
+from db.base import Base
+
+
+class LedgerDailyRollup(Base):
+    """Per-user, per-day, per-type totals of the transactions ledger.
+
+    Maintained by a statement-level trigger on ``transactions`` so every writer,
+    ORM or bulk SQL, keeps it current inside its own database transaction.
+    Days are UTC calendar days.
+    """
+
+    __tablename__ = "ledger_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    credited = Column(BigInteger, nullable=False, default=0)
+    debited = Column(BigInteger, nullable=False, default=0)
+    tx_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_ledger_daily_rollups_day_user_id", "day", "user_id"),
+    )
+
+
+ROLLUP_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION ledger_daily_rollups_apply() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO ledger_daily_rollups AS r (user_id, day, type, credited, debited, tx_count)
+    SELECT user_id,
+           (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date,
+           type,
+           SUM(GREATEST(amount, 0)),
+           SUM(LEAST(amount, 0)),
+           COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (user_id, day, type) DO UPDATE
+    SET credited = r.credited + EXCLUDED.credited,
+        debited = r.debited + EXCLUDED.debited,
+        tx_count = r.tx_count + EXCLUDED.tx_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+ROLLUP_TRIGGER_SQL = """
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger WHERE tgname = 'transactions_ledger_daily_rollups'
+    ) THEN
+        CREATE TRIGGER transactions_ledger_daily_rollups
+        AFTER INSERT ON transactions
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ledger_daily_rollups_apply();
+    END IF;
+END
+$$
+"""
+
+# Keep AUTO_CREATE_TABLES (create_all) in step with the Alembic migration.
+# Attached to the metadata so it runs once both tables exist.
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(ROLLUP_FUNCTION_SQL).execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(ROLLUP_TRIGGER_SQL).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func
+from db.base import Base
+
+
+class MediaBlob(Base):
+    """Content-addressed binary store, keyed by the SHA-256 of ``data``."""
+
+    __tablename__ = "media_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    data = deferred(Column(LargeBinary, nullable=False))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from db.base import Base
@@ -19,3 +19,21 @@ class Request(Base):
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_requests")
     recipient = relationship("User", foreign_keys=[recipient_id], backref="received_requests")
 
+    # Partial indexes over open requests only: the expiry sweep and the
+    # "active" inbox stay small however many closed requests pile up
+    __table_args__ = (
+        Index("ix_requests_active_created_at", "created_at", postgresql_where=text("is_active")),
+        Index(
+            "ix_requests_active_sender_id_created_at",
+            "sender_id",
+            "created_at",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_requests_active_recipient_id_created_at",
+            "recipient_id",
+            "created_at",
+            postgresql_where=text("is_active"),
+        ),
+    )
+
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import CheckConstraint, Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from db.base import Base
+from utils.media import media_url
 
 
 class ShopItem(Base):
@@ -10,5 +11,28 @@ class ShopItem(Base):
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Integer, nullable=False)
-    image = Column(Text, nullable=True)  # Base64 encoded image
+    # Units left for sale; NULL means unlimited
+    stock = Column(Integer, nullable=True)
+    # Most units one user may buy; NULL means no limit
+    per_user_limit = Column(Integer, nullable=True)
+    # Derivatives of the uploaded image: full size, listing card and thumbnail
+    image_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
+    image_card_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
+    image_thumb_hash = Column(String(64), ForeignKey("media_blobs.hash"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        CheckConstraint("stock >= 0", name="ck_shop_items_stock_non_negative"),
+    )
+
+    @property
+    def image_url(self):
+        return media_url(self.image_hash)
+
+    @property
+    def card_url(self):
+        return media_url(self.image_card_hash or self.image_hash)
+
+    @property
+    def thumbnail_url(self):
+        return media_url(self.image_thumb_hash or self.image_hash)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.sql import func
+from db.base import Base
+
+
+class ShopReservation(Base):
+    """One unit of a limited-stock item held for a user until ``expires_at``.
+
+    The unit is already taken out of ``shop_items.stock``; confirming the
+    reservation charges the user, letting it expire puts the unit back.
+    """
+
+    __tablename__ = "shop_reservations"
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("shop_items.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_shop_reservations_expires_at", "expires_at"),
+        Index("ix_shop_reservations_user_id", "user_id"),
+    )
+
+
+class ShopPurchaseCount(Base):
+    """Units of an item a user has bought or holds a reservation for.
+
+    Only kept for items with a ``per_user_limit``; the limit is enforced by
+    the conditional upsert on this row.
+    """
+
+    __tablename__ = "shop_purchase_counts"
+
+    item_id = Column(Integer, ForeignKey("shop_items.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    claimed = Column(Integer, nullable=False, default=0)
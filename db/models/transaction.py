@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, DDL, Index, Integer, String, DateTime, ForeignKey, Text, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from db.base import Base
@@ -8,9 +8,15 @@ from db.models.shop_item import ShopItem
 
 
 class Transaction(Base):
+    """Ledger row.
+
+    On Postgres the table is range-partitioned by month on ``created_at``
+    (see ``db/partitions.py``), which is why ``created_at`` is part of the key.
+    """
+
     __tablename__ = "transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     admin_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     amount = Column(Integer, nullable=False)
@@ -19,7 +25,13 @@ class Transaction(Base):
     recipient_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     request_id = Column(Integer, ForeignKey("requests.id"), nullable=True)
     shop_item_id = Column(Integer, ForeignKey("shop_items.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_transactions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_transactions_created_at", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     user = relationship("User", foreign_keys=[user_id], backref="transactions")
     recipient = relationship("User", foreign_keys=[recipient_id], backref="received_transactions")
@@ -40,3 +52,14 @@ class Transaction(Base):
         if self.recipient:
             return self.recipient.full_name or self.recipient.username
         return None
+
+
+# create_all only creates the partitioned parent; give rows somewhere to land
+# until db.partitions.ensure_partitions creates the monthly partitions.
+event.listen(
+    Transaction.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
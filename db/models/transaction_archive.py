@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from db.base import Base
+
+
+class TransactionArchive(Base):
+    """Cold tier of the ledger.
+
+    Same columns as ``transactions`` so the two can be read with a UNION ALL,
+    but without foreign keys or the id index: rows only arrive here in bulk
+    from ``repositories.archive_repository`` and are never updated.
+    """
+
+    __tablename__ = "transactions_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    admin_id = Column(Integer, nullable=True)
+    amount = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    recipient_id = Column(Integer, nullable=True)
+    request_id = Column(Integer, nullable=True)
+    shop_item_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_transactions_archive_user_id_created_at", "user_id", "created_at"),
+        Index("ix_transactions_archive_created_at", "created_at"),
+    )
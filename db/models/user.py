@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, DDL, Integer, String, DateTime, event
 from sqlalchemy.sql import func
 from db.base import Base
 
@@ -16,3 +16,70 @@ class User(Base):
     role = Column(String, default="student", nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by triggers whenever the user gains ledger rows, or a request they
+    # sent or received is created or changes; used as ETag version markers
+    ledger_version = Column(BigInteger, server_default="0", nullable=False)
+    requests_version = Column(BigInteger, server_default="0", nullable=False)
+
+
+# Rows are locked in id order so two writers bumping the same pair of users
+# can't deadlock, and FOR NO KEY UPDATE (all the UPDATE needs) so the lock
+# doesn't wait on the KEY SHARE locks that concurrent inserts referencing the
+# same users hold through their foreign keys. One statement per DDL: asyncpg won't run several at once.
+LEDGER_VERSION_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION users_bump_ledger_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE users AS u SET ledger_version = u.ledger_version + 1
+    FROM (
+        SELECT id FROM users WHERE id IN (SELECT user_id FROM new_rows) ORDER BY id FOR NO KEY UPDATE
+    ) AS t
+    WHERE u.id = t.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+REQUESTS_VERSION_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION users_bump_requests_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE users AS u SET requests_version = u.requests_version + 1
+    FROM (
+        SELECT id FROM users
+        WHERE id IN (SELECT sender_id FROM new_rows UNION SELECT recipient_id FROM new_rows)
+        ORDER BY id FOR NO KEY UPDATE
+    ) AS t
+    WHERE u.id = t.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+VERSION_TRIGGERS_SQL = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'transactions_users_ledger_version') THEN
+        CREATE TRIGGER transactions_users_ledger_version
+        AFTER INSERT ON transactions
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_ledger_version();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'requests_insert_users_requests_version') THEN
+        CREATE TRIGGER requests_insert_users_requests_version
+        AFTER INSERT ON requests
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_requests_version();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'requests_update_users_requests_version') THEN
+        CREATE TRIGGER requests_update_users_requests_version
+        AFTER UPDATE ON requests
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_bump_requests_version();
+    END IF;
+END
+$$
+"""
+
+# Keep AUTO_CREATE_TABLES (create_all) in step with the Alembic migration.
+# Attached to the metadata so it runs once all three tables exist.
+for _sql in (LEDGER_VERSION_FUNCTION_SQL, REQUESTS_VERSION_FUNCTION_SQL, VERSION_TRIGGERS_SQL):
+    event.listen(Base.metadata, "after_create", DDL(_sql).execute_if(dialect="postgresql"))
@@ -0,0 +1,30 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from db.base import Base
+
+
+class WebhookInboxEvent(Base):
+    """A verified webhook delivery waiting to be applied.
+
+    Deliveries are stored as received and acknowledged straight away; a
+    background worker applies them in batches. ``svix_id`` is unique, so a
+    retried delivery is dropped on insert.
+    """
+
+    __tablename__ = "webhook_inbox"
+
+    id = Column(BigInteger, primary_key=True)
+    source = Column(String, nullable=False)
+    svix_id = Column(String, nullable=False, unique=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_webhook_inbox_pending", "id", postgresql_where=text("processed_at IS NULL")),
+        Index("ix_webhook_inbox_processed_at", "processed_at"),
+    )
@@ -0,0 +1,174 @@
+"""Monthly range partitions of the ``transactions`` table.
+
+Partitions are named ``transactions_YYYY_MM`` and cover one UTC calendar month
+of ``created_at``. Rows outside every monthly partition land in
+``transactions_default``; creating a partition moves any such rows out of the
+default partition first, so a late maintenance run never fails.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+_NAME_RE = re.compile(r"^transactions_(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+async def is_partitioned(session: AsyncSession) -> bool:
+    result = await session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:parent))"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return bool(result.scalar())
+
+
+async def list_monthly_partitions(session: AsyncSession) -> list[date]:
+    """Months that currently have an attached partition, oldest first."""
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    months = []
+    for (name,) in result.all():
+        match = _NAME_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def _create_partition(session: AsyncSession, month: date) -> None:
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    has_default = await session.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    stranded = 0
+    if has_default:
+        stranded = await session.scalar(
+            text(
+                f"SELECT count(*) FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= CAST(:lower AS timestamptz) AND created_at < CAST(:upper AS timestamptz)"
+            ),
+            {"lower": lower, "upper": upper},
+        )
+
+    if not stranded:
+        await session.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        )
+        return
+
+    # Attaching over rows still in the default partition would fail, so move
+    # them into a standalone table first. Plain INSERT/DELETE on partitions
+    # does not fire the parent's rollup trigger.
+    bounds = {"lower": lower, "upper": upper}
+    await session.execute(
+        text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    )
+    await session.execute(
+        text(
+            f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} "
+            "WHERE created_at >= CAST(:lower AS timestamptz) AND created_at < CAST(:upper AS timestamptz)"
+        ),
+        bounds,
+    )
+    await session.execute(
+        text(
+            f"DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE created_at >= CAST(:lower AS timestamptz) AND created_at < CAST(:upper AS timestamptz)"
+        ),
+        bounds,
+    )
+    await session.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+    )
+    logger.info("Moved %d rows from %s into %s", stranded, DEFAULT_PARTITION, name)
+
+
+async def ensure_partitions(
+    session: AsyncSession,
+    *,
+    months_ahead: int = 3,
+    months_back: int = 0,
+    today: date | None = None,
+) -> list[str]:
+    """Create partitions from ``months_back`` months before the current month
+    through ``months_ahead`` months after it.
+
+    Safe to run concurrently from several workers; the caller commits.
+    Returns the names of the partitions created.
+    """
+    if not await is_partitioned(session):
+        return []
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('transactions_partitions'))"))
+
+    current = month_start(today or datetime.now(timezone.utc).date())
+    existing = set(await list_monthly_partitions(session))
+    created = []
+    for offset in range(-months_back, months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            await _create_partition(session, month)
+            created.append(partition_name(month))
+    if created:
+        logger.info("Created transaction partitions: %s", ", ".join(created))
+    return created
+
+
+async def detach_partitions_older_than(
+    session: AsyncSession, months: int, *, today: date | None = None
+) -> list[str]:
+    """Detach monthly partitions for months before ``current month - months``.
+
+    Detached partitions stay in the database as ordinary tables so they can be
+    archived or dropped separately. The caller commits.
+    """
+    if not await is_partitioned(session):
+        return []
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('transactions_partitions'))"))
+
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -months)
+    detached = []
+    for month in await list_monthly_partitions(session):
+        if month < cutoff:
+            name = partition_name(month)
+            await session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            detached.append(name)
+    if detached:
+        logger.info("Detached transaction partitions: %s", ", ".join(detached))
+    return detached
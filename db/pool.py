@@ -0,0 +1,79 @@
+"""Connection pool instrumentation.
+
+``MeteredQueuePool`` times every checkout, including the time spent queued
+behind other requests when the pool is exhausted. Admission control reads
+``pool_stats`` to tell a saturated pool from a busy one; the checkout times
+and ``export_pool_gauges`` also feed ``/metrics``.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from core.metrics import Gauge, Histogram
+
+# Checkout latency samples kept for percentiles
+_SAMPLES = 1000
+
+
+@dataclass
+class PoolStats:
+    # Checkouts currently waiting for a connection
+    waiting: int = 0
+    checkouts: int = 0
+    # Checkouts that waited longer than ``slow_threshold`` seconds
+    slow_checkouts: int = 0
+    slow_threshold: float = 0.05
+    # time.monotonic() of the last slow checkout
+    last_slow_at: float = float("-inf")
+    waits: deque = field(default_factory=lambda: deque(maxlen=_SAMPLES))
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.waits.append(seconds)
+        if seconds > self.slow_threshold:
+            self.slow_checkouts += 1
+            self.last_slow_at = time.monotonic()
+
+
+pool_stats = PoolStats()
+
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to check out a pool connection, queueing included.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections the pool keeps open.")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Pool connections in use.")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond the pool size (negative while below it).")
+DB_POOL_WAITING = Gauge("db_pool_waiting", "Checkouts waiting for a connection.")
+
+
+def export_pool_gauges(pool: Pool) -> None:
+    """Copy ``pool``'s current occupancy into the ``db_pool_*`` gauges."""
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(pool.overflow())
+    DB_POOL_WAITING.set(pool_stats.waiting)
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` that records checkout wait in ``pool_stats``.
+
+    Timed around ``connect`` (the whole checkout, pre-ping included) rather
+    than ``_do_get``, which calls itself when it loses an overflow race.
+    """
+
+    def connect(self):
+        pool_stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_stats.waiting -= 1
+            pool_stats.record(elapsed)
+            DB_POOL_CHECKOUT.observe(elapsed)
@@ -10,6 +10,8 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from core.config import get_settings
+from core.tracing import instrument_engine
+from db.pool import MeteredQueuePool, pool_stats
 
 
 settings = get_settings()
@@ -18,7 +20,12 @@ engine: AsyncEngine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     pool_pre_ping=True,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
+pool_stats.slow_threshold = settings.ADMISSION_POOL_WAIT_MS / 1000
+instrument_engine(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
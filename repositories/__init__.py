@@ -3,6 +3,7 @@ from .user_repository import (
     get_user_by_clerk_id,
     get_user_by_email,
     get_user_by_id,
+    get_users_by_ids,
     list_users,
     update_user,
     get_users_with_cumulative_earnings,
@@ -13,13 +14,20 @@ from .transaction_repository import (
     get_all_transactions,
 )
 from .challenge_repository import get_challenges, create_challenge
-from .request_repository import get_requests_by_user_id
+from .request_repository import get_requests_by_user_id, create_requests
+from .rollup_repository import (
+    get_earnings_leaderboard_since,
+    get_daily_net_for_user,
+    get_net_before,
+    get_type_totals_for_user,
+)
 
 __all__ = [
     "create_user",
     "get_user_by_clerk_id",
     "get_user_by_email",
     "get_user_by_id",
+    "get_users_by_ids",
     "list_users",
     "update_user",
     "get_users_with_cumulative_earnings",
@@ -29,4 +37,9 @@ __all__ = [
     "get_challenges",
     "create_challenge",
     "get_requests_by_user_id",
+    "create_requests",
+    "get_earnings_leaderboard_since",
+    "get_daily_net_for_user",
+    "get_net_before",
+    "get_type_totals_for_user",
 ]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import Transaction, TransactionArchive
+
+LEDGER_COLUMNS = (
+    "id",
+    "user_id",
+    "admin_id",
+    "amount",
+    "type",
+    "description",
+    "recipient_id",
+    "request_id",
+    "shop_item_id",
+    "created_at",
+)
+
+
+async def archive_transactions_batch(
+    session: AsyncSession, before: datetime, *, batch_size: int = 5000
+) -> int:
+    """Move up to ``batch_size`` transactions created before ``before`` into the archive.
+
+    Runs as a single ``DELETE ... RETURNING`` feeding an ``INSERT``, so a row is
+    never in both tiers. Rows locked by other writers are skipped and picked
+    up by a later batch. The caller commits. Returns the number of rows moved.
+    """
+    oldest = (
+        select(Transaction.id, Transaction.created_at)
+        .where(Transaction.created_at < before)
+        .order_by(Transaction.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(Transaction)
+        .where(tuple_(Transaction.id, Transaction.created_at).in_(oldest))
+        .returning(*(getattr(Transaction, name) for name in LEDGER_COLUMNS))
+        .cte("moved")
+    )
+    stmt = insert(TransactionArchive).from_select(
+        list(LEDGER_COLUMNS), select(*(moved.c[name] for name in LEDGER_COLUMNS))
+    )
+    result = await session.execute(stmt)
+    return result.rowcount or 0
+
+
+trace_module(__name__, "repository")
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from typing import List
 
-from sqlalchemy import select
+from sqlalchemy import Row, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import Challenge
+from core.tracing import trace_module
+from db.models import Challenge, ChallengeCompletion
 from schemas.challenge import ChallengeCreate
 
 
@@ -21,19 +23,51 @@ async def get_challenges(
     return list(result.scalars().all())
 
 
-async def create_challenge(session: AsyncSession, challenge_in: ChallengeCreate) -> Challenge:
+async def get_challenges_marker(session: AsyncSession) -> tuple[int, int, int]:
+    """``(count, max id, images rendered)`` of challenges. Challenges are only
+    ever created or deleted, ids are never reused, and the only later update
+    is an image's derivatives being rendered, once, so this changes with
+    every write."""
+    result = await session.execute(
+        select(func.count(), func.coalesce(func.max(Challenge.id), 0), func.count(Challenge.image_card_hash))
+    )
+    count, max_id, rendered = result.one()
+    return count, max_id, rendered
+
+
+async def create_challenge(
+    session: AsyncSession,
+    challenge_in: ChallengeCreate,
+    *,
+    image_hash: str | None = None,
+) -> Challenge:
+    """Insert a challenge without committing."""
     challenge = Challenge(
         title=challenge_in.title,
         description=challenge_in.description,
         reward=challenge_in.reward,
-        image=challenge_in.image,
+        image_hash=image_hash,
     )
     session.add(challenge)
-    await session.commit()
+    await session.flush()
     await session.refresh(challenge)
     return challenge
 
 
+async def set_image_derivatives(
+    session: AsyncSession, challenge_id: int, source: str, *, full: str, card: str, thumb: str
+) -> bool:
+    """Point the challenge at the derivatives rendered from ``source``, unless
+    its image has changed since. Returns whether it was updated."""
+    result = await session.execute(
+        update(Challenge)
+        .where(Challenge.id == challenge_id, Challenge.image_hash == source)
+        .values(image_hash=full, image_card_hash=card, image_thumb_hash=thumb)
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
 async def delete_challenge(session: AsyncSession, challenge_id: int) -> bool:
     challenge = await session.get(Challenge, challenge_id)
     if challenge:
@@ -42,3 +76,104 @@ async def delete_challenge(session: AsyncSession, challenge_id: int) -> bool:
         return True
     return False
 
+
+
+# Marks the listed students' completions paid and credits them, in one
+# statement. The upsert creates completions that were never submitted; its
+# ``paid_at IS NULL`` guard is re-checked under the row lock, so a student
+# already paid (or being paid concurrently) drops out of ``paid`` and is not
+# credited again. Students are locked in id order before their completion
+# rows, so overlapping payouts queue instead of deadlocking.
+_PAY_COMPLETIONS_SQL = text("""
+WITH approved AS (
+    SELECT u.id AS user_id FROM users AS u
+    WHERE u.id = ANY(CAST(:user_ids AS integer[]))
+    ORDER BY u.id
+    FOR UPDATE
+),
+paid AS (
+    INSERT INTO challenge_completions AS c
+        (challenge_id, user_id, status, reward, approved_by, paid_at)
+    SELECT :challenge_id, approved.user_id, 'paid',
+           (SELECT reward FROM challenges WHERE id = :challenge_id), :admin_id, now()
+    FROM approved
+    ON CONFLICT (challenge_id, user_id) DO UPDATE
+        SET status = 'paid', reward = excluded.reward,
+            approved_by = excluded.approved_by, paid_at = excluded.paid_at
+        WHERE c.paid_at IS NULL
+    RETURNING c.user_id, c.reward
+),
+credited AS (
+    UPDATE users AS u SET balance = u.balance + paid.reward
+    FROM paid
+    WHERE u.id = paid.user_id
+)
+INSERT INTO transactions (user_id, admin_id, amount, type, description)
+SELECT paid.user_id, :admin_id, paid.reward, 'challenge_reward',
+       'Challenge reward: ' || (SELECT title FROM challenges WHERE id = :challenge_id)
+FROM paid
+RETURNING id, user_id, amount, type, created_at
+""")
+
+
+async def get_challenge(session: AsyncSession, challenge_id: int) -> Challenge | None:
+    return await session.get(Challenge, challenge_id)
+
+
+async def create_completion(
+    session: AsyncSession, challenge_id: int, user_id: int
+) -> ChallengeCompletion | None:
+    """Record a pending completion; ``None`` if the student already has one."""
+    stmt = (
+        pg_insert(ChallengeCompletion)
+        .values(challenge_id=challenge_id, user_id=user_id, status="pending")
+        .on_conflict_do_nothing(constraint="uq_challenge_completions_challenge_id_user_id")
+        .returning(ChallengeCompletion)
+    )
+    result = await session.execute(select(ChallengeCompletion).from_statement(stmt))
+    return result.scalar()
+
+
+async def get_completions(
+    session: AsyncSession,
+    challenge_id: int,
+    *,
+    status: str | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> List[ChallengeCompletion]:
+    stmt = select(ChallengeCompletion).where(ChallengeCompletion.challenge_id == challenge_id)
+    if status is not None:
+        stmt = stmt.where(ChallengeCompletion.status == status)
+    result = await session.execute(
+        stmt.order_by(ChallengeCompletion.created_at, ChallengeCompletion.id).offset(offset).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def get_pending_completion_user_ids(session: AsyncSession, challenge_id: int) -> List[int]:
+    result = await session.execute(
+        select(ChallengeCompletion.user_id).where(
+            ChallengeCompletion.challenge_id == challenge_id,
+            ChallengeCompletion.paid_at.is_(None),
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def pay_completions(
+    session: AsyncSession, challenge_id: int, user_ids: List[int], *, admin_id: int | None
+) -> List[Row]:
+    """Pay the challenge reward to every listed student not already paid.
+
+    Returns one ``(id, user_id, amount, type, created_at)`` row per ledger entry
+    written. The caller commits.
+    """
+    result = await session.execute(
+        _PAY_COMPLETIONS_SQL,
+        {"challenge_id": challenge_id, "user_ids": list(user_ids), "admin_id": admin_id},
+    )
+    return list(result.all())
+
+
+trace_module(__name__, "repository")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, List
+
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import Job
+
+
+def add_job(
+    session: AsyncSession,
+    *,
+    kind: str,
+    payload: dict[str, Any],
+    max_attempts: int,
+    run_at: datetime | None = None,
+) -> Job:
+    """Add a job to the session; it is written with the caller's commit."""
+    job = Job(kind=kind, payload=payload, max_attempts=max_attempts, status="queued")
+    if run_at is not None:
+        job.run_at = run_at
+    session.add(job)
+    return job
+
+
+async def claim_jobs(session: AsyncSession, *, batch_size: int) -> List[Row]:
+    """Lock up to ``batch_size`` due jobs, oldest first, skipping rows another
+    worker holds. The locks last until the caller's transaction ends.
+
+    Returns ``(id, kind, payload, attempts, max_attempts, run_at)`` rows.
+    """
+    result = await session.execute(
+        select(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.run_at)
+        .where(Job.status == "queued", Job.run_at <= func.now())
+        .order_by(Job.run_at, Job.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.all())
+
+
+async def delete_jobs(session: AsyncSession, job_ids: List[int]) -> None:
+    if not job_ids:
+        return
+    await session.execute(
+        delete(Job).where(Job.id.in_(job_ids)).execution_options(synchronize_session=False)
+    )
+
+
+async def retry_job(session: AsyncSession, job_id: int, *, attempts: int, run_at: datetime, error: str) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(attempts=attempts, run_at=run_at, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def fail_job(session: AsyncSession, job_id: int, *, attempts: int, error: str) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status="failed", attempts=attempts, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_queue_depth(session: AsyncSession) -> List[Row]:
+    """Per kind: ``(kind, queued, ready, failed, oldest_ready_at)``.
+
+    ``ready`` counts queued jobs that are due; ``oldest_ready_at`` is the
+    ``run_at`` of the longest-waiting one.
+    """
+    due = (Job.status == "queued") & (Job.run_at <= func.now())
+    result = await session.execute(
+        select(
+            Job.kind,
+            func.count().filter(Job.status == "queued").label("queued"),
+            func.count().filter(due).label("ready"),
+            func.count().filter(Job.status == "failed").label("failed"),
+            func.min(Job.run_at).filter(due).label("oldest_ready_at"),
+        )
+        .group_by(Job.kind)
+        .order_by(Job.kind)
+    )
+    return list(result.all())
+
+
+trace_module(__name__, "repository")
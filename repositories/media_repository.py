@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import MediaBlob
+
+
+async def put_blob(session: AsyncSession, digest: str, content_type: str, data: bytes) -> None:
+    """Store ``data`` under its hash. Storing the same content twice is a no-op."""
+    await session.execute(
+        insert(MediaBlob)
+        .values(hash=digest, content_type=content_type, size=len(data), data=data)
+        .on_conflict_do_nothing(index_elements=[MediaBlob.hash])
+    )
+
+
+async def get_blob_meta(session: AsyncSession, digest: str) -> Optional[MediaBlob]:
+    result = await session.execute(select(MediaBlob).where(MediaBlob.hash == digest))
+    return result.scalars().first()
+
+
+async def read_blob(session: AsyncSession, digest: str, start: int = 0, length: int | None = None) -> bytes:
+    """Read ``length`` bytes from ``start``; slicing happens in Postgres."""
+    column = MediaBlob.data if length is None else func.substring(MediaBlob.data, start + 1, length)
+    result = await session.execute(select(column).where(MediaBlob.hash == digest))
+    return bytes(result.scalar_one())
+
+
+trace_module(__name__, "repository")
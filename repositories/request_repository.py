@@ -1,21 +1,73 @@
-from sqlalchemy import select, or_
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Row, func, insert, select, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from core.tracing import trace_module
 from db.models import Request
 
 
 async def get_requests_by_user_id(
-    db: AsyncSession, user_id: int, offset: int = 0, limit: int = 100
+    db: AsyncSession,
+    user_id: int,
+    offset: int = 0,
+    limit: int = 100,
+    *,
+    with_users: bool = True,
+    active_only: bool = False,
 ) -> list[Request]:
     stmt = (
         select(Request)
-        .options(selectinload(Request.sender), selectinload(Request.recipient))
         .where(or_(Request.sender_id == user_id, Request.recipient_id == user_id))
         .order_by(Request.created_at.desc())
         .offset(offset)
         .limit(limit)
     )
+    if active_only:
+        stmt = stmt.where(Request.is_active.is_(True))
+    if with_users:
+        stmt = stmt.options(selectinload(Request.sender), selectinload(Request.recipient))
     result = await db.execute(stmt)
     return list(result.scalars().all())
 
+
+async def create_requests(db: AsyncSession, rows: list[dict]) -> list[Request]:
+    """Insert many requests with one multi-row ``INSERT ... RETURNING``.
+
+    The caller commits. Relationships are not loaded.
+    """
+    if not rows:
+        return []
+    result = await db.scalars(insert(Request).returning(Request, sort_by_parameter_order=True), rows)
+    return list(result.all())
+
+
+async def expire_requests_batch(
+    db: AsyncSession, before: datetime, *, batch_size: int = 1000
+) -> List[Row]:
+    """Expire up to ``batch_size`` active requests created before ``before``.
+
+    Rows locked by another worker (or by a payment in progress) are skipped
+    and picked up by a later batch. The caller commits. Returns the expired
+    requests' ``id, sender_id, recipient_id, amount, status``.
+    """
+    stale = (
+        select(Request.id)
+        .where(Request.is_active.is_(True), Request.created_at < before)
+        .order_by(Request.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(Request)
+        .where(Request.id.in_(stale))
+        .values(is_active=False, status="expired", updated_at=func.now())
+        .returning(Request.id, Request.sender_id, Request.recipient_id, Request.amount, Request.status)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.all())
+
+
+trace_module(__name__, "repository")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, List
+
+from sqlalchemy import select
+from sqlalchemy.sql import func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import LedgerDailyRollup, User
+
+
+async def get_earnings_leaderboard_since(
+    session: AsyncSession, since: date, *, offset: int = 0, limit: int = 100
+) -> List[Any]:
+    earned = func.sum(LedgerDailyRollup.credited)
+    stmt = (
+        select(
+            User.id,
+            User.username,
+            User.full_name,
+            earned.label("cumulative_earned"),
+        )
+        .join(LedgerDailyRollup, LedgerDailyRollup.user_id == User.id)
+        .where(LedgerDailyRollup.day >= since)
+        .group_by(User.id)
+        .having(earned > 0)
+        .order_by(earned.desc(), User.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def get_daily_net_for_user(
+    session: AsyncSession, user_id: int, since: date
+) -> List[Any]:
+    stmt = (
+        select(
+            LedgerDailyRollup.day,
+            func.sum(LedgerDailyRollup.credited + LedgerDailyRollup.debited).label("net"),
+        )
+        .where(LedgerDailyRollup.user_id == user_id, LedgerDailyRollup.day >= since)
+        .group_by(LedgerDailyRollup.day)
+        .order_by(LedgerDailyRollup.day)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def get_net_before(session: AsyncSession, user_id: int, before: date) -> int:
+    stmt = select(
+        func.coalesce(func.sum(LedgerDailyRollup.credited + LedgerDailyRollup.debited), 0)
+    ).where(LedgerDailyRollup.user_id == user_id, LedgerDailyRollup.day < before)
+    result = await session.execute(stmt)
+    return int(result.scalar_one())
+
+
+async def get_type_totals_for_user(
+    session: AsyncSession, user_id: int, since: date
+) -> List[Any]:
+    stmt = (
+        select(
+            LedgerDailyRollup.type,
+            func.sum(LedgerDailyRollup.credited).label("credited"),
+            func.sum(LedgerDailyRollup.debited).label("debited"),
+            func.sum(LedgerDailyRollup.tx_count).label("count"),
+        )
+        .where(LedgerDailyRollup.user_id == user_id, LedgerDailyRollup.day >= since)
+        .group_by(LedgerDailyRollup.type)
+        .order_by(LedgerDailyRollup.type)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+trace_module(__name__, "repository")
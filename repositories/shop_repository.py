@@ -1,14 +1,119 @@
+from datetime import datetime
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select, text, update
+from core.tracing import trace_module
 from db.models.shop_item import ShopItem
+from db.models.shop_reservation import ShopPurchaseCount, ShopReservation
+from db.models.transaction import Transaction
+
+# Takes one unit of :item_id for :user_id. ``stocked`` decrements limited
+# stock and ``claimed`` bumps the user's count for limited items; both are
+# conditional writes whose conditions Postgres re-checks under the row lock,
+# so concurrent buyers can't oversell or exceed the limit. ``taken`` holds
+# the item only if every check passed. Statements built on this produce no
+# row on failure, and the caller must roll back to undo the partial writes.
+_TAKE_UNIT = """
+item AS (
+    SELECT id, title, price, stock, per_user_limit FROM shop_items WHERE id = :item_id
+),
+stocked AS (
+    UPDATE shop_items AS s SET stock = s.stock - 1
+    FROM item
+    WHERE s.id = item.id AND item.stock IS NOT NULL AND s.stock > 0
+    RETURNING s.id
+),
+claimed AS (
+    INSERT INTO shop_purchase_counts AS c (item_id, user_id, claimed)
+    SELECT item.id, :user_id, 1 FROM item
+    WHERE item.per_user_limit > 0
+      AND (item.stock IS NULL OR EXISTS (SELECT 1 FROM stocked))
+    ON CONFLICT (item_id, user_id) DO UPDATE SET claimed = c.claimed + 1
+    WHERE c.claimed < (SELECT per_user_limit FROM shop_items WHERE id = c.item_id)
+    RETURNING c.item_id
+),
+taken AS (
+    SELECT item.* FROM item
+    WHERE (item.stock IS NULL OR EXISTS (SELECT 1 FROM stocked))
+      AND (item.per_user_limit IS NULL OR EXISTS (SELECT 1 FROM claimed))
+)
+"""
+
+# Charges :user_id for ``taken`` and writes the ledger row
+_CHARGE = """
+paid AS (
+    UPDATE users AS u SET balance = u.balance - taken.price
+    FROM taken
+    WHERE u.id = :user_id AND u.balance >= taken.price
+    RETURNING u.id
+)
+INSERT INTO transactions (user_id, amount, type, description, shop_item_id)
+SELECT paid.id, -taken.price, 'shop_purchase', 'Purchased: ' || taken.title, taken.id
+FROM paid, taken
+RETURNING transactions.*
+"""
+
+_PURCHASE_SQL = f"WITH {_TAKE_UNIT}, {_CHARGE}"
+
+_RESERVE_SQL = f"""
+WITH {_TAKE_UNIT}
+INSERT INTO shop_reservations (item_id, user_id, expires_at)
+SELECT taken.id, :user_id, now() + make_interval(secs => :hold_seconds) FROM taken
+RETURNING shop_reservations.*
+"""
+
+_CONFIRM_SQL = f"""
+WITH held AS (
+    DELETE FROM shop_reservations
+    WHERE id = :reservation_id AND user_id = :user_id AND expires_at > now()
+    RETURNING item_id
+),
+taken AS (
+    SELECT s.id, s.title, s.price FROM shop_items AS s JOIN held ON held.item_id = s.id
+),
+{_CHARGE}
+"""
+
+# Deletes the reservations selected by ``{where}`` and gives their units back
+# to stock and to the users' per-item counts
+_RELEASE_SQL = """
+WITH released AS (
+    DELETE FROM shop_reservations
+    WHERE id IN (
+        SELECT id FROM shop_reservations
+        WHERE {where}
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING item_id, user_id
+),
+restocked AS (
+    UPDATE shop_items AS s SET stock = s.stock + r.n
+    FROM (SELECT item_id, count(*) AS n FROM released GROUP BY item_id) AS r
+    WHERE s.id = r.item_id AND s.stock IS NOT NULL
+),
+unclaimed AS (
+    UPDATE shop_purchase_counts AS c SET claimed = c.claimed - r.n
+    FROM (SELECT item_id, user_id, count(*) AS n FROM released GROUP BY item_id, user_id) AS r
+    WHERE c.item_id = r.item_id AND c.user_id = r.user_id
+)
+SELECT count(*) FROM released
+"""
 
 
 class ShopRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all(self) -> list[ShopItem]:
-        stmt = select(ShopItem)
+    async def get_page(self, *, offset: int = 0, limit: int = 100) -> list[ShopItem]:
+        """Catalog page, newest first; ties broken by id so pages are stable."""
+        stmt = (
+            select(ShopItem)
+            .order_by(ShopItem.created_at.desc(), ShopItem.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
@@ -26,3 +131,78 @@ class ShopRepository:
     async def delete(self, item: ShopItem) -> None:
         await self.session.delete(item)
         await self.session.flush()
+
+    async def set_image_derivatives(
+        self, item_id: int, source: str, *, full: str, card: str, thumb: str
+    ) -> bool:
+        """Point the item at the derivatives rendered from ``source``, unless
+        its image has changed since. Returns whether it was updated."""
+        result = await self.session.execute(
+            update(ShopItem)
+            .where(ShopItem.id == item_id, ShopItem.image_hash == source)
+            .values(image_hash=full, image_card_hash=card, image_thumb_hash=thumb)
+            .execution_options(synchronize_session=False)
+        )
+        return bool(result.rowcount)
+
+    async def purchase(self, item_id: int, user_id: int) -> Transaction | None:
+        """Take a unit, charge the user and record the purchase in one statement.
+
+        Returns ``None`` if any check failed; the caller must then roll back.
+        """
+        stmt = select(Transaction).from_statement(text(_PURCHASE_SQL))
+        result = await self.session.execute(stmt, {"item_id": item_id, "user_id": user_id})
+        return result.scalar()
+
+    async def reserve(self, item_id: int, user_id: int, hold_seconds: int) -> ShopReservation | None:
+        """Take a unit and hold it for ``hold_seconds`` without charging.
+
+        Returns ``None`` if the item is sold out or the user is at their
+        limit; the caller must then roll back.
+        """
+        stmt = select(ShopReservation).from_statement(text(_RESERVE_SQL))
+        result = await self.session.execute(
+            stmt, {"item_id": item_id, "user_id": user_id, "hold_seconds": hold_seconds}
+        )
+        return result.scalar()
+
+    async def confirm_reservation(self, reservation_id: int, user_id: int) -> Transaction | None:
+        """Charge for a live reservation and record the purchase in one statement.
+
+        Returns ``None`` if the reservation is gone or expired, or the user
+        can't afford it; the caller must then roll back.
+        """
+        stmt = select(Transaction).from_statement(text(_CONFIRM_SQL))
+        result = await self.session.execute(
+            stmt, {"reservation_id": reservation_id, "user_id": user_id}
+        )
+        return result.scalar()
+
+    async def get_reservation(self, reservation_id: int) -> ShopReservation | None:
+        return await self.session.get(ShopReservation, reservation_id)
+
+    async def release_reservation(self, reservation_id: int, user_id: int) -> bool:
+        result = await self.session.execute(
+            text(_RELEASE_SQL.format(where="id = :reservation_id AND user_id = :user_id")),
+            {"reservation_id": reservation_id, "user_id": user_id, "batch_size": 1},
+        )
+        return bool(result.scalar())
+
+    async def release_expired_reservations(self, now: datetime, *, batch_size: int = 1000) -> int:
+        """Release up to ``batch_size`` expired reservations; returns how many."""
+        result = await self.session.execute(
+            text(_RELEASE_SQL.format(where="expires_at <= :now")),
+            {"now": now, "batch_size": batch_size},
+        )
+        return result.scalar() or 0
+
+    async def get_claimed(self, item_id: int, user_id: int) -> int:
+        result = await self.session.execute(
+            select(func.coalesce(func.max(ShopPurchaseCount.claimed), 0)).where(
+                ShopPurchaseCount.item_id == item_id, ShopPurchaseCount.user_id == user_id
+            )
+        )
+        return result.scalar_one()
+
+
+trace_module(__name__, "repository")
@@ -1,49 +1,129 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Row, Select, func, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import Transaction
+from core.config import get_settings
+from core.tracing import trace_module
+from db.models import Transaction, TransactionArchive, User
+from repositories.archive_repository import LEDGER_COLUMNS
 from schemas.transaction import TransactionCreate
 
+settings = get_settings()
 
-async def get_transactions_by_user_id(
-    session: AsyncSession, user_id: int, *, offset: int = 0, limit: int = 100
-) -> List[Transaction]:
-    result = await session.execute(
-        select(Transaction)
-        .where(Transaction.user_id == user_id)
-        .options(
-            selectinload(Transaction.user),
-            selectinload(Transaction.recipient)
+
+def _ledger_filters(table, user_id: int | None, since: datetime | None, until: datetime | None) -> list:
+    filters = []
+    if user_id is not None:
+        filters.append(table.c.user_id == user_id)
+    if since is not None:
+        filters.append(table.c.created_at >= since)
+    if until is not None:
+        filters.append(table.c.created_at < until)
+    return filters
+
+
+def _reaches_archive(since: datetime | None) -> bool:
+    """Whether rows at or after ``since`` may have been moved to the archive tier."""
+    days = settings.TRANSACTION_ARCHIVE_AFTER_DAYS
+    if since is None or days <= 0:
+        return True
+    return since < datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _display_name(users):
+    # Mirrors Transaction.user_name: full_name, falling back to username
+    return func.coalesce(func.nullif(users.c.full_name, ""), users.c.username)
+
+
+def transactions_query(
+    *,
+    user_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Select:
+    """Newest-first ledger listing across the hot table and the archive.
+
+    Projects exactly the columns ``TransactionRead`` needs and resolves the
+    user and recipient display names with joins, so a page is one query of
+    plain rows instead of ORM objects plus two relationship loads.
+
+    ``since``/``until`` bound ``created_at`` (inclusive/exclusive) and let
+    Postgres prune monthly partitions outside the range. The archive is only
+    included when the range can reach past the hot window; both branches are
+    index-ordered, so recent pages stop after a probe of the archive index.
+    """
+    hot = Transaction.__table__
+    if _reaches_archive(since):
+        cold = TransactionArchive.__table__
+        ledger = union_all(
+            select(*(hot.c[name] for name in LEDGER_COLUMNS)).where(*_ledger_filters(hot, user_id, since, until)),
+            select(*(cold.c[name] for name in LEDGER_COLUMNS)).where(*_ledger_filters(cold, user_id, since, until)),
+        ).subquery("ledger")
+        filters = []
+    else:
+        ledger = hot
+        filters = _ledger_filters(hot, user_id, since, until)
+
+    owner = User.__table__.alias("owner")
+    counterparty = User.__table__.alias("counterparty")
+    return (
+        select(
+            ledger.c.id,
+            ledger.c.amount,
+            ledger.c.type,
+            ledger.c.description,
+            ledger.c.created_at,
+            ledger.c.shop_item_id,
+            _display_name(owner).label("user_name"),
+            _display_name(counterparty).label("recipient_name"),
         )
-        .order_by(Transaction.created_at.desc())
+        .select_from(ledger)
+        .outerjoin(owner, owner.c.id == ledger.c.user_id)
+        .outerjoin(counterparty, counterparty.c.id == ledger.c.recipient_id)
+        .where(*filters)
+        .order_by(ledger.c.created_at.desc())
         .offset(offset)
         .limit(limit)
     )
-    return list(result.scalars().all())
+
+
+async def get_transactions_by_user_id(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> List[Row]:
+    result = await session.execute(
+        transactions_query(user_id=user_id, since=since, until=until, offset=offset, limit=limit)
+    )
+    return list(result.all())
 
 
 async def get_all_transactions(
-    session: AsyncSession, *, offset: int = 0, limit: int = 100
-) -> List[Transaction]:
+    session: AsyncSession,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> List[Row]:
     result = await session.execute(
-        select(Transaction)
-        .options(
-            selectinload(Transaction.user),
-            selectinload(Transaction.recipient)
-        )
-        .order_by(Transaction.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+        transactions_query(since=since, until=until, offset=offset, limit=limit)
     )
-    return list(result.scalars().all())
+    return list(result.all())
 
 
-async def create_transaction(session: AsyncSession, transaction_in: TransactionCreate) -> Transaction:
+async def add_transaction(session: AsyncSession, transaction_in: TransactionCreate) -> Transaction:
+    """Insert a ledger row without committing."""
     transaction = Transaction(
         user_id=transaction_in.user_id,
         admin_id=transaction_in.admin_id,
@@ -52,8 +132,18 @@ async def create_transaction(session: AsyncSession, transaction_in: TransactionC
         description=transaction_in.description,
         recipient_id=transaction_in.recipient_id,
         request_id=transaction_in.request_id,
+        shop_item_id=transaction_in.shop_item_id,
     )
     session.add(transaction)
+    await session.flush()
+    return transaction
+
+
+async def create_transaction(session: AsyncSession, transaction_in: TransactionCreate) -> Transaction:
+    transaction = await add_transaction(session, transaction_in)
     await session.commit()
     await session.refresh(transaction)
     return transaction
+
+
+trace_module(__name__, "repository")
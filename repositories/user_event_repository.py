@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+
+# One notification per event. The balances are read in the writer's own
+# transaction, so each notification carries the balance its write left behind.
+_NOTIFY_SQL = text("""
+SELECT pg_notify(:channel, json_build_object(
+    'user_id', u.id,
+    'event', e.event,
+    'balance', u.balance,
+    'gift_balance', u.gift_balance,
+    'data', CAST(e.data AS json)
+)::text)
+FROM unnest(CAST(:user_ids AS integer[]), CAST(:events AS varchar[]), CAST(:data AS text[]))
+     AS e(user_id, event, data)
+JOIN users AS u ON u.id = e.user_id
+""")
+
+_BALANCES_SQL = text("SELECT balance, gift_balance FROM users WHERE id = :user_id")
+
+
+async def notify_user_events(
+    session: AsyncSession, channel: str, events: Iterable[tuple[int, str, str]]
+) -> None:
+    """Queue ``(user_id, event, data_json)`` notifications on ``channel``.
+
+    Postgres delivers them when the caller commits, and drops them if it
+    rolls back. Pending ORM changes must be flushed first.
+    """
+    events = list(events)
+    if not events:
+        return
+    await session.execute(
+        _NOTIFY_SQL,
+        {
+            "channel": channel,
+            "user_ids": [user_id for user_id, _, _ in events],
+            "events": [event for _, event, _ in events],
+            "data": [data for _, _, data in events],
+        },
+    )
+
+
+async def get_balances(session: AsyncSession, user_id: int) -> tuple[int, int] | None:
+    """``(balance, gift_balance)`` as currently committed, bypassing the identity map."""
+    row = (await session.execute(_BALANCES_SQL, {"user_id": user_id})).first()
+    return None if row is None else (row.balance, row.gift_balance)
+
+
+trace_module(__name__, "repository")
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, List
+
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import User
+from repositories.user_repository import _generate_base_username
+from utils.clerk_export import ClerkExportUser
+
+STAGING_TABLE = "user_import_staging"
+_STAGING_COLUMNS = ("seq", "clerk_user_id", "email", "full_name", "base_username")
+
+# Latest export row per Clerk user
+_SOURCE = f"""
+src AS (
+    SELECT DISTINCT ON (clerk_user_id) seq, clerk_user_id, email, full_name, base_username
+    FROM {STAGING_TABLE}
+    ORDER BY clerk_user_id, seq DESC
+)"""
+
+# Applies the whole staging table in one statement:
+# - ``linked`` backfills clerk_user_id (and the name) on accounts that predate
+#   it, by email;
+# - ``updated`` refreshes email and name of users already linked (an email
+#   another account holds is left alone, an empty name keeps ours);
+# - ``inserted`` creates everyone else with a username taken from their name
+#   (base username if it is free and first in the batch, else base plus a
+#   random suffix, as ``_generate_unique_username`` does), and ``bonus``
+#   writes their welcome bonus.
+# All CTEs see the same snapshot and touch disjoint rows. Inserts that still
+# collide (a suffix clash, a concurrent sign-up) are skipped; running the
+# statement again is a no-op for rows already applied and retries those.
+_MERGE_SQL = text(f"""
+WITH {_SOURCE},
+linked AS (
+    UPDATE users AS u
+    SET clerk_user_id = s.clerk_user_id, full_name = COALESCE(NULLIF(s.full_name, ''), u.full_name)
+    FROM src AS s
+    WHERE u.email = s.email AND u.clerk_user_id IS NULL
+      AND NOT EXISTS (SELECT 1 FROM users AS o WHERE o.clerk_user_id = s.clerk_user_id)
+    RETURNING u.id, u.username, u.full_name
+),
+changes AS (
+    SELECT u.id,
+           CASE WHEN EXISTS (SELECT 1 FROM users AS o WHERE o.email = s.email AND o.id <> u.id)
+                THEN u.email ELSE s.email END AS email,
+           COALESCE(NULLIF(s.full_name, ''), u.full_name) AS full_name
+    FROM src AS s JOIN users AS u ON u.clerk_user_id = s.clerk_user_id
+),
+updated AS (
+    UPDATE users AS u SET email = c.email, full_name = c.full_name
+    FROM changes AS c
+    WHERE u.id = c.id AND (u.email, u.full_name) IS DISTINCT FROM (c.email, c.full_name)
+    RETURNING u.id, u.username, u.full_name
+),
+fresh AS (
+    SELECT s.seq, s.clerk_user_id, s.email,
+           COALESCE(NULLIF(s.full_name, ''), split_part(s.email, '@', 1)) AS full_name,
+           CASE WHEN row_number() OVER (PARTITION BY s.base_username ORDER BY s.seq) = 1
+                     AND NOT EXISTS (SELECT 1 FROM users AS u WHERE u.username = s.base_username)
+                THEN s.base_username
+                ELSE s.base_username || '.' || substr(md5(random()::text), 1, 4)
+           END AS username
+    FROM src AS s
+    WHERE NOT EXISTS (SELECT 1 FROM users AS u WHERE u.clerk_user_id = s.clerk_user_id)
+      AND NOT EXISTS (SELECT 1 FROM users AS u WHERE u.email = s.email)
+),
+inserted AS (
+    INSERT INTO users (clerk_user_id, email, full_name, username, balance, gift_balance, role, is_active)
+    SELECT clerk_user_id, email, full_name, username, :balance, :gift_balance, 'student', true
+    FROM fresh
+    ORDER BY seq
+    ON CONFLICT DO NOTHING
+    RETURNING id, username, full_name, balance
+),
+bonus AS (
+    INSERT INTO transactions (user_id, amount, type, description)
+    SELECT id, balance, 'credit', 'Welcome Bonus' FROM inserted WHERE balance > 0
+    RETURNING user_id, amount, type, created_at
+)
+SELECT 'inserted' AS outcome, i.id, i.username, i.full_name, b.amount, b.type, b.created_at
+FROM inserted AS i LEFT JOIN bonus AS b ON b.user_id = i.id
+UNION ALL
+SELECT 'updated', id, username, full_name, NULL, NULL, NULL FROM updated
+UNION ALL
+SELECT 'linked', id, username, full_name, NULL, NULL, NULL FROM linked
+""")
+
+_UNMATCHED_SQL = text(f"""
+WITH {_SOURCE}
+SELECT count(*) FROM src AS s
+WHERE NOT EXISTS (SELECT 1 FROM users AS u WHERE u.clerk_user_id = s.clerk_user_id)
+  AND NOT EXISTS (SELECT 1 FROM users AS u WHERE u.email = s.email)
+""")
+
+
+async def create_import_staging(session: AsyncSession) -> None:
+    """Create the staging table for this transaction; it is dropped on commit."""
+    await session.execute(
+        text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ("
+            "seq bigint NOT NULL, clerk_user_id varchar NOT NULL, email varchar NOT NULL, "
+            "full_name varchar NOT NULL, base_username varchar NOT NULL"
+            ") ON COMMIT DROP"
+        )
+    )
+
+
+def _records(users: Iterable[ClerkExportUser]) -> Iterator[tuple[Any, ...]]:
+    for seq, user in enumerate(users):
+        name = user.full_name or user.email.split("@")[0]
+        yield (seq, user.clerk_user_id, user.email, user.full_name, _generate_base_username(name))
+
+
+async def copy_import_rows(session: AsyncSession, users: Iterable[ClerkExportUser]) -> None:
+    """Stream ``users`` into the staging table with COPY.
+
+    ``users`` is consumed lazily, so a file-backed iterator is never held in
+    memory. Requires the asyncpg driver.
+    """
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=_records(users), columns=_STAGING_COLUMNS
+    )
+    # Temp tables are never auto-analyzed; the merge plan depends on the row count
+    await session.execute(text(f"ANALYZE {STAGING_TABLE}"))
+
+
+async def merge_import_staging(session: AsyncSession) -> List[Row]:
+    """Apply the staging table to ``users``. The caller commits.
+
+    Returns ``(outcome, id, username, full_name, amount, type, created_at)``
+    per user touched, where ``outcome`` is ``inserted``, ``updated`` or
+    ``linked`` and the bonus columns are only set for inserted users.
+    """
+    columns = User.__table__.c
+    result = await session.execute(
+        _MERGE_SQL,
+        {"balance": columns.balance.default.arg, "gift_balance": columns.gift_balance.default.arg},
+    )
+    return list(result.all())
+
+
+async def count_unmatched_import_rows(session: AsyncSession) -> int:
+    """Staged users that neither exist nor collide with an existing email."""
+    result = await session.execute(_UNMATCHED_SQL)
+    return int(result.scalar() or 0)
+
+
+trace_module(__name__, "repository")
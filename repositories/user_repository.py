@@ -2,14 +2,15 @@ from __future__ import annotations
 
 import re
 import secrets
-from typing import List, Optional, Any
+from typing import Iterable, List, Optional, Any
 
-from sqlalchemy import select
+from sqlalchemy import Row, select, text
 from sqlalchemy.sql import func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import User, Transaction
+from core.tracing import trace_module
+from db.models import LedgerDailyRollup, User
 from schemas import UserCreate
 
 
@@ -18,6 +19,14 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
     return result.scalars().first()
 
 
+async def get_users_by_ids(session: AsyncSession, user_ids: Iterable[int]) -> List[User]:
+    ids = set(user_ids)
+    if not ids:
+        return []
+    result = await session.execute(select(User).where(User.id.in_(ids)))
+    return list(result.scalars().all())
+
+
 async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
     result = await session.execute(select(User).where(User.email == email))
     return result.scalars().first()
@@ -41,18 +50,28 @@ async def list_users(
 
 
 async def get_users_with_cumulative_earnings(
-    session: AsyncSession, *, offset: int = 0, limit: int = 100
+    session: AsyncSession, *, offset: int = 0, limit: int | None = 100
 ) -> List[Any]:
+    # Summed from the daily rollups so the aggregate stays correct after old
+    # transaction partitions are detached or archived.
+    earned = (
+        select(
+            LedgerDailyRollup.user_id,
+            func.sum(LedgerDailyRollup.credited).label("earned"),
+        )
+        .group_by(LedgerDailyRollup.user_id)
+        .subquery()
+    )
+    cumulative_earned = func.coalesce(earned.c.earned, 0)
     stmt = (
         select(
             User.id, 
             User.username, 
             User.full_name, 
-            func.coalesce(func.sum(Transaction.amount), 0).label("cumulative_earned")
+            cumulative_earned.label("cumulative_earned")
         )
-        .outerjoin(Transaction, (Transaction.user_id == User.id) & (Transaction.amount > 0))
-        .group_by(User.id)
-        .order_by(func.coalesce(func.sum(Transaction.amount), 0).desc())
+        .outerjoin(earned, earned.c.user_id == User.id)
+        .order_by(cumulative_earned.desc(), User.id)
         .offset(offset)
         .limit(limit)
     )
@@ -91,6 +110,7 @@ async def _generate_unique_username(session: AsyncSession, full_name: str) -> st
 
 
 async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
+    """Insert a user; the caller commits."""
     full_name = user_in.full_name or ""
     username = await _generate_unique_username(session, full_name)
     
@@ -123,7 +143,6 @@ async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
             raise
     
     await session.refresh(user)
-    await session.commit()
     return user
 
 
@@ -132,3 +151,157 @@ async def update_user(session: AsyncSession, user: User) -> User:
     await session.commit()
     await session.refresh(user)
     return user
+
+
+# Inserts users that don't exist yet and writes their welcome bonus in the same
+# statement. Rows that hit any unique constraint (email, clerk_user_id or
+# username) are skipped; the caller decides whether to retry them.
+_INSERT_USERS_SQL = text("""
+WITH new_users AS (
+    INSERT INTO users (clerk_user_id, email, full_name, username, balance, gift_balance, role, is_active)
+    SELECT v.clerk_user_id, v.email, v.full_name, v.username, :balance, :gift_balance, 'student', true
+    FROM unnest(
+        CAST(:clerk_user_ids AS varchar[]), CAST(:emails AS varchar[]),
+        CAST(:full_names AS varchar[]), CAST(:usernames AS varchar[])
+    ) AS v(clerk_user_id, email, full_name, username)
+    ON CONFLICT DO NOTHING
+    RETURNING id, clerk_user_id, username, full_name, balance
+),
+bonus AS (
+    INSERT INTO transactions (user_id, amount, type, description)
+    SELECT id, balance, 'credit', 'Welcome Bonus' FROM new_users WHERE balance > 0
+    RETURNING user_id, amount, type, created_at
+)
+SELECT n.id, n.clerk_user_id, n.username, n.full_name, b.amount, b.type, b.created_at
+FROM new_users AS n LEFT JOIN bonus AS b ON b.user_id = n.id
+""")
+
+_UPDATE_CLERK_USERS_SQL = text("""
+UPDATE users AS u
+SET email = COALESCE(v.email, u.email),
+    full_name = COALESCE(NULLIF(v.full_name, ''), u.full_name)
+FROM unnest(
+    CAST(:clerk_user_ids AS varchar[]), CAST(:emails AS varchar[]), CAST(:full_names AS varchar[])
+) AS v(clerk_user_id, email, full_name)
+WHERE u.clerk_user_id = v.clerk_user_id
+  AND (u.email IS DISTINCT FROM COALESCE(v.email, u.email)
+       OR u.full_name IS DISTINCT FROM COALESCE(NULLIF(v.full_name, ''), u.full_name))
+RETURNING u.id, u.username, u.full_name
+""")
+
+_LINK_CLERK_IDS_SQL = text("""
+UPDATE users AS u SET clerk_user_id = v.clerk_user_id
+FROM unnest(CAST(:clerk_user_ids AS varchar[]), CAST(:emails AS varchar[])) AS v(clerk_user_id, email)
+WHERE u.email = v.email AND u.clerk_user_id IS NULL
+  AND NOT EXISTS (SELECT 1 FROM users AS o WHERE o.clerk_user_id = v.clerk_user_id)
+""")
+
+
+async def allocate_usernames(session: AsyncSession, full_names: List[str]) -> List[str]:
+    """Usernames for a batch of new users, probing the table once.
+
+    Same scheme as ``_generate_unique_username``: the base username if it is
+    free, otherwise the base plus a random suffix. Names are also kept unique
+    within the batch.
+    """
+    bases = [_generate_base_username(name) for name in full_names]
+    result = await session.execute(select(User.username).where(User.username.in_(set(bases))))
+    taken = set(result.scalars().all())
+    usernames = []
+    for base in bases:
+        candidate = base
+        while candidate in taken:
+            candidate = f"{base}.{secrets.token_hex(2)}"
+        taken.add(candidate)
+        usernames.append(candidate)
+    return usernames
+
+
+async def insert_users(session: AsyncSession, rows: List[dict[str, Any]]) -> List[Row]:
+    """Insert ``clerk_user_id``/``email``/``full_name``/``username`` rows with a
+    welcome bonus each, skipping any that conflict with an existing user.
+
+    Returns ``(id, clerk_user_id, username, full_name, amount, type,
+    created_at)`` per inserted user; the bonus columns are ``None`` when no
+    bonus was written. The caller commits.
+    """
+    if not rows:
+        return []
+    columns = User.__table__.c
+    result = await session.execute(
+        _INSERT_USERS_SQL,
+        {
+            "clerk_user_ids": [r["clerk_user_id"] for r in rows],
+            "emails": [r["email"] for r in rows],
+            "full_names": [r["full_name"] for r in rows],
+            "usernames": [r["username"] for r in rows],
+            "balance": columns.balance.default.arg,
+            "gift_balance": columns.gift_balance.default.arg,
+        },
+    )
+    return list(result.all())
+
+
+async def update_users_by_clerk_id(session: AsyncSession, rows: List[dict[str, Any]]) -> List[Row]:
+    """Apply ``email``/``full_name`` from ``rows`` to users matched by
+    ``clerk_user_id``. ``None`` or empty values leave the column unchanged.
+
+    Returns ``(id, username, full_name)`` for the users that changed.
+    """
+    if not rows:
+        return []
+    result = await session.execute(
+        _UPDATE_CLERK_USERS_SQL,
+        {
+            "clerk_user_ids": [r["clerk_user_id"] for r in rows],
+            "emails": [r.get("email") for r in rows],
+            "full_names": [r.get("full_name") for r in rows],
+        },
+    )
+    return list(result.all())
+
+
+async def link_clerk_ids_by_email(session: AsyncSession, rows: List[dict[str, Any]]) -> int:
+    """Backfill ``clerk_user_id`` on users that signed up before it was tracked."""
+    if not rows:
+        return 0
+    result = await session.execute(
+        _LINK_CLERK_IDS_SQL,
+        {
+            "clerk_user_ids": [r["clerk_user_id"] for r in rows],
+            "emails": [r["email"] for r in rows],
+        },
+    )
+    return result.rowcount or 0
+
+
+async def deactivate_users_by_clerk_id(session: AsyncSession, clerk_user_ids: List[str]) -> int:
+    if not clerk_user_ids:
+        return 0
+    result = await session.execute(
+        text(
+            "UPDATE users SET is_active = false "
+            "WHERE clerk_user_id = ANY(CAST(:clerk_user_ids AS varchar[])) AND is_active"
+        ),
+        {"clerk_user_ids": list(clerk_user_ids)},
+    )
+    return result.rowcount or 0
+
+
+async def get_existing_clerk_identities(
+    session: AsyncSession, clerk_user_ids: List[str], emails: List[str]
+) -> tuple[set[str], set[str]]:
+    """Which of ``clerk_user_ids`` and ``emails`` already belong to a user."""
+    result = await session.execute(
+        select(User.clerk_user_id, User.email).where(
+            (User.clerk_user_id.in_(clerk_user_ids)) | (User.email.in_(emails))
+        )
+    )
+    clerk_ids, found_emails = set(), set()
+    for clerk_user_id, email in result.all():
+        clerk_ids.add(clerk_user_id)
+        found_emails.add(email)
+    return clerk_ids, found_emails
+
+
+trace_module(__name__, "repository")
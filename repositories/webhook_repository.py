@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, List
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.models import WebhookInboxEvent
+
+
+async def enqueue_webhook_event(
+    session: AsyncSession, *, source: str, svix_id: str, event_type: str, payload: dict[str, Any]
+) -> bool:
+    """Store a delivery in the inbox; ``False`` if ``svix_id`` was already stored."""
+    stmt = (
+        pg_insert(WebhookInboxEvent)
+        .values(source=source, svix_id=svix_id, event_type=event_type, payload=payload)
+        .on_conflict_do_nothing(index_elements=[WebhookInboxEvent.svix_id])
+        .returning(WebhookInboxEvent.id)
+    )
+    result = await session.execute(stmt)
+    return result.scalar() is not None
+
+
+async def try_lock_webhook_inbox(session: AsyncSession) -> bool:
+    """Take the inbox drain lock for this transaction, without waiting.
+
+    Only one worker applies events at a time so events for the same user are
+    applied in the order they were received.
+    """
+    result = await session.execute(text("SELECT pg_try_advisory_xact_lock(hashtext('webhook_inbox'))"))
+    return bool(result.scalar())
+
+
+async def claim_webhook_events(
+    session: AsyncSession, *, batch_size: int, max_attempts: int
+) -> List[WebhookInboxEvent]:
+    """Lock the oldest unprocessed events, skipping rows another worker holds."""
+    result = await session.execute(
+        select(WebhookInboxEvent)
+        .where(WebhookInboxEvent.processed_at.is_(None), WebhookInboxEvent.attempts < max_attempts)
+        .order_by(WebhookInboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.scalars().all())
+
+
+async def mark_webhook_events_processed(session: AsyncSession, event_ids: List[int]) -> None:
+    if not event_ids:
+        return
+    await session.execute(
+        update(WebhookInboxEvent)
+        .where(WebhookInboxEvent.id.in_(event_ids))
+        .values(processed_at=func.now(), attempts=WebhookInboxEvent.attempts + 1, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def record_webhook_event_failure(session: AsyncSession, event_ids: List[int], error: str) -> None:
+    if not event_ids:
+        return
+    await session.execute(
+        update(WebhookInboxEvent)
+        .where(WebhookInboxEvent.id.in_(event_ids))
+        .values(attempts=WebhookInboxEvent.attempts + 1, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def delete_processed_webhook_events(
+    session: AsyncSession, before: datetime, *, batch_size: int = 1000
+) -> int:
+    """Delete up to ``batch_size`` events processed before ``before``. The caller commits."""
+    stale = (
+        select(WebhookInboxEvent.id)
+        .where(WebhookInboxEvent.processed_at < before)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(WebhookInboxEvent)
+        .where(WebhookInboxEvent.id.in_(stale))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+async def count_pending_webhook_events(session: AsyncSession) -> int:
+    result = await session.execute(
+        select(func.count()).select_from(WebhookInboxEvent).where(WebhookInboxEvent.processed_at.is_(None))
+    )
+    return int(result.scalar() or 0)
+
+
+trace_module(__name__, "repository")
@@ -1,31 +1,122 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.admission import get_admission_stats
 from core.dependencies import require_admin
+from core.exceptions import AlreadyExistsError
+from core.profiler import profile_process, profile_requests, render_collapsed
+from core.tracing import get_traces
 from db.session import get_db_session
 from db.models import User
 from repositories import get_all_transactions
 from schemas import UserBalanceUpdate, UserRead
+from schemas.admission import AdmissionStats
+from schemas.conditional import ConditionalRouteStats
+from schemas.job import JobKindStats
+from schemas.tracing import TraceRead
 from schemas.transaction import TransactionRead
 from services import NotFoundError
+from services.job_service import get_job_stats
 from services.user_service import update_user_balance_service, get_user_service
 from utils import PaginationParams
+from utils.conditional import get_conditional_stats
+from utils.serialization import TrustedList
 
 router = APIRouter()
 
+_transactions_out = TrustedList(TransactionRead)
+
 
 @router.get("/transactions", response_model=list[TransactionRead])
 async def list_all_transactions(
+    since: datetime | None = None,
+    until: datetime | None = None,
     p: PaginationParams = Depends(),
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db_session),
 ):
-    """List all transactions. Requires admin role."""
-    transactions = await get_all_transactions(db, offset=p.offset, limit=p.limit)
-    return transactions
+    """List all transactions, optionally bounded by created_at. Requires admin role."""
+    transactions = await get_all_transactions(
+        db, since=since, until=until, offset=p.offset, limit=p.limit
+    )
+    return _transactions_out.response(transactions)
+
+
+
+@router.get("/jobs", response_model=list[JobKindStats])
+async def job_stats(
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Background job queue depth per kind, with outcome counts and latency
+    percentiles from this process's workers. Requires admin role."""
+    return await get_job_stats(db)
+
+
+@router.get("/etags", response_model=list[ConditionalRouteStats])
+async def etag_stats(admin: User = Depends(require_admin)):
+    """Conditional GET outcomes per route in this process: requests checked
+    against ``If-None-Match`` and how many were answered with a 304.
+    Requires admin role."""
+    return get_conditional_stats()
+
 
+@router.get("/admission", response_model=AdmissionStats)
+async def admission_stats(admin: User = Depends(require_admin)):
+    """Connection pool saturation and requests admitted, shed or served
+    stale per route class in this process. Requires admin role."""
+    return get_admission_stats()
+
+
+@router.get("/traces", response_model=list[TraceRead])
+async def list_traces(
+    limit: int = Query(20, ge=1, le=1000),
+    route: str | None = None,
+    min_ms: float = Query(0, ge=0),
+    admin: User = Depends(require_admin),
+):
+    """Recent traced requests in this process, newest first, optionally
+    only those to ``route`` (a template such as
+    ``/api/v1/users/leaderboard``) or slower than ``min_ms``. Requires admin
+    role."""
+    return get_traces(limit, route, min_ms)
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=300),
+    route: str | None = None,
+    requests: int = Query(10, ge=1, le=10_000),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    idle: bool = False,
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Sample this worker's stacks and return them collapsed, ready for
+    flamegraph.pl or speedscope. Without ``route``, samples every thread for
+    ``seconds`` (``idle`` keeps threads parked in a wait). With ``route`` (a
+    template such as ``/api/v1/users/leaderboard``, or a path), samples only
+    the next ``requests`` requests to it, waiting at most ``seconds``.
+    Requires admin role."""
+    # Hold no pool connection while profiling
+    await db.close()
+    interval = interval_ms / 1000
+    try:
+        if route is None:
+            result = await profile_process(seconds, interval, idle)
+        else:
+            result = await profile_requests(route, requests, seconds, interval)
+    except AlreadyExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        render_collapsed(result),
+        headers={"X-Profile-Samples": str(result.samples), "X-Profile-Requests": str(result.requests)},
+    )
 
 
 @router.post("/users/{user_id}/balance/add", response_model=UserRead)
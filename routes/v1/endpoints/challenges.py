@@ -1,27 +1,50 @@
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.dependencies import get_current_user, require_admin
+from core.exceptions import AlreadyExistsError, BadRequestError, NotFoundError
 from db.models import User
 from db.session import get_db_session
-from schemas.challenge import ChallengeCreate, ChallengeRead
+from schemas.challenge import (
+    ChallengeApproval,
+    ChallengeCompletionRead,
+    ChallengeCreate,
+    ChallengePayout,
+    ChallengeRead,
+)
 from services import challenge_service
+from utils import PaginationParams
+from utils.conditional import make_etag, not_modified, with_etag
+from utils.serialization import TrustedList
 
 router = APIRouter()
 
+_challenges_out = TrustedList(ChallengeRead)
+_completions_out = TrustedList(ChallengeCompletionRead)
+
 
 @router.get("/", response_model=List[ChallengeRead])
 async def read_challenges(
+    response: Response,
     offset: int = 0,
     limit: int = 100,
+    if_none_match: str | None = Header(default=None),
     session: AsyncSession = Depends(get_db_session),
     _current_user: User = Depends(get_current_user),
 ):
-    """List all challenges (requires authentication)."""
+    """List all challenges (requires authentication).
+
+    Send the returned ``ETag`` back in ``If-None-Match`` to get a 304 while
+    no challenge was created, deleted or had its image rendered.
+    """
+    version = await challenge_service.get_challenges_version(session)
+    etag = make_etag("challenges", version, offset, limit)
+    if (cached := not_modified("/challenges/", etag, if_none_match)) is not None:
+        return cached
     challenges = await challenge_service.get_challenges(session, offset=offset, limit=limit)
-    return challenges
+    return with_etag(_challenges_out.response(challenges), response, etag)
 
 
 @router.post("/", response_model=ChallengeRead)
@@ -31,7 +54,10 @@ async def create_challenge(
     _admin: User = Depends(require_admin),
 ):
     """Create a new challenge (admin only)."""
-    return await challenge_service.create_challenge(session, challenge_in)
+    try:
+        return await challenge_service.create_challenge(session, challenge_in)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{challenge_id}", response_model=bool)
@@ -45,3 +71,58 @@ async def delete_challenge(
     if not success:
         raise HTTPException(status_code=404, detail="Challenge not found")
     return success
+
+
+@router.post(
+    "/{challenge_id}/complete",
+    response_model=ChallengeCompletionRead,
+    status_code=status.HTTP_201_CREATED,
+)
+async def submit_challenge_completion(
+    challenge_id: int,
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Submit a challenge as completed, for an admin to approve (requires authentication)."""
+    try:
+        return await challenge_service.submit_completion(session, challenge_id, current_user.id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AlreadyExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{challenge_id}/completions", response_model=List[ChallengeCompletionRead])
+async def read_challenge_completions(
+    challenge_id: int,
+    status: Literal["pending", "paid"] | None = None,
+    p: PaginationParams = Depends(),
+    session: AsyncSession = Depends(get_db_session),
+    _admin: User = Depends(require_admin),
+):
+    """List completions of a challenge, oldest first (admin only)."""
+    completions = await challenge_service.get_completions(
+        session, challenge_id, status=status, offset=p.offset, limit=p.limit
+    )
+    return _completions_out.response(completions)
+
+
+@router.post("/{challenge_id}/completions/approve", response_model=ChallengePayout)
+async def approve_challenge_completions(
+    challenge_id: int,
+    approval: ChallengeApproval,
+    session: AsyncSession = Depends(get_db_session),
+    admin: User = Depends(require_admin),
+):
+    """Pay the challenge reward to the listed students, or to every pending
+    submission if ``user_ids`` is omitted (admin only).
+
+    Students already paid for this challenge are skipped and reported in
+    ``already_paid_user_ids``.
+    """
+    try:
+        return await challenge_service.approve_completions(
+            session, challenge_id, approval.user_ids, admin_id=admin.id
+        )
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
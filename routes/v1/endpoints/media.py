@@ -0,0 +1,95 @@
+"""Content-addressed media.
+
+Blobs are immutable (the URL is the SHA-256 of the bytes), so responses are
+cacheable forever and the hash doubles as a strong ETag. No authentication:
+these URLs are loaded by <img> tags.
+"""
+from __future__ import annotations
+
+import re
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.session import get_db_session
+from repositories.media_repository import get_blob_meta, read_blob
+
+router = APIRouter()
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None for headers we do not handle (multiple ranges, other units),
+    in which case the whole body is served.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.api_route("/{digest}", methods=["GET", "HEAD"])
+async def get_media(
+    request: Request,
+    digest: str = Path(pattern=r"^[0-9a-f]{64}$"),
+    range_header: str | None = Header(None, alias="range"),
+    if_none_match: str | None = Header(None, alias="if-none-match"),
+    db: AsyncSession = Depends(get_db_session),
+) -> Response:
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": _CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        # Served unauthenticated: never let a browser reinterpret the bytes
+        "X-Content-Type-Options": "nosniff",
+    }
+    # Content never changes under a hash, so a matching ETag needs no lookup
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    blob = await get_blob_meta(db, digest)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(blob.size)
+        return Response(media_type=blob.content_type, headers=headers)
+
+    byte_range = _parse_range(range_header, blob.size) if range_header else None
+    if byte_range is None:
+        body = await read_blob(db, digest)
+        return Response(content=body, media_type=blob.content_type, headers=headers)
+
+    start, end = byte_range
+    body = await read_blob(db, digest, start, end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+    return Response(
+        content=body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=blob.content_type,
+        headers=headers,
+    )
@@ -4,16 +4,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from core.dependencies import get_current_user
 from db.models import User
 from db.session import get_db_session
-from schemas.request import RequestRead, RequestCreate
+from schemas.request import RequestRead, RequestCreate, RequestBatchCreate, RequestPage
 from services import (
     NotFoundError,
     pay_request_service,
     create_request_service,
+    create_requests_batch_service,
 )
 from core.exceptions import ForbiddenError, BadRequestError
+from utils.serialization import TrustedModel
 
 router = APIRouter()
 
+_request_page_out = TrustedModel(RequestPage)
+
 @router.post("/", response_model=RequestRead, status_code=201)
 async def create_request(
     request_in: RequestCreate,
@@ -27,6 +31,26 @@ async def create_request(
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/batch", response_model=RequestPage, status_code=201)
+async def create_requests_batch(
+    batch_in: RequestBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Create requests to several recipients at once, e.g. to split a bill.
+
+    All-or-nothing: if any recipient is invalid no request is created. The
+    response lists the requests with users referenced by id and included
+    once in ``users``.
+    """
+    try:
+        page = await create_requests_batch_service(db, batch_in, current_user.id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _request_page_out.response(page, status_code=201)
+
 @router.post("/{request_id}/pay", response_model=RequestRead)
 async def pay_request(
     request_id: int,
@@ -1,24 +1,40 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.exceptions import BadRequestError, NotFoundError
 from db.session import get_db_session
 from core.dependencies import get_current_user, require_admin
 from db.models import User
-from schemas.shop_item import ShopItemRead, ShopItemCreate
+from schemas.shop_item import ShopItemRead, ShopItemCreate, ShopReservationRead
 from schemas.transaction import TransactionRead
 from services.shop_service import ShopService
+from utils import PaginationParams
+from utils.conditional import not_modified, with_etag
+from utils.serialization import TrustedList
 
 router = APIRouter()
 
+_items_out = TrustedList(ShopItemRead)
+
 
 @router.get("/", response_model=list[ShopItemRead])
 async def list_shop_items(
+    response: Response,
+    p: PaginationParams = Depends(),
+    if_none_match: str | None = Header(default=None),
     db: AsyncSession = Depends(get_db_session),
     _current_user: User = Depends(get_current_user),
 ):
-    """List all available shop items (requires authentication)."""
+    """List shop items, newest first (requires authentication).
+
+    Served from the catalog cache; send the returned ``ETag`` back in
+    ``If-None-Match`` to get a 304 while the catalog is unchanged.
+    """
     service = ShopService(db)
-    return await service.list_items()
+    page = await service.list_items(offset=p.offset, limit=p.limit)
+    if (cached := not_modified("/shop/", page.etag, if_none_match)) is not None:
+        return cached
+    return with_etag(_items_out.response(page.items), response, page.etag)
 
 
 @router.post("/", response_model=ShopItemRead, status_code=status.HTTP_201_CREATED)
@@ -29,7 +45,10 @@ async def create_shop_item(
 ):
     """Create a new shop item (admin only)."""
     service = ShopService(db)
-    return await service.create_item(item_data)
+    try:
+        return await service.create_item(item_data)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -51,4 +70,62 @@ async def purchase_shop_item(
 ):
     """Purchase a shop item (requires authentication)."""
     service = ShopService(db)
-    return await service.purchase_item(current_user.id, item_id)
+    try:
+        return await service.purchase_item(current_user.id, item_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/{item_id}/reserve",
+    response_model=ShopReservationRead,
+    status_code=status.HTTP_201_CREATED,
+)
+async def reserve_shop_item(
+    item_id: int,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Hold one unit of a limited item until ``expires_at`` (requires authentication).
+
+    Confirm the reservation to pay for it; otherwise the unit returns to stock.
+    """
+    service = ShopService(db)
+    try:
+        return await service.reserve_item(current_user.id, item_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/reservations/{reservation_id}/confirm", response_model=TransactionRead)
+async def confirm_shop_reservation(
+    reservation_id: int,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Pay for a reserved unit (requires authentication)."""
+    service = ShopService(db)
+    try:
+        return await service.confirm_reservation(current_user.id, reservation_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/reservations/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_shop_reservation(
+    reservation_id: int,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Give a reserved unit back (requires authentication)."""
+    service = ShopService(db)
+    try:
+        await service.cancel_reservation(current_user.id, reservation_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -1,25 +1,42 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.dependencies import get_current_user, require_admin
 from db.models import User
 from db.session import get_db_session
 from repositories import get_transactions_by_user_id, get_requests_by_user_id
-from schemas import UserRead, RequestRead, LeaderboardEntry
-from schemas.transaction import TransactionRead
+from schemas import UserRead, RequestRead, RequestPage, LeaderboardEntry, LeaderboardRank
+from schemas.transaction import LedgerSummary, TransactionRead
+from services.leaderboard_service import LeaderboardWindow
+from services.user_event_service import stream_user_events
 from services import (
     NotFoundError,
     get_user_service,
     list_users_service,
     get_leaderboard_service,
+    get_user_rank_service,
+    get_user_summary_service,
+    get_requests_normalized_service,
 )
 from utils import PaginationParams
+from utils.conditional import make_etag, not_modified, with_etag
+from utils.serialization import TrustedList, TrustedModel
 
 
 router = APIRouter()
 
+_users_out = TrustedList(UserRead)
+_leaderboard_out = TrustedList(LeaderboardEntry)
+_transactions_out = TrustedList(TransactionRead)
+_requests_out = TrustedList(RequestRead)
+_request_page_out = TrustedModel(RequestPage)
+
 
 @router.get("/", response_model=list[UserRead])
 async def list_users(
@@ -29,49 +46,142 @@ async def list_users(
 ):
     """List all users (admin only)."""
     users = await list_users_service(db, offset=p.offset, limit=p.limit)
-    return users
+    return _users_out.response(users)
 
 
 @router.get("/leaderboard", response_model=list[LeaderboardEntry])
 async def get_leaderboard(
+    window: LeaderboardWindow = Query("all"),
     p: PaginationParams = Depends(),
     db: AsyncSession = Depends(get_db_session),
     _current_user: User = Depends(get_current_user),
 ):
-    """Get the leaderboard (requires authentication)."""
-    return await get_leaderboard_service(db, offset=p.offset, limit=p.limit)
+    """Get the leaderboard for the current day, week, month or all time (requires authentication)."""
+    entries = await get_leaderboard_service(db, window=window, offset=p.offset, limit=p.limit)
+    return _leaderboard_out.response(entries)
 
 
 @router.get("/me", response_model=UserRead)
-async def get_me(current_user: User = Depends(get_current_user)):
-    """Get the current authenticated user's profile."""
-    return current_user
+async def get_me(
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+):
+    """Get the current authenticated user's profile.
+
+    Send the returned ``ETag`` back in ``If-None-Match`` to get a 304 while
+    the profile and balances are unchanged.
+    """
+    etag = make_etag(
+        "users.me",
+        *(getattr(current_user, field) for field in UserRead.model_fields),
+    )
+    if (cached := not_modified("/users/me", etag, if_none_match)) is not None:
+        return cached
+    return with_etag(current_user, response, etag)
+
+
+@router.get("/me/stream", response_class=StreamingResponse)
+async def stream_me(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Server-sent events with the current user's balance and ledger changes.
+
+    Starts with ``ready`` (current balances), then sends ``transaction`` and
+    ``request`` events, each carrying the balances after the change. On
+    ``resync`` some events were dropped and the client should refetch.
+    """
+    return StreamingResponse(
+        stream_user_events(db, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/me/rank", response_model=LeaderboardRank)
+async def get_my_rank(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Get the current user's leaderboard rank."""
+    try:
+        return await get_user_rank_service(db, current_user.id)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="User not ranked")
+
+
+@router.get("/me/summary", response_model=LedgerSummary)
+async def get_my_summary(
+    days: int = Query(90, ge=1, le=366),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Get the current user's daily balance history and totals by transaction type."""
+    return await get_user_summary_service(db, current_user.id, days=days)
 
 
 @router.get("/me/transactions", response_model=list[TransactionRead])
 async def get_my_transactions(
+    response: Response,
+    since: datetime | None = None,
+    until: datetime | None = None,
     p: PaginationParams = Depends(),
+    if_none_match: str | None = Header(default=None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db_session),
 ):
-    """Get the current user's transactions."""
+    """Get the current user's transactions, optionally bounded by created_at.
+
+    The ``ETag`` changes whenever the user gains a ledger row (counterparty
+    renames alone don't change it).
+    """
+    etag = make_etag(
+        "users.me.transactions", current_user.id, current_user.ledger_version, since, until, p.offset, p.limit
+    )
+    if (cached := not_modified("/users/me/transactions", etag, if_none_match)) is not None:
+        return cached
     transactions = await get_transactions_by_user_id(
-        db, current_user.id, offset=p.offset, limit=p.limit
+        db, current_user.id, since=since, until=until, offset=p.offset, limit=p.limit
     )
-    return transactions
+    return with_etag(_transactions_out.response(transactions), response, etag)
 
 
-@router.get("/me/requests", response_model=list[RequestRead])
+@router.get("/me/requests", response_model=list[RequestRead] | RequestPage)
 async def get_my_requests(
+    response: Response,
+    shape: Literal["embedded", "normalized"] = "embedded",
+    active: bool = False,
     p: PaginationParams = Depends(),
+    if_none_match: str | None = Header(default=None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db_session),
 ):
-    """Get the current user's payment requests."""
+    """Get the current user's payment requests.
+
+    ``shape=normalized`` returns ``{"items": [...], "users": {id: user}}`` where
+    items carry only user ids and each user appears once. ``active=true``
+    returns only open requests.
+
+    The ``ETag`` changes whenever a request the user sent or received is
+    created or changes; the embedded user snapshots are refreshed with it.
+    """
+    etag = make_etag(
+        "users.me.requests", current_user.id, current_user.requests_version, shape, active, p.offset, p.limit
+    )
+    if (cached := not_modified("/users/me/requests", etag, if_none_match)) is not None:
+        return cached
+
+    if shape == "normalized":
+        page = await get_requests_normalized_service(
+            db, current_user.id, offset=p.offset, limit=p.limit, active_only=active
+        )
+        return with_etag(_request_page_out.response(page), response, etag)
+
     requests = await get_requests_by_user_id(
-        db, current_user.id, offset=p.offset, limit=p.limit
+        db, current_user.id, offset=p.offset, limit=p.limit, active_only=active
     )
-    return requests
+    return with_etag(_requests_out.response(requests), response, etag)
 
 
 @router.get("/{user_id}", response_model=UserRead)
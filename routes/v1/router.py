@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from .endpoints.admin import router as admin_router
 from .endpoints.auth import router as auth_router
 from .endpoints.health import router as health_router
+from .endpoints.media import router as media_router
 from .endpoints.users import router as users_router
 from .endpoints.requests import router as requests_router
 from .endpoints.transactions import router as transactions_router
@@ -21,3 +22,4 @@ api_router.include_router(challenges_router, prefix="/challenges", tags=["challe
 api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
 api_router.include_router(admin_router, prefix="/admin", tags=["admin"])
 api_router.include_router(webhooks_router, prefix="/webhooks", tags=["webhooks"])
+api_router.include_router(media_router, prefix="/media", tags=["media"])
@@ -1,14 +1,27 @@
-from .user import UserBalanceUpdate, UserCreate, UserRead, LeaderboardEntry
-from .challenge import ChallengeCreate, ChallengeRead
-from .request import RequestCreate, RequestRead
+from .user import UserBalanceUpdate, UserCreate, UserRead, LeaderboardEntry, LeaderboardRank
+from .challenge import (
+    ChallengeCreate,
+    ChallengeRead,
+    ChallengeCompletionRead,
+    ChallengeApproval,
+    ChallengePayout,
+)
+from .request import RequestCreate, RequestBatchCreate, RequestRead, RequestRef, RequestPage
 
 __all__ = [
     "UserBalanceUpdate",
     "UserCreate",
     "UserRead",
     "LeaderboardEntry",
+    "LeaderboardRank",
     "ChallengeCreate",
     "ChallengeRead",
+    "ChallengeCompletionRead",
+    "ChallengeApproval",
+    "ChallengePayout",
     "RequestCreate",
+    "RequestBatchCreate",
     "RequestRead",
+    "RequestRef",
+    "RequestPage",
 ]
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class RouteClassAdmission(BaseModel):
+    route_class: str
+    in_flight: int
+    admitted: int
+    shed: int
+    served_stale: int
+
+
+class AdmissionStats(BaseModel):
+    saturated: bool
+    # Connections the pool may open (size plus overflow)
+    pool_capacity: int
+    # Checkouts in progress or queued right now
+    pool_waiting: int
+    pool_checkouts: int
+    pool_slow_checkouts: int
+    pool_wait_p95_ms: float | None = None
+    classes: list[RouteClassAdmission]
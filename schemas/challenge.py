@@ -8,16 +8,43 @@ class ChallengeBase(BaseModel):
     title: str
     description: str | None = None
     reward: int
-    image: str | None = None
 
 
 class ChallengeCreate(ChallengeBase):
-    pass
+    image: str | None = None  # Base64 encoded image, optionally a data: URL
 
 
 class ChallengeRead(ChallengeBase):
     id: int
+    image_url: str | None = None
+    card_url: str | None = None
+    thumbnail_url: str | None = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+
+
+class ChallengeCompletionRead(BaseModel):
+    id: int
+    challenge_id: int
+    user_id: int
+    status: str
+    reward: int | None = None
+    paid_at: datetime | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChallengeApproval(BaseModel):
+    # Students to pay; omit to approve every pending submission
+    user_ids: list[int] | None = None
+
+
+class ChallengePayout(BaseModel):
+    challenge_id: int
+    reward: int
+    paid_user_ids: list[int]
+    # Requested students who had already been paid for this challenge
+    already_paid_user_ids: list[int]
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class ConditionalRouteStats(BaseModel):
+    route: str
+    # Requests this process answered, and how many of them with a 304
+    requests: int
+    not_modified: int
+    hit_rate: float
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class JobKindStats(BaseModel):
+    kind: str
+    # Queue depth, from the database
+    queued: int
+    ready: int
+    failed: int
+    oldest_ready_seconds: float | None = None
+    # Outcomes and latencies of jobs run by the worker in this process
+    succeeded_total: int
+    retried_total: int
+    failed_total: int
+    wait_p50_ms: float | None = None
+    wait_p95_ms: float | None = None
+    run_p50_ms: float | None = None
+    run_p95_ms: float | None = None
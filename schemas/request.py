@@ -16,6 +16,11 @@ class RequestCreate(RequestBase):
     recipient_id: int
 
 
+class RequestBatchCreate(BaseModel):
+    """Several requests from the current user, e.g. a bill split between classmates."""
+    requests: list[RequestCreate]
+
+
 class RequestRead(RequestBase):
     id: int
     sender_id: int
@@ -29,3 +34,22 @@ class RequestRead(RequestBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+
+class RequestRef(RequestBase):
+    """A request with its users referenced by id only (``shape=normalized``)."""
+    id: int
+    sender_id: int
+    recipient_id: int
+    status: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RequestPage(BaseModel):
+    """Requests plus every user they reference, each included once."""
+    items: list[RequestRef]
+    users: dict[int, UserRead]
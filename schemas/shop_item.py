@@ -6,15 +6,28 @@ class ShopItemBase(BaseModel):
     title: str
     description: str | None = None
     price: int
-    image: str | None = None
+    stock: int | None = None  # None means unlimited
+    per_user_limit: int | None = None
 
 
 class ShopItemCreate(ShopItemBase):
-    pass
+    image: str | None = None  # Base64 encoded image, optionally a data: URL
 
 
 class ShopItemRead(ShopItemBase):
     id: int
+    image_url: str | None = None
+    card_url: str | None = None
+    thumbnail_url: str | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ShopReservationRead(BaseModel):
+    id: int
+    item_id: int
+    expires_at: datetime
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class SpanRead(BaseModel):
+    span_id: int
+    parent_id: int | None = None
+    name: str
+    # request, dependency, service, repository, db or serialization
+    kind: str
+    # Offset from the start of the trace
+    start_ms: float
+    duration_ms: float | None = None
+    attributes: dict[str, Any]
+    error: str | None = None
+
+
+class TraceRead(BaseModel):
+    trace_id: str
+    # Method and route template of the request
+    name: str
+    started_at: datetime
+    duration_ms: float | None = None
+    status: int | None = None
+    dropped_spans: int
+    spans: list[SpanRead]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, ConfigDict
 
 
@@ -33,3 +33,26 @@ class TransactionRead(TransactionBase):
     shop_item_id: int | None = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class BalancePoint(BaseModel):
+    day: date
+    net: int
+    balance: int
+
+
+class TypeTotal(BaseModel):
+    type: str
+    credited: int
+    debited: int
+    count: int
+
+
+class LedgerSummary(BaseModel):
+    user_id: int
+    start: date
+    end: date
+    opening_balance: int
+    closing_balance: int
+    balance_history: list[BalancePoint]
+    totals_by_type: list[TypeTotal]
@@ -36,3 +36,10 @@ class LeaderboardEntry(BaseModel):
     cumulative_earned: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class LeaderboardRank(BaseModel):
+    id: int
+    rank: int
+    cumulative_earned: int
+    total_users: int
@@ -0,0 +1,40 @@
+"""Move old transactions into the transactions_archive table.
+
+Usage:
+    uv run python scripts/archive_transactions.py --older-than-days 180
+
+Defaults come from TRANSACTION_ARCHIVE_AFTER_DAYS / TRANSACTION_ARCHIVE_BATCH_SIZE.
+History endpoints read across both tables, so this is invisible to clients.
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import get_settings
+from db.session import AsyncSessionLocal
+from services.archive_service import archive_old_transactions
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.older_than_days <= 0:
+        print("Nothing to do: pass --older-than-days or set TRANSACTION_ARCHIVE_AFTER_DAYS.")
+        return
+    async with AsyncSessionLocal() as session:
+        moved = await archive_old_transactions(
+            session, older_than_days=args.older_than_days, batch_size=args.batch_size
+        )
+    print(f"Archived {moved} transaction(s) older than {args.older_than_days} days.")
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.TRANSACTION_ARCHIVE_BATCH_SIZE)
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+"""Benchmark admission control under a burst of listing traffic.
+
+Runs the app in-process with a deliberately small connection pool and, for
+``--seconds``, keeps ``--readers`` clients polling listings (transactions,
+requests, leaderboard) while ``--payers`` clients make transfers. Readers honour ``Retry-After``. Does this
+once with admission control off and once with it on, and prints status
+counts and latency percentiles per route class. Throwaway users are
+created for the run and deleted at the end.
+
+Usage:
+    uv run python scripts/bench_admission.py
+    uv run python scripts/bench_admission.py --pool-size 4 --readers 80 --seconds 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import delete, or_, select
+
+from core.config import get_settings
+from core.security import create_access_token
+
+settings = get_settings()
+
+READ_PATHS = [
+    "/users/me/transactions?limit=100",
+    "/users/me/requests?limit=100",
+    "/users/leaderboard?window=week",
+]
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 if ordered else 0.0
+
+
+async def _run(app, tokens: list[tuple[int, str]], args: argparse.Namespace) -> dict:
+    results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    deadline = time.monotonic() + args.seconds
+    prefix = settings.API_V1_PREFIX
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+        async def reader(i: int) -> None:
+            user_id, token = tokens[i % len(tokens)]
+            headers = {"Authorization": f"Bearer {token}"}
+            n = 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get(prefix + READ_PATHS[n % len(READ_PATHS)], headers=headers)
+                results["low"].append((response.status_code, time.perf_counter() - started))
+                n += 1
+                if response.status_code == 503:
+                    await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+        async def payer(i: int) -> None:
+            user_id, token = tokens[i % len(tokens)]
+            recipient_id = tokens[(i + 1) % len(tokens)][0]
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.post(
+                    prefix + "/transactions/transfer",
+                    json={"recipient_id": recipient_id, "amount": 1, "description": "bench"},
+                    headers=headers,
+                )
+                results["critical"].append((response.status_code, time.perf_counter() - started))
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(
+            *(reader(i) for i in range(args.readers)),
+            *(payer(i) for i in range(args.payers)),
+        )
+    return results
+
+
+def _report(label: str, results: dict, seconds: float) -> None:
+    print(f"\n{label}")
+    for cls in ("critical", "low"):
+        samples = results.get(cls, [])
+        statuses = Counter(status for status, _ in samples)
+        ok = [elapsed for status, elapsed in samples if status < 400]
+        print(
+            f"  {cls:<8} {len(samples) / seconds:7.1f} req/s  statuses {dict(sorted(statuses.items()))}  "
+            f"ok p50 {_percentile(ok, 0.5):7.1f} ms  p99 {_percentile(ok, 0.99):7.1f} ms"
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings.DB_POOL_SIZE = args.pool_size
+    settings.DB_MAX_OVERFLOW = 0
+    # Imported after the pool settings are in place
+    from app import create_app
+    from db.models import LedgerDailyRollup, Request, Transaction, User
+    from db.session import AsyncSessionLocal, engine
+
+    tag = "bench" + uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as session:
+        users = [
+            User(
+                email=f"{tag}.{i}@example.com",
+                full_name=f"Bench {i}",
+                username=f"@{tag}.{i}",
+                balance=1_000_000,
+            )
+            for i in range(max(args.payers, 10) + 1)
+        ]
+        session.add_all(users)
+        await session.commit()
+        tokens = [(user.id, create_access_token(user.id)) for user in users]
+
+    try:
+        for enabled in (False, True):
+            settings.ADMISSION_CONTROL = enabled
+            app = create_app()
+            results = await _run(app, tokens, args)
+            _report(f"Admission control {'on' if enabled else 'off'}:", results, args.seconds)
+    finally:
+        async with AsyncSessionLocal() as session:
+            user_ids = select(User.id).where(User.email.like(f"{tag}.%"))
+            await session.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+            await session.execute(delete(LedgerDailyRollup).where(LedgerDailyRollup.user_id.in_(user_ids)))
+            await session.execute(
+                delete(Request).where(or_(Request.sender_id.in_(user_ids), Request.recipient_id.in_(user_ids)))
+            )
+            await session.execute(delete(User).where(User.id.in_(user_ids)))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-size", type=int, default=3, help="connections per process (default 3, no overflow)")
+    parser.add_argument("--readers", type=int, default=60, help="concurrent listing clients (default 60)")
+    parser.add_argument("--payers", type=int, default=5, help="concurrent transfer clients (default 5)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
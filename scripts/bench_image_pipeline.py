@@ -0,0 +1,100 @@
+"""Measure image derivative throughput for a batch of uploads.
+
+Renders the same batch of synthetic photos twice: inline on the event loop
+(how a naive handler would do it) and through the worker pool used by
+``services.media_service``. For each run it reports images per second and
+the worst event loop stall seen by a 10 ms ticker, which is what concurrent
+requests would wait. Nothing is written to the database.
+
+Usage:
+    uv run python scripts/bench_image_pipeline.py --images 40 --size 3000x2000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+from io import BytesIO
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from core.config import get_settings
+from services.media_service import render_image, shutdown_image_pool
+from utils.images import render_derivatives
+
+settings = get_settings()
+
+
+def _make_photo(width: int, height: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(20, min(width, height) // 4)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    out = BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+async def _ticker(stop: asyncio.Event, stalls: list[float]) -> None:
+    interval = 0.01
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def _run(label: str, batch: list[bytes], render) -> None:
+    stop, stalls = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await render(batch)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    print(
+        f"{label:<8} {len(batch) / elapsed:8.1f} images/s  "
+        f"{elapsed:7.2f}s total  max loop stall {max(stalls, default=0) * 1000:8.1f} ms"
+    )
+
+
+async def _inline(batch: list[bytes]) -> None:
+    for data in batch:
+        render_derivatives(data)
+        await asyncio.sleep(0)
+
+
+async def _pooled(batch: list[bytes]) -> None:
+    await asyncio.gather(*(render_image(data) for data in batch))
+
+
+async def main(args: argparse.Namespace) -> None:
+    width, height = (int(v) for v in args.size.split("x"))
+    print(f"Generating {args.images} photos of {width}x{height}...")
+    batch = [_make_photo(width, height, seed) for seed in range(args.images)]
+    print(f"Average upload {sum(map(len, batch)) // len(batch) // 1024} KiB")
+
+    # Start the workers before timing so process spawn isn't counted
+    await render_image(batch[0])
+
+    await _run("inline", batch, _inline)
+    await _run(f"pool x{settings.MEDIA_PROCESS_WORKERS}", batch, _pooled)
+    shutdown_image_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40, help="uploads in the batch (default 40)")
+    parser.add_argument("--size", default="3000x2000", help="photo dimensions WxH (default 3000x2000)")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(args))
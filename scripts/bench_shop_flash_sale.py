@@ -0,0 +1,147 @@
+"""Flash-sale benchmark for limited-stock shop purchases.
+
+Creates a throwaway item with ``--stock`` units and a per-student limit,
+plus ``--buyers`` throwaway students who can all afford it. Then every
+student tries to buy ``--attempts`` units at the same moment through
+``ShopService.purchase_item``. Reports throughput and latency, and checks
+that stock never went negative, nobody went over the limit and every unit
+sold has exactly one ledger row. Everything it creates is deleted at the
+end.
+
+Usage:
+    uv run python scripts/bench_shop_flash_sale.py --buyers 500 --stock 100
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+import uuid
+from collections import Counter
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.config import get_settings
+from core.exceptions import BaseAPIError
+from db.models import LedgerDailyRollup, ShopItem, Transaction, User
+from services.shop_service import ShopService
+
+settings = get_settings()
+
+
+async def _setup(Session, args: argparse.Namespace, tag: str) -> tuple[int, list[int]]:
+    async with Session() as session:
+        item = ShopItem(
+            title="Flash sale item", price=5, stock=args.stock, per_user_limit=args.limit
+        )
+        users = [
+            User(
+                full_name=f"Buyer {i}",
+                username=f"bench_{tag}_{i}",
+                email=f"bench_{tag}_{i}@example.com",
+                balance=5 * args.attempts,
+            )
+            for i in range(args.buyers)
+        ]
+        session.add(item)
+        session.add_all(users)
+        await session.commit()
+        return item.id, [u.id for u in users]
+
+
+async def _buy(Session, item_id: int, user_id: int, latencies: list[float], outcomes: Counter) -> None:
+    async with Session() as session:
+        started = time.perf_counter()
+        try:
+            await ShopService(session).purchase_item(user_id, item_id)
+            outcomes["sold"] += 1
+        except BaseAPIError as e:
+            outcomes[str(e).split(".")[0]] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def _verify(Session, item_id: int, user_ids: list[int], args: argparse.Namespace) -> list[str]:
+    problems = []
+    async with Session() as session:
+        stock = await session.scalar(select(ShopItem.stock).where(ShopItem.id == item_id))
+        rows = await session.execute(
+            select(Transaction.user_id, func.count())
+            .where(Transaction.shop_item_id == item_id)
+            .group_by(Transaction.user_id)
+        )
+        per_user = dict(rows.all())
+        sold = sum(per_user.values())
+        balances = await session.execute(select(User.id, User.balance).where(User.id.in_(user_ids)))
+        for user_id, balance in balances.all():
+            if balance != 5 * (args.attempts - per_user.get(user_id, 0)):
+                problems.append(f"user {user_id} balance {balance} does not match purchases")
+    if stock is None or stock < 0:
+        problems.append(f"stock is {stock}")
+    if sold + stock != args.stock:
+        problems.append(f"oversold: {sold} sold + {stock} left != {args.stock}")
+    over = [u for u, n in per_user.items() if n > args.limit]
+    if over:
+        problems.append(f"{len(over)} users over the per-student limit")
+    print(f"Sold {sold} of {args.stock}; {stock} left; {len(per_user)} distinct buyers")
+    return problems
+
+
+async def _cleanup(Session, item_id: int, user_ids: list[int]) -> None:
+    async with Session() as session:
+        await session.execute(delete(Transaction).where(Transaction.shop_item_id == item_id))
+        await session.execute(delete(LedgerDailyRollup).where(LedgerDailyRollup.user_id.in_(user_ids)))
+        await session.execute(delete(ShopItem).where(ShopItem.id == item_id))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(settings.DATABASE_URL, pool_size=args.connections, max_overflow=0)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+    tag = uuid.uuid4().hex[:8]
+
+    item_id, user_ids = await _setup(Session, args, tag)
+    print(
+        f"{args.buyers} buyers x {args.attempts} attempts, stock {args.stock}, "
+        f"limit {args.limit}, {args.connections} connections"
+    )
+    try:
+        latencies, outcomes = [], Counter()
+        attempts = [u for u in user_ids for _ in range(args.attempts)]
+        started = time.perf_counter()
+        await asyncio.gather(*(_buy(Session, item_id, u, latencies, outcomes) for u in attempts))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        print(f"{len(attempts)} attempts in {elapsed:.2f}s: {len(attempts) / elapsed:.0f} attempts/s")
+        print(
+            f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms"
+        )
+        for outcome, count in outcomes.most_common():
+            print(f"  {count:5d}  {outcome}")
+
+        problems = await _verify(Session, item_id, user_ids, args)
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        if not problems:
+            print("OK: no overselling, limits held, balances match the ledger")
+    finally:
+        await _cleanup(Session, item_id, user_ids)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=1, help="units per student (default 1)")
+    parser.add_argument("--attempts", type=int, default=2, help="purchase attempts per student (default 2)")
+    parser.add_argument("--connections", type=int, default=20, help="database connections (default 20)")
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
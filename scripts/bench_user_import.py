@@ -0,0 +1,184 @@
+"""Benchmark the bulk Clerk import against creating users one by one.
+
+Generates a Clerk export of ``--users`` throwaway users (names drawn from a
+small pool, so many share a base username) in JSON or CSV, with
+``--existing`` of them already present without a Clerk id. Imports it with
+``import_clerk_users``, then imports it again to time the no-op re-run.
+For comparison, creates ``--baseline`` users through
+``create_user_service`` (the path a ``user.created`` webhook or first login
+takes) and extrapolates. Checks that every user exists exactly once with
+one welcome bonus. Everything it creates is deleted at the end.
+
+Usage:
+    uv run python scripts/bench_user_import.py --users 50000
+    uv run python scripts/bench_user_import.py --users 50000 --format csv
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.config import get_settings
+from db.models import LedgerDailyRollup, Transaction, User
+from schemas import UserCreate
+from services.user_import_service import import_clerk_users
+from services.user_service import create_user_service
+from utils.clerk_export import iter_clerk_export
+
+settings = get_settings()
+
+FIRST_NAMES = ["Ada", "Ben", "Chloe", "Dev", "Ella", "Finn", "Grace", "Hana", "Ivan", "Jo"]
+LAST_NAMES = ["Kim", "Lopez", "Meyer", "Nguyen", "Okafor", "Patel", "Quinn", "Rossi", "Sato", "Tan"]
+
+
+def _write_export(path: str, fmt: str, tag: str, count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["id", "first_name", "last_name", "username", "primary_email_address"])
+        else:
+            f.write("[\n")
+        for i in range(count):
+            first = rng.choice(FIRST_NAMES)
+            # Most students get a numbered surname; the rest share a base username
+            last = f"{rng.choice(LAST_NAMES)}{i}" if rng.random() < 0.8 else rng.choice(LAST_NAMES)
+            clerk_id, email = f"{tag}_user_{i}", f"{tag}.student{i}@example.com"
+            if fmt == "csv":
+                writer.writerow([clerk_id, first, last, "", email])
+                continue
+            user = {
+                "id": clerk_id,
+                "first_name": first,
+                "last_name": last,
+                "primary_email_address_id": f"idn_{i}",
+                "email_addresses": [{"id": f"idn_{i}", "email_address": email}],
+            }
+            f.write(("," if i else "") + json.dumps(user) + "\n")
+        if fmt != "csv":
+            f.write("]\n")
+
+
+async def _import(Session, path: str, fmt: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        async with Session() as session:
+            started = time.perf_counter()
+            result = await import_clerk_users(session, iter_clerk_export(f, fmt))
+            return result, time.perf_counter() - started
+
+
+async def _baseline(Session, tag: str, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        async with Session() as session:
+            await create_user_service(
+                session,
+                UserCreate(
+                    email=f"{tag}.baseline{i}@example.com",
+                    full_name=f"{FIRST_NAMES[i % 10]} {LAST_NAMES[i % 10]}",
+                    clerk_user_id=f"{tag}_baseline_{i}",
+                ),
+            )
+    return time.perf_counter() - started
+
+
+async def _verify(Session, tag: str, expected: int, created: int) -> list[str]:
+    problems = []
+    async with Session() as session:
+        users = select(User.id).where(User.clerk_user_id.like(f"{tag}_user_%"))
+        count = await session.scalar(select(func.count()).select_from(users.subquery()))
+        bonuses = await session.execute(
+            select(Transaction.user_id, func.count())
+            .where(Transaction.user_id.in_(users), Transaction.description == "Welcome Bonus")
+            .group_by(Transaction.user_id)
+        )
+        per_user = dict(bonuses.all())
+    if count != expected:
+        problems.append(f"{count} users imported, expected {expected}")
+    if len(per_user) != created or any(n != 1 for n in per_user.values()):
+        problems.append("not every created user has exactly one welcome bonus")
+    return problems
+
+
+async def _cleanup(Session, tag: str) -> None:
+    async with Session() as session:
+        user_ids = select(User.id).where(
+            User.clerk_user_id.like(f"{tag}_%") | User.email.like(f"{tag}.%")
+        )
+        await session.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+        await session.execute(delete(LedgerDailyRollup).where(LedgerDailyRollup.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+    tag = "bench" + uuid.uuid4().hex[:8]
+    fd, path = tempfile.mkstemp(suffix=f".{args.format}")
+    os.close(fd)
+    try:
+        _write_export(path, args.format, tag, args.users, args.seed)
+        print(f"Export: {args.users} users, {os.path.getsize(path) / 1e6:.1f} MB {args.format}")
+
+        # Accounts that signed up before Clerk ids were tracked
+        async with Session() as session:
+            session.add_all(
+                User(email=f"{tag}.student{i}@example.com", full_name="Existing", username=f"@{tag}.existing{i}")
+                for i in range(0, args.users, max(1, args.users // max(1, args.existing)))
+            )
+            await session.commit()
+
+        result, elapsed = await _import(Session, path, args.format)
+        created = result.inserted
+        print(
+            f"Import: {elapsed:.2f}s, {result.read / elapsed:.0f} users/s "
+            f"({result.inserted} created, {result.linked} linked, {result.updated} updated)"
+        )
+        result, elapsed = await _import(Session, path, args.format)
+        print(
+            f"Re-import: {elapsed:.2f}s ({result.inserted} created, {result.linked} linked, "
+            f"{result.updated} updated)"
+        )
+
+        if args.baseline:
+            elapsed = await _baseline(Session, tag, args.baseline)
+            rate = args.baseline / elapsed
+            print(
+                f"create_user_service: {args.baseline} users in {elapsed:.2f}s, {rate:.0f} users/s "
+                f"(~{args.users / rate:.0f}s for {args.users})"
+            )
+
+        problems = await _verify(Session, tag, args.users, created)
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        if not problems:
+            print("OK: every user imported once, one welcome bonus per created user")
+    finally:
+        os.remove(path)
+        await _cleanup(Session, tag)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--existing", type=int, default=500, help="users already present by email (default 500)")
+    parser.add_argument("--baseline", type=int, default=500, help="users created one by one (default 500, 0 skips)")
+    parser.add_argument("--seed", type=int, default=1)
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,265 @@
+"""Replay a burst of Clerk webhook deliveries through the inbox.
+
+Posts every delivery to ``POST /api/v1/webhooks/clerk`` in-process (signed
+with ``CLERK_WEBHOOK_SECRET``, or a throwaway secret if none is set) and
+reports how fast they are acknowledged. Then drains the inbox with
+``process_webhook_inbox`` and reports how fast events are applied, and
+checks the resulting users against the last event for each.
+
+The burst is either read from a recording (``--replay``, one
+``{"svix_id": ..., "payload": {...}}`` object per line) or generated:
+``--users`` sign-ups, each followed by ``--updates`` profile edits, with
+``--deletes`` of them deleted again and ``--duplicates`` of all deliveries
+redelivered by Svix. ``--record`` saves the generated burst for later
+replays. Ids and emails are prefixed per run, so a recording can be replayed
+any number of times. Everything the run creates is deleted at the end.
+
+Compare ``--batch-size 1`` (one event per transaction, like the old inline
+handler) with the default batch size.
+
+Usage:
+    uv run python scripts/bench_webhook_inbox.py --users 2000 --record burst.jsonl
+    uv run python scripts/bench_webhook_inbox.py --replay burst.jsonl --batch-size 1
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import sys
+import time
+import uuid
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.config import get_settings
+from db.models import LedgerDailyRollup, Transaction, User, WebhookInboxEvent
+from services.webhook_service import process_webhook_inbox
+
+settings = get_settings()
+
+
+def _user_data(clerk_id: str, email: str, first: str, last: str) -> dict:
+    return {
+        "id": clerk_id,
+        "first_name": first,
+        "last_name": last,
+        "primary_email_address_id": f"idn_{clerk_id}",
+        "email_addresses": [
+            {"id": f"idn_{clerk_id}", "email_address": email, "verification": {"status": "verified"}}
+        ],
+    }
+
+
+def generate_burst(args: argparse.Namespace) -> list[dict]:
+    rng = random.Random(args.seed)
+    deliveries = []
+    for i in range(args.users):
+        # Users sign up over the same window, so their events interleave
+        timestamp = 1_700_000_000_000 + rng.randint(0, args.users * 20)
+        clerk_id = f"user_{i:06d}"
+        email = f"student{i}@example.com"
+        events = [("user.created", _user_data(clerk_id, email, "Student", f"{i}"))]
+        for n in range(args.updates):
+            events.append(("user.updated", _user_data(clerk_id, email, "Student", f"{i} v{n + 1}")))
+        if i < args.deletes:
+            events.append(("user.deleted", {"id": clerk_id, "deleted": True}))
+        for event_type, data in events:
+            timestamp += rng.randint(1, 500)
+            deliveries.append({
+                "svix_id": f"msg_{len(deliveries):07d}",
+                "payload": {"type": event_type, "object": "event", "timestamp": timestamp, "data": data},
+            })
+    deliveries.sort(key=lambda d: d["payload"]["timestamp"])
+    # Svix retries a delivery some time after the original attempt
+    retries = [
+        (rng.randint(position + 1, len(deliveries)), delivery)
+        for position, delivery in enumerate(deliveries)
+        if rng.random() < args.duplicates
+    ]
+    for position, delivery in sorted(retries, key=lambda r: r[0], reverse=True):
+        deliveries.insert(position, delivery)
+    return deliveries
+
+
+def _tagged(deliveries: list[dict], tag: str) -> list[dict]:
+    """Prefix svix ids, Clerk ids and emails so each run is independent."""
+    text = json.dumps(deliveries)
+    text = text.replace('"msg_', f'"{tag}_msg_').replace('"user_', f'"{tag}_user_')
+    text = text.replace('"idn_', f'"{tag}_idn_').replace('"student', f'"{tag}.student')
+    return json.loads(text)
+
+
+def _sign(secret_bytes: bytes, svix_id: str, timestamp: str, body: bytes) -> str:
+    signed = f"{svix_id}.{timestamp}.{body.decode('utf-8')}".encode()
+    return "v1," + base64.b64encode(hmac.new(secret_bytes, signed, hashlib.sha256).digest()).decode()
+
+
+async def _ingest(deliveries: list[dict], concurrency: int) -> list[float]:
+    from app import app
+
+    if not settings.CLERK_WEBHOOK_SECRET:
+        settings.CLERK_WEBHOOK_SECRET = "whsec_" + base64.b64encode(secrets.token_bytes(24)).decode()
+    secret = settings.CLERK_WEBHOOK_SECRET.removeprefix("whsec_")
+    secret_bytes = base64.b64decode(secret)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for delivery in deliveries:
+        queue.put_nowait(delivery)
+    latencies: list[float] = []
+
+    async def sender(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            delivery = queue.get_nowait()
+            body = json.dumps(delivery["payload"]).encode()
+            timestamp = str(int(time.time()))
+            headers = {
+                "content-type": "application/json",
+                "svix-id": delivery["svix_id"],
+                "svix-timestamp": timestamp,
+                "svix-signature": _sign(secret_bytes, delivery["svix_id"], timestamp, body),
+            }
+            started = time.perf_counter()
+            response = await client.post("/api/v1/webhooks/clerk", content=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(*(sender(client) for _ in range(concurrency)))
+    return latencies
+
+
+def _expected(deliveries: list[dict]) -> dict[str, tuple[str, bool]]:
+    """Final (full name, active) per Clerk user from the last event by timestamp."""
+    expected: dict[str, tuple[str, bool]] = {}
+    for delivery in sorted(deliveries, key=lambda d: d["payload"]["timestamp"]):
+        data = delivery["payload"]["data"]
+        if delivery["payload"]["type"] == "user.deleted":
+            if data["id"] in expected:
+                expected[data["id"]] = (expected[data["id"]][0], False)
+        else:
+            expected[data["id"]] = (f"{data['first_name']} {data['last_name']}", True)
+    return expected
+
+
+async def _verify(Session, deliveries: list[dict], tag: str) -> list[str]:
+    problems = []
+    expected = _expected(deliveries)
+    async with Session() as session:
+        rows = await session.execute(
+            select(User.id, User.clerk_user_id, User.full_name, User.is_active)
+            .where(User.clerk_user_id.like(f"{tag}_%"))
+        )
+        users = {r.clerk_user_id: r for r in rows.all()}
+        bonuses = await session.execute(
+            select(Transaction.user_id, func.count())
+            .where(Transaction.user_id.in_([u.id for u in users.values()]), Transaction.type == "credit")
+            .group_by(Transaction.user_id)
+        )
+        bonus_counts = dict(bonuses.all())
+        pending = await session.scalar(
+            select(func.count()).select_from(WebhookInboxEvent).where(
+                WebhookInboxEvent.svix_id.like(f"{tag}_%"), WebhookInboxEvent.processed_at.is_(None)
+            )
+        )
+    # A user created and deleted within one batch is never inserted
+    missing = [c for c, (_, active) in expected.items() if active and c not in users]
+    if missing:
+        problems.append(f"{len(missing)} users missing, e.g. {missing[0]}")
+    wrong = [c for c, (name, active) in expected.items()
+             if c in users and (users[c].full_name if active else False, users[c].is_active)
+             != (name if active else False, active)]
+    if wrong:
+        problems.append(f"{len(wrong)} users do not match their last event, e.g. {wrong[0]}")
+    doubled = [u for u, n in bonus_counts.items() if n != 1]
+    if doubled or len(bonus_counts) != len(users):
+        problems.append(f"{len(users) - len(bonus_counts) + len(doubled)} users without exactly one welcome bonus")
+    if pending:
+        problems.append(f"{pending} events left unprocessed")
+    return problems
+
+
+async def _cleanup(Session, tag: str) -> None:
+    async with Session() as session:
+        user_ids = select(User.id).where(User.clerk_user_id.like(f"{tag}_%"))
+        await session.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+        await session.execute(delete(LedgerDailyRollup).where(LedgerDailyRollup.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.clerk_user_id.like(f"{tag}_%")))
+        await session.execute(delete(WebhookInboxEvent).where(WebhookInboxEvent.svix_id.like(f"{tag}_%")))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.replay:
+        with open(args.replay) as f:
+            burst = [json.loads(line) for line in f if line.strip()]
+    else:
+        burst = generate_burst(args)
+        if args.record:
+            with open(args.record, "w") as f:
+                f.writelines(json.dumps(d) + "\n" for d in burst)
+            print(f"Recorded {len(burst)} deliveries to {args.record}")
+
+    tag = "bench" + uuid.uuid4().hex[:8]
+    deliveries = _tagged(burst, tag)
+    unique = len({d["svix_id"] for d in deliveries})
+    engine = create_async_engine(settings.DATABASE_URL)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+    try:
+        started = time.perf_counter()
+        latencies = await _ingest(deliveries, args.concurrency)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(
+            f"Ingest: {len(deliveries)} deliveries ({len(deliveries) - unique} redelivered) "
+            f"in {elapsed:.2f}s: {len(deliveries) / elapsed:.0f}/s, "
+            f"ack p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms"
+        )
+
+        started = time.perf_counter()
+        applied = batches = 0
+        async with Session() as session:
+            while claimed := await process_webhook_inbox(session, batch_size=args.batch_size):
+                applied += claimed
+                batches += 1
+        elapsed = time.perf_counter() - started
+        print(
+            f"Drain: {applied} events in {batches} batches of up to {args.batch_size} "
+            f"in {elapsed:.2f}s: {applied / elapsed:.0f} events/s"
+        )
+
+        problems = await _verify(Session, deliveries, tag)
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        if not problems:
+            print("OK: every user matches its last event, one welcome bonus each, inbox drained")
+    finally:
+        await _cleanup(Session, tag)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replay", help="JSONL recording to replay instead of generating a burst")
+    parser.add_argument("--record", help="save the generated burst to this JSONL file")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=2, help="profile edits per user (default 2)")
+    parser.add_argument("--deletes", type=int, default=100, help="users deleted again (default 100)")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share redelivered (default 0.1)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent deliveries (default 20)")
+    parser.add_argument("--batch-size", type=int, default=settings.WEBHOOK_INBOX_BATCH_SIZE)
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""Show that date-bounded ledger queries only touch the matching partitions.
+
+Seeds a year of transactions for a throwaway user inside a transaction,
+EXPLAINs the statements built by ``repositories.transaction_repository`` for a
+few date ranges, and checks which partitions appear in each plan. Everything
+is rolled back at the end, so it is safe to run against a dev database.
+
+Usage:
+    uv run python scripts/check_partition_pruning.py
+"""
+import asyncio
+import json
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from db.models import Transaction, User
+from db.partitions import (
+    add_months,
+    ensure_partitions,
+    is_partitioned,
+    list_monthly_partitions,
+    month_start,
+    partition_name,
+)
+from db.session import AsyncSessionLocal
+from repositories.transaction_repository import transactions_query
+
+MONTHS = 12
+ROWS_PER_MONTH = 200
+
+
+def _scanned_relations(plan: dict) -> set[str]:
+    names = set()
+    if "Relation Name" in plan:
+        names.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        names |= _scanned_relations(child)
+    return names
+
+
+async def _explain(session, stmt) -> set[str]:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {name for name in _scanned_relations(plan[0]["Plan"]) if name.startswith("transactions_")}
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as session:
+        if not await is_partitioned(session):
+            print("transactions is not partitioned; run `alembic upgrade head` first.")
+            return
+
+        current = month_start(datetime.now(timezone.utc).date())
+        await ensure_partitions(session, months_back=MONTHS, months_ahead=0)
+
+        user = User(full_name="Pruning Check", username="@pruning.check", email="pruning-check@example.invalid")
+        session.add(user)
+        await session.flush()
+        rows = []
+        for back in range(MONTHS):
+            month = add_months(current, -back)
+            for i in range(ROWS_PER_MONTH):
+                rows.append(Transaction(
+                    user_id=user.id,
+                    amount=1,
+                    type="credit",
+                    description="pruning check",
+                    created_at=datetime(month.year, month.month, 1 + i % 28, tzinfo=timezone.utc),
+                ))
+        session.add_all(rows)
+        await session.flush()
+        await session.execute(text("ANALYZE transactions"))
+        print(f"Seeded {len(rows)} transactions over {MONTHS} months for user {user.id}")
+
+        def at(month):
+            return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+        # (label, statement, first month allowed, first month no longer allowed)
+        cases = [
+            ("user history, current month", transactions_query(user_id=user.id, since=at(current)), current, None),
+            (
+                "user history, last 3 months",
+                transactions_query(user_id=user.id, since=at(add_months(current, -2))),
+                add_months(current, -2),
+                None,
+            ),
+            (
+                "admin listing, one past month",
+                transactions_query(since=at(add_months(current, -6)), until=at(add_months(current, -5))),
+                add_months(current, -6),
+                add_months(current, -5),
+            ),
+        ]
+
+        failures = 0
+        for label, stmt, first, stop in cases:
+            scanned = await _explain(session, stmt)
+            allowed = {
+                partition_name(m)
+                for m in await list_monthly_partitions(session)
+                if m >= first and (stop is None or m < stop)
+            }
+            # The default partition may legitimately show up for open-ended
+            # ranges, and the archive tier is a separate table
+            unexpected = scanned - allowed - {"transactions_default", "transactions_archive"}
+            status = "ok" if not unexpected else "NOT PRUNED"
+            failures += bool(unexpected)
+            print(f"[{status}] {label}: scanned {sorted(scanned)}")
+
+        await session.rollback()
+        print("Rolled back seed data.")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
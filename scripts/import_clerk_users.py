@@ -0,0 +1,52 @@
+"""Import users from a Clerk user export.
+
+Reads a JSON export (an array or JSON Lines of Clerk user objects, as
+returned by the Backend API) or the dashboard's CSV export, streaming it
+into Postgres with COPY and applying it in one transaction:
+- new users are created with a generated username and the welcome bonus
+- existing users (matched by Clerk id) get their email and name refreshed
+- accounts created before Clerk ids were tracked are linked by email
+
+Re-running with the same file is safe.
+
+Usage:
+    uv run python scripts/import_clerk_users.py users.json
+    uv run python scripts/import_clerk_users.py export.csv --format csv
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.session import AsyncSessionLocal
+from services.user_import_service import import_clerk_users
+from utils.clerk_export import detect_format, iter_clerk_export
+
+
+async def main(args: argparse.Namespace) -> None:
+    fmt = args.format or detect_format(args.path)
+    started = time.perf_counter()
+    with open(args.path, newline="", encoding="utf-8") as f:
+        async with AsyncSessionLocal() as session:
+            result = await import_clerk_users(session, iter_clerk_export(f, fmt))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Read {result.read} users in {elapsed:.1f}s: {result.inserted} created, "
+        f"{result.updated} updated, {result.linked} linked by email, "
+        f"{result.skipped} skipped (no id or email)."
+    )
+    if result.unmatched:
+        print(f"{result.unmatched} users could not be created; run the import again.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Clerk export file")
+    parser.add_argument("--format", choices=["json", "csv"], help="default: from the file extension")
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
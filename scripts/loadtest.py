@@ -0,0 +1,316 @@
+"""Load test: a scripted classroom driving the real app.
+
+Creates ``--users`` throwaway students and a shop item, then runs one virtual
+client per student for ``--seconds``. Each client repeatedly picks an action
+from the ``--mix`` weights, pausing around ``--think-ms`` between actions:
+
+    poll         GET  /users/me, with If-None-Match like the app sends
+    leaderboard  GET  /users/leaderboard
+    transfer     POST /transactions/transfer to a classmate
+    request      POST /requests/ to a classmate, who pays it (POST /requests/{id}/pay)
+    purchase     POST /shop/{id}/purchase
+    login        POST /auth/login with a Clerk-style session token
+
+By default the app runs in this process, lifespan included, behind an ASGI
+transport. Client and server then share one event loop, so the numbers are
+what one worker sustains with the client's overhead on top. With ``--url``
+the script drives a running server over HTTP instead. It still needs the
+server's DATABASE_URL and SECRET_KEY, to create the students and issue their
+tokens. Logins are skipped in that mode, because the server checks Clerk
+tokens against Clerk's real keys; in-process, the script signs its own and
+primes the JWKS cache with the matching key.
+
+Clients honour ``Retry-After`` on a 503. The first ``--warmup`` seconds are
+not counted. The JSON report gives requests, throughput, status counts and
+p50/p95/p99 latency per endpoint, plus totals, so runs can be compared
+(``--out`` also writes it to a file). Latencies leave out 503s: a request
+turned away by admission control says nothing about how long serving it
+takes. Everything the run creates is deleted
+at the end.
+
+Usage:
+    uv run python scripts/loadtest.py
+    uv run python scripts/loadtest.py --users 60 --seconds 60 --out run.json
+    uv run python scripts/loadtest.py --url http://localhost:8000 --mix poll=60,transfer=40
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from sqlalchemy import delete, or_, select
+
+from core.config import get_settings
+from core.security import create_access_token
+
+settings = get_settings()
+
+DEFAULT_MIX = "poll=40,leaderboard=15,transfer=15,request=10,purchase=10,login=10"
+_KID = "loadtest"
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in _ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; choose from {', '.join(_ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2) if ordered else 0.0
+
+
+class Student:
+    def __init__(self, user_id: int, email: str, clerk_user_id: str) -> None:
+        self.id = user_id
+        self.email = email
+        self.clerk_user_id = clerk_user_id
+        self.headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+        self.clerk_token: str | None = None
+        self.etag: str | None = None
+
+
+class Run:
+    def __init__(self, client: httpx.AsyncClient, students: list[Student], item_id: int, args: argparse.Namespace) -> None:
+        self.client = client
+        self.students = students
+        self.item_id = item_id
+        self.prefix = settings.API_V1_PREFIX
+        self.counting_from = time.monotonic() + args.warmup
+        self.deadline = self.counting_from + args.seconds
+        # endpoint -> [(status, seconds)]
+        self.results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+
+    async def call(self, endpoint: str, method: str, path: str, student: Student, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.client.request(method, self.prefix + path, **kwargs)
+        if self.counting_from <= started < self.deadline:
+            self.results[endpoint].append((response.status_code, time.monotonic() - started))
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+        return response
+
+    def peer(self, student: Student, rng: random.Random) -> Student:
+        other = rng.choice(self.students)
+        return other if other is not student else self.students[(self.students.index(student) + 1) % len(self.students)]
+
+
+async def _poll(run: Run, student: Student, rng: random.Random) -> None:
+    headers = dict(student.headers)
+    if student.etag:
+        headers["If-None-Match"] = student.etag
+    response = await run.call("GET /users/me", "GET", "/users/me", student, headers=headers)
+    student.etag = response.headers.get("etag", student.etag)
+
+
+async def _leaderboard(run: Run, student: Student, rng: random.Random) -> None:
+    await run.call("GET /users/leaderboard", "GET", "/users/leaderboard", student, headers=student.headers)
+
+
+async def _transfer(run: Run, student: Student, rng: random.Random) -> None:
+    await run.call(
+        "POST /transactions/transfer", "POST", "/transactions/transfer", student,
+        json={"recipient_id": run.peer(student, rng).id, "amount": 1, "description": "loadtest"},
+        headers=student.headers,
+    )
+
+
+async def _request(run: Run, student: Student, rng: random.Random) -> None:
+    payer = run.peer(student, rng)
+    response = await run.call(
+        "POST /requests/", "POST", "/requests/", student,
+        json={"recipient_id": payer.id, "amount": 1, "description": "loadtest"},
+        headers=student.headers,
+    )
+    if response.status_code == 201:
+        request_id = response.json()["id"]
+        await run.call("POST /requests/{id}/pay", "POST", f"/requests/{request_id}/pay", payer, headers=payer.headers)
+
+
+async def _purchase(run: Run, student: Student, rng: random.Random) -> None:
+    await run.call(
+        "POST /shop/{id}/purchase", "POST", f"/shop/{run.item_id}/purchase", student, headers=student.headers
+    )
+
+
+async def _login(run: Run, student: Student, rng: random.Random) -> None:
+    await run.call("POST /auth/login", "POST", "/auth/login", student, json={"token": student.clerk_token})
+
+
+_ACTIONS = {
+    "poll": _poll,
+    "leaderboard": _leaderboard,
+    "transfer": _transfer,
+    "request": _request,
+    "purchase": _purchase,
+    "login": _login,
+}
+
+
+def _prime_clerk(students: list[Student]) -> None:
+    """Sign a Clerk-style session token per student and make the in-process
+    app trust the key."""
+    from services import auth_service
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+    jwk["kid"] = _KID
+    settings.CLERK_ISSUER = settings.CLERK_ISSUER or "https://loadtest.invalid"
+    auth_service._jwks_cache = {"keys": [jwk]}
+    expires = datetime.now(timezone.utc) + timedelta(hours=6)
+    for student in students:
+        student.clerk_token = jwt.encode(
+            {"sub": student.clerk_user_id, "email": student.email, "iss": settings.CLERK_ISSUER.rstrip("/"), "exp": expires},
+            key,
+            algorithm="RS256",
+            headers={"kid": _KID},
+        )
+
+
+def _report(run: Run, args: argparse.Namespace, mix: dict[str, float]) -> dict:
+    endpoints = {}
+    statuses: Counter[int] = Counter()
+    for endpoint, samples in sorted(run.results.items()):
+        served = sorted(elapsed for status, elapsed in samples if status != 503)
+        counts = Counter(status for status, _ in samples)
+        statuses.update(counts)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / args.seconds, 2),
+            "p50_ms": _percentile(served, 0.50),
+            "p95_ms": _percentile(served, 0.95),
+            "p99_ms": _percentile(served, 0.99),
+            "max_ms": _percentile(served, 1.0),
+            "statuses": {str(status): n for status, n in sorted(counts.items())},
+        }
+    total = sum(statuses.values())
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "transport": args.url or "asgi",
+        "users": args.users,
+        "seconds": args.seconds,
+        "warmup_seconds": args.warmup,
+        "think_ms": args.think_ms,
+        "mix": mix,
+        "db_pool_size": settings.DB_POOL_SIZE,
+        "db_max_overflow": settings.DB_MAX_OVERFLOW,
+        "total_requests": total,
+        "throughput_rps": round(total / args.seconds, 2),
+        # Turned away by admission control
+        "shed": statuses[503],
+        "server_errors": sum(n for status, n in statuses.items() if status >= 500 and status != 503),
+        "endpoints": endpoints,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    from db.models import LedgerDailyRollup, Request, ShopItem, ShopPurchaseCount, ShopReservation, Transaction, User
+    from db.session import AsyncSessionLocal, engine
+
+    mix = dict(args.mix)
+    if args.url and mix.pop("login", None):
+        print("Skipping logins: a running server verifies Clerk tokens against Clerk", file=sys.stderr)
+    tag = "load" + uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as session:
+        users = [
+            User(
+                email=f"{tag}.{i}@example.com",
+                full_name=f"Student {i}",
+                username=f"@{tag}.{i}",
+                clerk_user_id=f"user_{tag}_{i}",
+                balance=1_000_000,
+            )
+            for i in range(max(args.users, 2))
+        ]
+        item = ShopItem(title=f"Load test item {tag}", price=1)
+        session.add_all([*users, item])
+        await session.commit()
+        students = [Student(user.id, user.email, user.clerk_user_id) for user in users]
+        item_id = item.id
+    user_ids = select(User.id).where(User.email.like(f"{tag}.%"))
+
+    try:
+        async with AsyncExitStack() as stack:
+            if args.url:
+                transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.users))
+                base_url = args.url.rstrip("/")
+            else:
+                # Imported here so the settings above apply to the in-process app
+                from app import create_app
+
+                app = create_app()
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                # The lifespan sets up logging; a line per request would drown the report
+                logging.getLogger("httpx").setLevel(logging.WARNING)
+                _prime_clerk(students)
+                transport = httpx.ASGITransport(app=app)
+                base_url = "http://loadtest"
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60)
+            )
+            run = Run(client, students, item_id, args)
+            names, weights = list(mix), list(mix.values())
+
+            async def virtual_client(student: Student, seed: int) -> None:
+                rng = random.Random(seed)
+                while time.monotonic() < run.deadline:
+                    await _ACTIONS[rng.choices(names, weights)[0]](run, student, rng)
+                    if args.think_ms:
+                        await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+            async with asyncio.TaskGroup() as group:
+                for i, student in enumerate(students):
+                    group.create_task(virtual_client(student, args.seed + i))
+
+        report = _report(run, args, mix)
+        output = json.dumps(report, indent=2)
+        print(output)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+            await session.execute(delete(LedgerDailyRollup).where(LedgerDailyRollup.user_id.in_(user_ids)))
+            await session.execute(
+                delete(Request).where(or_(Request.sender_id.in_(user_ids), Request.recipient_id.in_(user_ids)))
+            )
+            await session.execute(delete(ShopReservation).where(ShopReservation.item_id == item_id))
+            await session.execute(delete(ShopPurchaseCount).where(ShopPurchaseCount.item_id == item_id))
+            await session.execute(delete(ShopItem).where(ShopItem.id == item_id))
+            await session.execute(delete(User).where(User.id.in_(user_ids)))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--users", type=int, default=30, help="virtual students, one client each (default 30)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="measured duration (default 20)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds run before measuring (default 3)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a client's actions (default 0)")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help=f"action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""Maintain the monthly partitions of the transactions table.
+
+Usage:
+    uv run python scripts/manage_partitions.py --months-ahead 3
+    uv run python scripts/manage_partitions.py --detach-older-than 12
+
+Run it from cron (daily is plenty). The API also pre-creates partitions at
+startup, so this is mostly for detaching old months.
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.partitions import (
+    detach_partitions_older_than,
+    ensure_partitions,
+    is_partitioned,
+    list_monthly_partitions,
+    partition_name,
+)
+from db.session import AsyncSessionLocal
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as session:
+        if not await is_partitioned(session):
+            print("transactions is not partitioned; run `alembic upgrade head` first.")
+            return
+
+        created = await ensure_partitions(session, months_ahead=args.months_ahead)
+        await session.commit()
+        print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+
+        if args.detach_older_than is not None:
+            detached = await detach_partitions_older_than(session, args.detach_older_than)
+            await session.commit()
+            print(f"Detached {len(detached)} partition(s): {', '.join(detached) or '-'}")
+
+        months = await list_monthly_partitions(session)
+        print("Attached partitions:", ", ".join(partition_name(m) for m in months))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=3, help="future months to pre-create (default 3)")
+    parser.add_argument(
+        "--detach-older-than",
+        type=int,
+        default=None,
+        metavar="MONTHS",
+        help="detach partitions for months before the current month minus MONTHS",
+    )
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""Run background job workers outside the web process.
+
+Set JOB_WORKERS=0 on the app when jobs are processed here instead. Workers
+claim due jobs from the ``jobs`` table with FOR UPDATE SKIP LOCKED, so any
+number of these processes can run next to each other. Stopping a worker
+mid-batch rolls its batch back for another worker to pick up.
+
+Usage:
+    uv run python scripts/worker.py --workers 4
+    uv run python scripts/worker.py --once
+"""
+import argparse
+import asyncio
+import signal
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.logging import configure_logging
+from core.tasks import cancel_tasks
+from db.session import AsyncSessionLocal
+# Imported for the job handlers they register
+import services.challenge_service  # noqa: F401
+import services.shop_service  # noqa: F401
+from services.job_service import get_job_stats, process_jobs, run_job_worker
+from services.media_service import shutdown_image_pool
+
+
+async def _drain() -> int:
+    total = 0
+    async with AsyncSessionLocal() as session:
+        while claimed := await process_jobs(session):
+            total += claimed
+    return total
+
+
+async def main(args: argparse.Namespace) -> None:
+    configure_logging()
+    try:
+        await _run(args)
+    finally:
+        shutdown_image_pool()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    if args.once:
+        print(f"Processed {await _drain()} job(s).")
+        async with AsyncSessionLocal() as session:
+            for stats in await get_job_stats(session):
+                print(stats)
+        return
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    tasks = [
+        asyncio.create_task(run_job_worker(f"worker-{i}", AsyncSessionLocal))
+        for i in range(args.workers)
+    ]
+    print(f"Started {args.workers} job worker(s); Ctrl+C to stop.")
+    try:
+        await stop.wait()
+    finally:
+        await cancel_tasks(tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="concurrent workers (default 2)")
+    parser.add_argument("--once", action="store_true", help="process every due job, print stats and exit")
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(parser.parse_args()))
@@ -4,8 +4,15 @@ from .user_service import (
     get_user_service,
     list_users_service,
     get_leaderboard_service,
+    get_user_rank_service,
+    get_user_summary_service,
+)
+from .request_service import (
+    pay_request_service,
+    create_request_service,
+    create_requests_batch_service,
+    get_requests_normalized_service,
 )
-from .request_service import pay_request_service, create_request_service
 from .transaction_service import transfer_funds_service
 
 __all__ = [
@@ -15,7 +22,11 @@ __all__ = [
     "get_user_service",
     "list_users_service",
     "get_leaderboard_service",
+    "get_user_rank_service",
+    "get_user_summary_service",
     "pay_request_service",
     "create_request_service",
+    "create_requests_batch_service",
+    "get_requests_normalized_service",
     "transfer_funds_service",
 ]
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from repositories.archive_repository import archive_transactions_batch
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_old_transactions(
+    session: AsyncSession, *, older_than_days: int, batch_size: int = 5000
+) -> int:
+    """Move transactions older than ``older_than_days`` into the archive tier.
+
+    Each batch commits on its own so locks are short and an interrupted run
+    simply resumes on the next call. Returns the total number of rows moved.
+    """
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        moved = await archive_transactions_batch(session, before, batch_size=batch_size)
+        await session.commit()
+        total += moved
+        if moved < batch_size:
+            break
+    if total:
+        logger.info("Archived %d transactions created before %s", total, before.isoformat())
+    return total
+
+
+trace_module(__name__, "service")
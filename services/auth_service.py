@@ -10,18 +10,28 @@ from jwt.algorithms import RSAAlgorithm
 from fastapi import HTTPException, status
 
 from core.config import get_settings
+from core.metrics import Counter
+from core.tracing import trace_module
 
 settings = get_settings()
 
 # Cache for JWKS keys to avoid fetching on every request
 _jwks_cache: dict | None = None
 
+JWKS_CACHE_REQUESTS = Counter(
+    "auth_jwks_cache_requests_total", "Clerk JWKS lookups by cache result (hit or miss).", ("result",)
+)
+_JWKS_HIT = JWKS_CACHE_REQUESTS.labels("hit")
+_JWKS_MISS = JWKS_CACHE_REQUESTS.labels("miss")
+
 
 async def fetch_clerk_jwks() -> dict:
     """Fetch Clerk's JWKS (JSON Web Key Set) for token verification."""
     global _jwks_cache
     if _jwks_cache is not None:
+        _JWKS_HIT.inc()
         return _jwks_cache
+    _JWKS_MISS.inc()
     
     if not settings.CLERK_ISSUER:
         raise HTTPException(
@@ -166,3 +176,6 @@ async def get_clerk_user_info(token: str) -> dict:
         "email": email,
         "full_name": full_name,
     }
+
+
+trace_module(__name__, "service")
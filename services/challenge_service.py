@@ -2,20 +2,112 @@ from typing import List
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import Challenge
-from repositories import challenge_repository
-from schemas.challenge import ChallengeCreate
+from core.exceptions import AlreadyExistsError, NotFoundError
+from core.tracing import trace_module
+from db.events import LedgerEntry, stage_ledger_entries
+from db.models import Challenge, ChallengeCompletion
+from repositories import challenge_repository, get_users_by_ids
+from schemas.challenge import ChallengeCreate, ChallengePayout
+from services.job_service import enqueue_job, job_handler
+from services.media_service import render_stored_image, store_image
+from services.user_event_service import ledger_event, publish_user_events
 
 async def get_challenges(
     session: AsyncSession, offset: int = 0, limit: int = 100
 ) -> List[Challenge]:
     return await challenge_repository.get_challenges(session, offset=offset, limit=limit)
 
+async def get_challenges_version(session: AsyncSession) -> tuple[int, int, int]:
+    return await challenge_repository.get_challenges_marker(session)
+
 async def create_challenge(
     session: AsyncSession, challenge_in: ChallengeCreate
 ) -> Challenge:
-    return await challenge_repository.create_challenge(session, challenge_in)
+    image_hash = await store_image(session, challenge_in.image) if challenge_in.image else None
+    challenge = await challenge_repository.create_challenge(session, challenge_in, image_hash=image_hash)
+    if image_hash:
+        enqueue_job(session, "render_challenge_image", {"challenge_id": challenge.id, "source": image_hash})
+    await session.commit()
+    return challenge
+
+
+@job_handler("render_challenge_image")
+async def _render_challenge_image(session: AsyncSession, payload: dict) -> None:
+    image = await render_stored_image(session, payload["source"])
+    if image is not None:
+        await challenge_repository.set_image_derivatives(
+            session, payload["challenge_id"], payload["source"], full=image.full, card=image.card, thumb=image.thumb
+        )
 
 
 async def delete_challenge(session: AsyncSession, challenge_id: int) -> bool:
     return await challenge_repository.delete_challenge(session, challenge_id)
+
+
+async def submit_completion(
+    session: AsyncSession, challenge_id: int, user_id: int
+) -> ChallengeCompletion:
+    if await challenge_repository.get_challenge(session, challenge_id) is None:
+        raise NotFoundError("Challenge not found")
+    completion = await challenge_repository.create_completion(session, challenge_id, user_id)
+    if completion is None:
+        raise AlreadyExistsError("Challenge already submitted")
+    await session.commit()
+    return completion
+
+
+async def get_completions(
+    session: AsyncSession,
+    challenge_id: int,
+    *,
+    status: str | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> List[ChallengeCompletion]:
+    return await challenge_repository.get_completions(
+        session, challenge_id, status=status, offset=offset, limit=limit
+    )
+
+
+async def approve_completions(
+    session: AsyncSession,
+    challenge_id: int,
+    user_ids: List[int] | None = None,
+    *,
+    admin_id: int | None = None,
+) -> ChallengePayout:
+    """Pay the challenge reward to ``user_ids`` (default: every pending
+    submission) in one statement and one commit.
+
+    Students already paid for this challenge are skipped, so approving the
+    same list twice, or concurrently, pays each student once.
+    """
+    challenge = await challenge_repository.get_challenge(session, challenge_id)
+    if challenge is None:
+        raise NotFoundError("Challenge not found")
+    if user_ids is None:
+        user_ids = await challenge_repository.get_pending_completion_user_ids(session, challenge_id)
+    else:
+        user_ids = list(dict.fromkeys(user_ids))
+        found = {user.id for user in await get_users_by_ids(session, user_ids)}
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            raise NotFoundError(f"Users not found: {', '.join(map(str, missing))}")
+
+    rows = await challenge_repository.pay_completions(session, challenge_id, user_ids, admin_id=admin_id)
+    stage_ledger_entries(
+        session, [LedgerEntry(row.user_id, row.amount, row.type, row.created_at) for row in rows]
+    )
+    await publish_user_events(session, [ledger_event(row) for row in rows])
+    await session.commit()
+
+    paid = {row.user_id for row in rows}
+    return ChallengePayout(
+        challenge_id=challenge_id,
+        reward=challenge.reward,
+        paid_user_ids=[user_id for user_id in user_ids if user_id in paid],
+        already_paid_user_ids=[user_id for user_id in user_ids if user_id not in paid],
+    )
+
+
+trace_module(__name__, "service")
@@ -0,0 +1,194 @@
+"""Postgres-backed background jobs.
+
+Producers call ``enqueue_job`` with the session of their business write, so
+the job commits (or rolls back) with it. Workers claim due jobs in batches
+with ``FOR UPDATE SKIP LOCKED`` and run each one in a savepoint of the
+claiming transaction: a job's own writes and its removal from the queue
+commit together, and a worker that dies mid-batch just releases its locks
+for another worker to pick the jobs up.
+
+A failing job is retried with exponential backoff (with jitter) until it has
+used ``max_attempts``, then marked ``failed`` and kept for inspection.
+Handlers run inside the worker's transaction, so they should be short and
+must not commit.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import get_settings
+from core.tracing import trace_module
+from db.events import savepoint
+from db.models import Job
+from repositories import job_repository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+JobHandler = Callable[[AsyncSession, dict[str, Any]], Awaitable[None]]
+
+_handlers: dict[str, JobHandler] = {}
+
+# Latency samples kept per kind for percentiles
+_SAMPLES = 1000
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register the handler for ``kind``. Usable as a decorator."""
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+@dataclass
+class JobKindMetrics:
+    """Outcomes and latencies of jobs run by this process."""
+
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    # Seconds from when a job was due until a worker started it
+    wait: deque = field(default_factory=lambda: deque(maxlen=_SAMPLES))
+    # Seconds the handler ran
+    run: deque = field(default_factory=lambda: deque(maxlen=_SAMPLES))
+
+
+job_metrics: dict[str, JobKindMetrics] = defaultdict(JobKindMetrics)
+
+
+def enqueue_job(
+    session: AsyncSession,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    delay_seconds: float = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    """Queue ``kind`` to run after the caller commits ``session``."""
+    run_at = None
+    if delay_seconds > 0:
+        run_at = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+    return job_repository.add_job(
+        session,
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at,
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number ``attempts``: doubling from
+    ``JOB_RETRY_BASE_SECONDS`` up to ``JOB_RETRY_MAX_SECONDS``, jittered down
+    by up to half so failed jobs don't retry in lockstep."""
+    delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def process_jobs(session: AsyncSession, *, batch_size: int | None = None) -> int:
+    """Claim and run one batch of due jobs, then commit. Returns jobs claimed."""
+    jobs = await job_repository.claim_jobs(session, batch_size=batch_size or settings.JOB_BATCH_SIZE)
+    if not jobs:
+        await session.rollback()
+        return 0
+
+    done = []
+    for job in jobs:
+        metrics = job_metrics[job.kind]
+        started = time.perf_counter()
+        metrics.wait.append(max(0.0, (datetime.now(timezone.utc) - job.run_at).total_seconds()))
+        try:
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+            async with savepoint(session):
+                await handler(session, job.payload)
+        except Exception as e:
+            attempts = job.attempts + 1
+            error = f"{type(e).__name__}: {e}"[:1000]
+            if attempts >= job.max_attempts:
+                metrics.failed += 1
+                logger.error("Job %s (%s) failed permanently after %d attempts: %s", job.id, job.kind, attempts, error)
+                await job_repository.fail_job(session, job.id, attempts=attempts, error=error)
+            else:
+                metrics.retried += 1
+                delay = retry_delay(attempts)
+                logger.warning("Job %s (%s) failed, retrying in %.0fs: %s", job.id, job.kind, delay, error)
+                run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                await job_repository.retry_job(session, job.id, attempts=attempts, run_at=run_at, error=error)
+        else:
+            metrics.succeeded += 1
+            done.append(job.id)
+        metrics.run.append(time.perf_counter() - started)
+
+    await job_repository.delete_jobs(session, done)
+    await session.commit()
+    return len(jobs)
+
+
+async def run_job_worker(name: str, session_factory: async_sessionmaker[AsyncSession]) -> None:
+    """Process jobs until cancelled, sleeping ``JOB_POLL_SECONDS`` when idle."""
+    batch_size = settings.JOB_BATCH_SIZE
+    while True:
+        try:
+            async with session_factory() as session:
+                claimed = await process_jobs(session, batch_size=batch_size)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job worker %s failed", name)
+            claimed = 0
+        if claimed < batch_size:
+            await asyncio.sleep(settings.JOB_POLL_SECONDS)
+
+
+def _percentile(samples: deque, q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def get_job_stats(session: AsyncSession) -> list[dict[str, Any]]:
+    """Queue depth per kind from the database, with this process's outcome
+    counters and latency percentiles (milliseconds)."""
+    now = datetime.now(timezone.utc)
+    depth = {row.kind: row for row in await job_repository.get_queue_depth(session)}
+    stats = []
+    for kind in sorted(set(depth) | set(job_metrics) | set(_handlers)):
+        row = depth.get(kind)
+        metrics = job_metrics.get(kind) or JobKindMetrics()
+        stats.append({
+            "kind": kind,
+            "queued": row.queued if row else 0,
+            "ready": row.ready if row else 0,
+            "failed": row.failed if row else 0,
+            "oldest_ready_seconds": (
+                (now - row.oldest_ready_at).total_seconds() if row and row.oldest_ready_at else None
+            ),
+            "succeeded_total": metrics.succeeded,
+            "retried_total": metrics.retried,
+            "failed_total": metrics.failed,
+            "wait_p50_ms": _ms(_percentile(metrics.wait, 0.5)),
+            "wait_p95_ms": _ms(_percentile(metrics.wait, 0.95)),
+            "run_p50_ms": _ms(_percentile(metrics.run, 0.5)),
+            "run_p95_ms": _ms(_percentile(metrics.run, 0.95)),
+        })
+    return stats
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+trace_module(__name__, "service")
@@ -0,0 +1,122 @@
+"""In-process leaderboard.
+
+The all-time ranking is built from the database aggregate at startup, kept
+current by commit hooks on ledger writes in this process, and periodically
+reconciled against the database to pick up writes made by other workers or
+outside the ORM.
+
+Day/week/month leaderboards are answered from the daily ledger rollups and
+cached per window until the current bucket changes.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import get_settings
+from core.tracing import trace_module
+from db.events import CommitBatch, on_commit
+from repositories import get_earnings_leaderboard_since, get_users_with_cumulative_earnings
+from utils.ranking import RankedUser, RankIndex
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LeaderboardWindow = Literal["day", "week", "month", "all"]
+
+leaderboard = RankIndex()
+
+# (window, bucket start, offset, limit) -> (cached at, entries)
+_window_cache: dict[tuple[str, date, int, int], tuple[float, list[RankedUser]]] = {}
+
+
+async def _load_rows(session: AsyncSession) -> list[RankedUser]:
+    rows = await get_users_with_cumulative_earnings(session, offset=0, limit=None)
+    return [RankedUser(r.id, r.username, r.full_name, int(r.cumulative_earned)) for r in rows]
+
+
+async def rebuild_leaderboard(session: AsyncSession) -> None:
+    rows = await _load_rows(session)
+    leaderboard.load(rows)
+    logger.info("Leaderboard built with %d users", len(rows))
+
+
+async def reconcile_leaderboard(session: AsyncSession) -> int:
+    """Compare the index with the database aggregate and correct any drift.
+
+    Returns the number of users whose entry had to be corrected.
+    """
+    # Commit hooks may update the index while the query runs; entries they
+    # touch are newer than the snapshot and are checked next time instead
+    since = leaderboard.generation
+    rows = await _load_rows(session)
+    if not leaderboard.ready:
+        leaderboard.load(rows)
+        return 0
+    drifted = leaderboard.reconcile(rows, since)
+    if drifted:
+        logger.warning("Leaderboard reconciled: corrected %d users", drifted)
+    return drifted
+
+
+async def ensure_leaderboard(session: AsyncSession) -> RankIndex:
+    if not leaderboard.ready:
+        await rebuild_leaderboard(session)
+    return leaderboard
+
+
+def window_start(window: LeaderboardWindow, today: date | None = None) -> date:
+    """First UTC day of the current bucket for ``window``."""
+    today = today or datetime.now(timezone.utc).date()
+    if window == "week":
+        return today - timedelta(days=today.weekday())
+    if window == "month":
+        return today.replace(day=1)
+    return today
+
+
+async def get_windowed_leaderboard(
+    session: AsyncSession,
+    window: LeaderboardWindow,
+    *,
+    offset: int = 0,
+    limit: int = 100,
+) -> list[RankedUser]:
+    if window == "all":
+        board = await ensure_leaderboard(session)
+        return board.page(offset=offset, limit=limit)
+
+    since = window_start(window)
+    key = (window, since, offset, limit)
+    cached = _window_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < settings.LEADERBOARD_WINDOW_CACHE_SECONDS:
+        return cached[1]
+
+    rows = await get_earnings_leaderboard_since(session, since, offset=offset, limit=limit)
+    entries = [RankedUser(r.id, r.username, r.full_name, int(r.cumulative_earned)) for r in rows]
+    # Drop entries from buckets that have rolled over
+    for stale in [k for k in _window_cache if k[0] == window and k[1] != since]:
+        del _window_cache[stale]
+    _window_cache[key] = (time.monotonic(), entries)
+    return entries
+
+
+@on_commit
+def _apply_committed_writes(batch: CommitBatch) -> None:
+    if any(entry.amount > 0 for entry in batch.ledger) or batch.users:
+        # Earnings or names in the current buckets changed
+        _window_cache.clear()
+    if not leaderboard.ready:
+        return
+    for profile in batch.users:
+        leaderboard.set_profile(profile.id, profile.username, profile.full_name)
+    for entry in batch.ledger:
+        if entry.amount > 0:
+            leaderboard.add_earned(entry.user_id, entry.amount)
+
+
+trace_module(__name__, "service")
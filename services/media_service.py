@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import get_settings
+from core.exceptions import BadRequestError
+from core.tracing import trace_module
+from repositories.media_repository import put_blob, read_blob
+from utils.images import DERIVATIVE_CONTENT_TYPE, probe_image, render_derivatives
+from utils.media import content_hash, decode_image
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_pool: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    """Media hashes of the derivatives of one upload."""
+
+    full: str
+    card: str
+    thumb: str
+
+
+def _get_pool() -> tuple[ProcessPoolExecutor, asyncio.Semaphore]:
+    """Create the worker pool on first use.
+
+    Workers are spawned rather than forked so they don't inherit the event
+    loop or open database connections. The semaphore bounds queued jobs, so a
+    burst of uploads waits here instead of piling decoded images into the
+    pool's queue.
+    """
+    global _pool, _slots
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.MEDIA_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _slots = asyncio.Semaphore(settings.MEDIA_PROCESS_WORKERS * 2)
+    return _pool, _slots
+
+
+def shutdown_image_pool() -> None:
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _slots = None, None
+
+
+async def render_image(data: bytes) -> dict[str, bytes]:
+    """Render the derivatives of ``data`` in the worker pool."""
+    pool, slots = _get_pool()
+    async with slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, render_derivatives, data)
+
+
+async def store_image(session: AsyncSession, value: str) -> str:
+    """Decode and check a base64 upload and store it as is.
+
+    Returns its media hash. Rendering the derivatives is left to a job the
+    caller queues with the row that references the upload (see
+    ``render_stored_image``); until it runs, every size serves the upload.
+    Does not commit; the blob is written in the caller's transaction.
+    """
+    try:
+        data, content_type = decode_image(value)
+    except ValueError as e:
+        raise BadRequestError(str(e))
+    if len(data) > settings.MEDIA_MAX_BYTES:
+        raise BadRequestError(f"Image exceeds {settings.MEDIA_MAX_BYTES} bytes")
+    if not content_type.startswith("image/"):
+        raise BadRequestError("Unsupported image format; use PNG, JPEG, GIF or WebP")
+
+    try:
+        probe_image(data)
+    except ValueError as e:
+        raise BadRequestError(str(e))
+
+    digest = content_hash(data)
+    await put_blob(session, digest, content_type, data)
+    return digest
+
+
+async def render_stored_image(session: AsyncSession, digest: str) -> StoredImage | None:
+    """Render the derivatives of the stored upload ``digest`` and store them.
+
+    Returns None if the upload turns out not to decode, which a retry would
+    not change. Does not commit.
+    """
+    data = await read_blob(session, digest)
+    try:
+        rendered = await render_image(data)
+    except ValueError as e:
+        logger.warning("Keeping upload %s without derivatives: %s", digest, e)
+        return None
+
+    hashes = {}
+    for name, derivative in rendered.items():
+        digest = content_hash(derivative)
+        await put_blob(session, digest, DERIVATIVE_CONTENT_TYPE, derivative)
+        hashes[name] = digest
+    return StoredImage(**hashes)
+
+
+trace_module(__name__, "service")
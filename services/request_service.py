@@ -1,12 +1,25 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from db.models import Request, User
-from repositories.transaction_repository import create_transaction
+from repositories.request_repository import (
+    create_requests,
+    expire_requests_batch,
+    get_requests_by_user_id,
+)
+from repositories.transaction_repository import add_transaction
+from repositories.user_repository import get_users_by_ids
 from schemas.transaction import TransactionCreate
-from schemas.request import RequestCreate
+from schemas.request import RequestBatchCreate, RequestCreate
 from core.exceptions import NotFoundError, ForbiddenError, BadRequestError
+from core.tracing import trace_module
+from services.user_event_service import ledger_event, publish_user_events, request_event
+
+logger = logging.getLogger(__name__)
 
 async def create_request_service(session: AsyncSession, request_in: RequestCreate, sender_id: int):
     # Check if recipient exists
@@ -30,6 +43,8 @@ async def create_request_service(session: AsyncSession, request_in: RequestCreat
     )
     
     session.add(request)
+    await session.flush()
+    await publish_user_events(session, [request_event(request.recipient_id, request)])
     await session.commit()
     
     # Re-fetch request with relationships to avoid lazy loading issues
@@ -41,9 +56,53 @@ async def create_request_service(session: AsyncSession, request_in: RequestCreat
     result = await session.execute(stmt)
     return result.scalars().first()
 
+MAX_BATCH_REQUESTS = 100
+
+
+async def create_requests_batch_service(
+    session: AsyncSession, batch_in: RequestBatchCreate, sender_id: int
+) -> dict:
+    """Create one request per entry in a single transaction.
+
+    All recipients are checked with one query and the requests inserted with
+    one statement; if any entry is invalid nothing is created. Returns the
+    requests with every referenced user side-loaded once.
+    """
+    entries = batch_in.requests
+    if not entries:
+        raise BadRequestError("No requests given")
+    if len(entries) > MAX_BATCH_REQUESTS:
+        raise BadRequestError(f"At most {MAX_BATCH_REQUESTS} requests per batch")
+    recipient_ids = [entry.recipient_id for entry in entries]
+    if sender_id in recipient_ids:
+        raise BadRequestError("Cannot send request to yourself")
+    if len(set(recipient_ids)) != len(recipient_ids):
+        raise BadRequestError("Each recipient can only appear once")
+
+    users = {user.id: user for user in await get_users_by_ids(session, [sender_id, *recipient_ids])}
+    missing = [recipient_id for recipient_id in recipient_ids if recipient_id not in users]
+    if missing:
+        raise NotFoundError(f"Recipients not found: {', '.join(map(str, missing))}")
+
+    requests = await create_requests(session, [
+        {
+            "sender_id": sender_id,
+            "recipient_id": entry.recipient_id,
+            "amount": entry.amount,
+            "description": entry.description,
+            "status": "pending",
+            "is_active": True,
+        }
+        for entry in entries
+    ])
+    await publish_user_events(session, [request_event(request.recipient_id, request) for request in requests])
+    await session.commit()
+    return {"items": requests, "users": users}
+
+
 async def pay_request_service(session: AsyncSession, request_id: int, user_id: int):
-    # Fetch request
-    stmt = select(Request).where(Request.id == request_id)
+    # Fetch and lock the request so the expiry sweeper can't close it mid-payment
+    stmt = select(Request).where(Request.id == request_id).with_for_update()
     result = await session.execute(stmt)
     request = result.scalars().first()
     
@@ -88,7 +147,7 @@ async def pay_request_service(session: AsyncSession, request_id: int, user_id: i
         recipient_id=request.sender_id,
         request_id=request.id
     )
-    await create_transaction(session, debit_transaction)
+    ledger = [await add_transaction(session, debit_transaction)]
 
     # Create transaction for Payee (Credit)
     if payee:
@@ -100,13 +159,20 @@ async def pay_request_service(session: AsyncSession, request_id: int, user_id: i
             recipient_id=user_id,
             request_id=request.id
         )
-        await create_transaction(session, credit_transaction)
+        ledger.append(await add_transaction(session, credit_transaction))
     
     # Update request
     request.is_active = False
     request.status = "completed"
     session.add(request)
-    
+
+    # One transaction for both ledger rows and the status, so the
+    # notifications go out with all of it or none
+    await publish_user_events(session, [
+        *(ledger_event(transaction) for transaction in ledger),
+        request_event(request.sender_id, request),
+        request_event(request.recipient_id, request),
+    ])
     await session.commit()
     
     # Re-fetch request with relationships to avoid lazy loading issues
@@ -117,3 +183,49 @@ async def pay_request_service(session: AsyncSession, request_id: int, user_id: i
     )
     result = await session.execute(stmt)
     return result.scalars().first()
+
+
+async def get_requests_normalized_service(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    active_only: bool = False,
+) -> dict:
+    """A page of the user's requests with each referenced user loaded once."""
+    requests = await get_requests_by_user_id(
+        session, user_id, offset=offset, limit=limit, with_users=False, active_only=active_only
+    )
+    user_ids = {r.sender_id for r in requests} | {r.recipient_id for r in requests}
+    users = await get_users_by_ids(session, user_ids)
+    return {"items": requests, "users": {user.id: user for user in users}}
+
+
+async def expire_stale_requests(
+    session: AsyncSession, *, older_than_days: int, batch_size: int = 1000
+) -> int:
+    """Mark active requests older than ``older_than_days`` as ``expired``.
+
+    Each batch commits on its own and skips rows other workers hold, so any
+    number of workers can sweep at once. Returns the number expired.
+    """
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        expired = await expire_requests_batch(session, before, batch_size=batch_size)
+        await publish_user_events(session, [
+            event
+            for request in expired
+            for event in (request_event(request.sender_id, request), request_event(request.recipient_id, request))
+        ])
+        await session.commit()
+        total += len(expired)
+        if len(expired) < batch_size:
+            break
+    if total:
+        logger.info("Expired %d requests created before %s", total, before.isoformat())
+    return total
+
+
+trace_module(__name__, "service")
@@ -1,9 +1,74 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import User, Transaction, ShopItem
+from core.config import get_settings
+from db.events import LedgerEntry, stage_ledger_entries
+from db.models import User, Transaction, ShopItem, ShopReservation
 from core.exceptions import NotFoundError, BadRequestError
+from core.tracing import trace_module
 from repositories.shop_repository import ShopRepository
-from schemas.shop_item import ShopItemCreate
+from schemas.shop_item import ShopItemCreate, ShopItemRead
+from services.job_service import enqueue_job, job_handler
+from services.media_service import render_stored_image, store_image
+from services.user_event_service import ledger_event, publish_user_events
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Most catalog pages kept; clients rarely ask for more than a few
+_CATALOG_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class CatalogPage:
+    version: int
+    etag: str
+    items: list[ShopItemRead]
+    loaded_at: float
+
+
+# Bumped by every catalog write in this process; cached pages from an older
+# version are dropped. Writes from other workers are picked up when entries
+# reach SHOP_CATALOG_CACHE_SECONDS.
+catalog_version = 0
+
+# (offset, limit) -> page
+_catalog_cache: dict[tuple[int, int], CatalogPage] = {}
+
+
+def bump_catalog_version() -> int:
+    global catalog_version
+    catalog_version += 1
+    _catalog_cache.clear()
+    return catalog_version
+
+
+def _catalog_etag(offset: int, limit: int, items: list[ShopItemRead]) -> str:
+    # Content only, never catalog_version: that counter is per process, and
+    # every worker serving the same page must send the same tag.
+    digest = hashlib.sha256(f"{offset}:{limit}".encode())
+    for item in items:
+        digest.update(item.model_dump_json().encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+@job_handler("render_shop_item_image")
+async def _render_shop_item_image(session: AsyncSession, payload: dict) -> None:
+    image = await render_stored_image(session, payload["source"])
+    if image is None:
+        return
+    updated = await ShopRepository(session).set_image_derivatives(
+        payload["item_id"], payload["source"], full=image.full, card=image.card, thumb=image.thumb
+    )
+    if updated:
+        # Before the worker commits; a page cached in between lives out its TTL
+        bump_catalog_version()
 
 
 class ShopService:
@@ -11,13 +76,41 @@ class ShopService:
         self.session = session
         self.repository = ShopRepository(session)
 
-    async def list_items(self) -> list[ShopItem]:
-        return await self.repository.get_all()
+    async def list_items(self, *, offset: int = 0, limit: int = 100) -> CatalogPage:
+        """A catalog page from the in-process cache, loading it on a miss."""
+        key = (offset, limit)
+        cached = _catalog_cache.get(key)
+        if (
+            cached is not None
+            and cached.version == catalog_version
+            and time.monotonic() - cached.loaded_at < settings.SHOP_CATALOG_CACHE_SECONDS
+        ):
+            return cached
+
+        version = catalog_version
+        rows = await self.repository.get_page(offset=offset, limit=limit)
+        items = [ShopItemRead.model_validate(row) for row in rows]
+        page = CatalogPage(version, _catalog_etag(offset, limit, items), items, time.monotonic())
+        # Don't cache a page read while a write in this process bumped the version
+        if version == catalog_version:
+            if len(_catalog_cache) >= _CATALOG_CACHE_SIZE:
+                _catalog_cache.clear()
+            _catalog_cache[key] = page
+        return page
 
     async def create_item(self, item_data: ShopItemCreate) -> ShopItem:
-        item = ShopItem(**item_data.model_dump())
+        if item_data.stock is not None and item_data.stock < 0:
+            raise BadRequestError("Stock cannot be negative")
+        if item_data.per_user_limit is not None and item_data.per_user_limit < 1:
+            raise BadRequestError("Per-student limit must be at least 1")
+        item = ShopItem(**item_data.model_dump(exclude={"image"}))
+        if item_data.image:
+            item.image_hash = await store_image(self.session, item_data.image)
         item = await self.repository.create(item)
+        if item.image_hash:
+            enqueue_job(self.session, "render_shop_item_image", {"item_id": item.id, "source": item.image_hash})
         await self.session.commit()
+        bump_catalog_version()
         return item
 
     async def delete_item(self, item_id: int) -> None:
@@ -27,38 +120,102 @@ class ShopService:
         
         await self.repository.delete(item)
         await self.session.commit()
+        bump_catalog_version()
 
-    async def purchase_item(self, user_id: int, item_id: int) -> Transaction:
-        # 1. Fetch item
+    async def _purchase_failed(self, user_id: int, item_id: int) -> BadRequestError | NotFoundError:
+        """Work out why a purchase or reservation wrote nothing.
+
+        Runs after the rollback, so it reads the current state; only the
+        failure path pays for these queries.
+        """
         item = await self.repository.get_by_id(item_id)
         if not item:
-            raise NotFoundError("Shop item not found")
-
-        # 2. Fetch user (using session directly or user repo if available, trying session for now)
+            return NotFoundError("Shop item not found")
         user = await self.session.get(User, user_id)
         if not user:
-            raise NotFoundError("User not found")
-
-        # 3. Check balance
+            return NotFoundError("User not found")
+        if item.stock is not None and item.stock <= 0:
+            return BadRequestError(f"{item.title} is sold out")
+        if item.per_user_limit is not None:
+            if await self.repository.get_claimed(item_id, user_id) >= item.per_user_limit:
+                return BadRequestError(f"Limit of {item.per_user_limit} per student reached")
         if user.balance < item.price:
-            raise BadRequestError(f"Insufficient funds. Item costs {item.price}, you have {user.balance}")
-
-        # 4. Deduct balance
-        user.balance -= item.price
-        self.session.add(user)
-
-        # 5. Create Transaction
-        transaction = Transaction(
-            user_id=user.id,
-            amount=-item.price,
-            type="shop_purchase",
-            description=f"Purchased: {item.title}",
-            shop_item_id=item.id
+            return BadRequestError(f"Insufficient funds. Item costs {item.price}, you have {user.balance}")
+        return BadRequestError("Purchase could not be completed, please try again")
+
+    async def purchase_item(self, user_id: int, item_id: int) -> Transaction:
+        """Buy one unit: stock, per-user limit and balance are checked and
+        updated, and the ledger row written, in a single statement."""
+        transaction = await self.repository.purchase(item_id, user_id)
+        if transaction is None:
+            await self.session.rollback()
+            raise await self._purchase_failed(user_id, item_id)
+        stage_ledger_entries(
+            self.session,
+            [LedgerEntry(user_id, transaction.amount, transaction.type, transaction.created_at)],
         )
-        self.session.add(transaction)
+        await publish_user_events(self.session, [ledger_event(transaction)])
+        await self.session.commit()
+        return transaction
 
-        # 6. Commit
+    async def reserve_item(self, user_id: int, item_id: int) -> ShopReservation:
+        """Hold one unit for SHOP_RESERVATION_SECONDS without charging.
+
+        The unit counts against stock and the per-user limit until the
+        reservation is confirmed, cancelled or expires.
+        """
+        reservation = await self.repository.reserve(item_id, user_id, settings.SHOP_RESERVATION_SECONDS)
+        if reservation is None:
+            await self.session.rollback()
+            raise await self._purchase_failed(user_id, item_id)
         await self.session.commit()
-        await self.session.refresh(transaction)
+        return reservation
 
+    async def confirm_reservation(self, user_id: int, reservation_id: int) -> Transaction:
+        transaction = await self.repository.confirm_reservation(reservation_id, user_id)
+        if transaction is None:
+            await self.session.rollback()
+            reservation = await self.repository.get_reservation(reservation_id)
+            if reservation is None or reservation.user_id != user_id:
+                raise NotFoundError("Reservation not found")
+            if reservation.expires_at <= datetime.now(timezone.utc):
+                raise BadRequestError("Reservation has expired")
+            raise await self._purchase_failed(user_id, reservation.item_id)
+        stage_ledger_entries(
+            self.session,
+            [LedgerEntry(user_id, transaction.amount, transaction.type, transaction.created_at)],
+        )
+        await publish_user_events(self.session, [ledger_event(transaction)])
+        await self.session.commit()
         return transaction
+
+    async def cancel_reservation(self, user_id: int, reservation_id: int) -> None:
+        if not await self.repository.release_reservation(reservation_id, user_id):
+            await self.session.rollback()
+            raise NotFoundError("Reservation not found")
+        await self.session.commit()
+
+
+async def release_expired_reservations(session: AsyncSession, *, batch_size: int = 1000) -> int:
+    """Return the units of expired reservations to stock.
+
+    Only one worker sweeps at a time; the others skip the run. Commits each
+    batch and returns the number of reservations released.
+    """
+    lock = text("SELECT pg_try_advisory_xact_lock(hashtext('shop_reservations_sweep'))")
+    repository = ShopRepository(session)
+    released = 0
+    while True:
+        if not await session.scalar(lock):
+            break
+        count = await repository.release_expired_reservations(datetime.now(timezone.utc), batch_size=batch_size)
+        await session.commit()
+        released += count
+        if count < batch_size:
+            break
+    if released:
+        logger.info("Released %d expired shop reservations", released)
+    return released
+
+
+trace_module(__name__, "service")
@@ -5,6 +5,8 @@ from sqlalchemy.orm import selectinload
 from db.models import User, Transaction
 from schemas.transaction import TransactionCreate, TransferCreate
 from core.exceptions import NotFoundError, BadRequestError
+from core.tracing import trace_module
+from services.user_event_service import ledger_event, publish_user_events
 
 async def transfer_funds_service(session: AsyncSession, transfer_in: TransferCreate, sender_id: int):
     if transfer_in.recipient_id == sender_id:
@@ -68,7 +70,9 @@ async def transfer_funds_service(session: AsyncSession, transfer_in: TransferCre
         recipient_id=sender_id
     )
     session.add(credit_tx)
-    
+    await session.flush()
+
+    await publish_user_events(session, [ledger_event(debit_tx), ledger_event(credit_tx)])
     await session.commit()
     
     # Re-fetch transaction with relationships
@@ -82,3 +86,6 @@ async def transfer_funds_service(session: AsyncSession, transfer_in: TransferCre
     )
     result = await session.execute(stmt)
     return result.scalars().first()
+
+
+trace_module(__name__, "service")
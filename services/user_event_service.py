@@ -0,0 +1,202 @@
+"""Live balance and ledger updates for ``GET /users/me/stream``.
+
+Writers call ``publish_user_events`` with the session of their business
+write. It issues ``pg_notify`` in that transaction, so Postgres delivers the
+notifications only once the write commits, and to every process. Each
+process keeps a single LISTEN connection (``run_event_listener``) and fans
+notifications out to the streams open for that user through bounded queues;
+streams hold no pool connection while they wait.
+
+Delivery is best effort. A stream whose client falls behind, or that was
+open while the listener reconnected, gets a ``resync`` event and should
+refetch ``/users/me`` rather than trust that it saw every change.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import get_settings
+from core.tracing import trace_module
+from db.session import engine
+from repositories import user_event_repository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHANNEL = "user_events"
+
+# Milliseconds an EventSource waits before reconnecting a dropped stream
+_RETRY_MS = 3000
+_RESYNC = "event: resync\ndata: {}\n\n"
+_KEEPALIVE = ": keep-alive\n\n"
+
+
+@dataclass(frozen=True)
+class UserEvent:
+    user_id: int
+    # SSE event name: "transaction" or "request"
+    event: str
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+def ledger_event(transaction: Any) -> UserEvent:
+    """Event for a ledger row: a ``Transaction`` or a row with its columns."""
+    return UserEvent(
+        transaction.user_id,
+        "transaction",
+        {"id": transaction.id, "amount": transaction.amount, "type": transaction.type},
+    )
+
+
+def request_event(user_id: int, request: Any) -> UserEvent:
+    """Event telling ``user_id`` (sender or recipient) that ``request`` changed."""
+    return UserEvent(
+        user_id,
+        "request",
+        {"id": request.id, "amount": request.amount, "status": request.status, "sender_id": request.sender_id},
+    )
+
+
+async def publish_user_events(session: AsyncSession, events: list[UserEvent]) -> None:
+    """Notify the users' open streams once the caller commits ``session``.
+
+    Flushes pending ORM changes first so the balances sent are current.
+    """
+    if not events:
+        return
+    await session.flush()
+    await user_event_repository.notify_user_events(
+        session,
+        CHANNEL,
+        ((e.user_id, e.event, json.dumps(e.data, default=str)) for e in events),
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class UserEventBroker:
+    """Routes notifications to the streams open in this process."""
+
+    def __init__(self) -> None:
+        self._queues: dict[int, set[asyncio.Queue[str]]] = {}
+
+    @property
+    def stream_count(self) -> int:
+        return sum(len(queues) for queues in self._queues.values())
+
+    def subscribe(self, user_id: int) -> asyncio.Queue[str]:
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.STREAM_QUEUE_SIZE)
+        self._queues.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue[str]) -> None:
+        queues = self._queues.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[user_id]
+
+    def dispatch(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        """asyncpg notification callback."""
+        try:
+            event = json.loads(payload)
+            queues = self._queues.get(event["user_id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed %s notification: %.200s", channel, payload)
+            return
+        if queues:
+            message = _sse(event["event"], payload)
+            for queue in queues:
+                self._put(queue, message)
+
+    def resync_all(self) -> None:
+        for queues in self._queues.values():
+            for queue in queues:
+                self._put(queue, _RESYNC)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue[str], message: str) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client isn't keeping up: drop its backlog and have it refetch
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_RESYNC)
+
+
+event_broker = UserEventBroker()
+
+
+async def run_event_listener() -> None:
+    """LISTEN on ``CHANNEL`` until cancelled, reconnecting with backoff.
+
+    Uses its own asyncpg connection rather than one from the pool: a LISTEN
+    connection is held for the life of the process.
+    """
+    _, connect_args = engine.dialect.create_connect_args(engine.url)
+    delay = 1.0
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(**connect_args)
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(CHANNEL, event_broker.dispatch)
+            # Anything sent while we were not listening is gone
+            event_broker.resync_all()
+            delay = 1.0
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # A half-open socket only shows up when we use it
+                    await asyncio.wait_for(connection.execute("SELECT 1"), settings.STREAM_HEARTBEAT_SECONDS)
+            logger.warning("User event listener connection lost")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("User event listener failed")
+        finally:
+            if connection is not None and not connection.is_closed():
+                connection.terminate()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30.0)
+
+
+async def stream_user_events(session: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    """Server-sent events for ``user_id``.
+
+    Opens with a ``ready`` event carrying the current balances, read after
+    subscribing so no change can fall between the two, then closes
+    ``session`` so the stream holds no pool connection. Sends a comment every
+    ``STREAM_HEARTBEAT_SECONDS`` to keep proxies from timing it out.
+    """
+    queue = event_broker.subscribe(user_id)
+    try:
+        try:
+            balances = await user_event_repository.get_balances(session, user_id)
+        finally:
+            await session.close()
+        balance, gift_balance = balances or (0, 0)
+        ready = {"user_id": user_id, "event": "ready", "balance": balance, "gift_balance": gift_balance, "data": {}}
+        yield f"retry: {_RETRY_MS}\n" + _sse("ready", json.dumps(ready))
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield _KEEPALIVE
+    finally:
+        event_broker.unsubscribe(user_id, queue)
+
+
+trace_module(__name__, "service")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import trace_module
+from db.events import LedgerEntry, UserProfile, stage_ledger_entries, stage_user_profiles
+from repositories.user_import_repository import (
+    copy_import_rows,
+    count_unmatched_import_rows,
+    create_import_staging,
+    merge_import_staging,
+)
+from utils.clerk_export import ClerkExportUser
+
+logger = logging.getLogger(__name__)
+
+# Extra merges for users whose generated username clashed
+_MERGE_RETRIES = 3
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    skipped: int = 0
+    inserted: int = 0
+    updated: int = 0
+    linked: int = 0
+    unmatched: int = 0
+
+
+async def import_clerk_users(
+    session: AsyncSession, users: Iterable[ClerkExportUser | None]
+) -> ImportResult:
+    """Create or refresh users from a Clerk export in one transaction.
+
+    Rows are streamed into a staging table with COPY and applied with a single
+    merge (see ``user_import_repository``). New users get the same welcome
+    bonus ``create_user_service`` gives. Entries without an id or email are
+    skipped; an export listing a user twice keeps the last entry. Safe to
+    re-run with the same export.
+    """
+    result = ImportResult()
+
+    def counted() -> Iterator[ClerkExportUser]:
+        for user in users:
+            result.read += 1
+            if user is None:
+                result.skipped += 1
+                continue
+            yield user
+
+    await create_import_staging(session)
+    await copy_import_rows(session, counted())
+
+    for _ in range(1 + _MERGE_RETRIES):
+        rows = await merge_import_staging(session)
+        profiles, ledger = [], []
+        for row in rows:
+            if row.outcome == "inserted":
+                result.inserted += 1
+            elif row.outcome == "updated":
+                result.updated += 1
+            else:
+                result.linked += 1
+            profiles.append(UserProfile(id=row.id, username=row.username, full_name=row.full_name))
+            if row.amount is not None:
+                ledger.append(LedgerEntry(row.id, row.amount, row.type, row.created_at))
+        stage_user_profiles(session, profiles)
+        stage_ledger_entries(session, ledger)
+        result.unmatched = await count_unmatched_import_rows(session)
+        if not result.unmatched:
+            break
+
+    await session.commit()
+    if result.unmatched:
+        logger.warning("Clerk import left %d users without an account", result.unmatched)
+    logger.info(
+        "Clerk import: %d read, %d inserted, %d updated, %d linked, %d skipped",
+        result.read, result.inserted, result.updated, result.linked, result.skipped,
+    )
+    return result
+
+
+trace_module(__name__, "service")
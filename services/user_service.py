@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.exceptions import AlreadyExistsError, NotFoundError
+from core.tracing import trace_module
 from repositories import (
-    create_transaction,
     create_user,
+    get_daily_net_for_user,
+    get_net_before,
+    get_type_totals_for_user,
     get_user_by_email,
     get_user_by_id,
     list_users,
-    update_user,
-    get_users_with_cumulative_earnings,
 )
+from repositories.transaction_repository import add_transaction
 from schemas import UserCreate
-from schemas.transaction import TransactionCreate
+from schemas.transaction import BalancePoint, LedgerSummary, TransactionCreate, TypeTotal
+from services.leaderboard_service import (
+    LeaderboardWindow,
+    ensure_leaderboard,
+    get_windowed_leaderboard,
+)
+from services.user_event_service import ledger_event, publish_user_events
 
 
 async def create_user_service(session: AsyncSession, user_in: UserCreate):
@@ -24,14 +34,16 @@ async def create_user_service(session: AsyncSession, user_in: UserCreate):
     # Create user
     user = await create_user(session, user_in)
     
-    # Record initial balance transaction
+    # Record initial balance transaction, committed with the user
     if user.balance > 0:
-        await create_transaction(session, TransactionCreate(
+        transaction = await add_transaction(session, TransactionCreate(
             user_id=user.id,
             amount=user.balance,
             type="credit",
             description="Welcome Bonus"
         ))
+        await publish_user_events(session, [ledger_event(transaction)])
+    await session.commit()
     
     return user
 
@@ -58,25 +70,83 @@ async def update_user_balance_service(
 ):
     user = await get_user_service(session, user_id)
     user.balance += amount
-    await update_user(session, user)
     
     # Create transaction record
     tx_type = "credit" if amount > 0 else "debit"
     if description is None:
         description = "Admin adjustment"
         
-    await create_transaction(session, TransactionCreate(
+    transaction = await add_transaction(session, TransactionCreate(
         user_id=user_id,
         amount=amount,
         type=tx_type,
         description=description,
         admin_id=admin_id
     ))
+    await publish_user_events(session, [ledger_event(transaction)])
+    await session.commit()
     
     return user
 
 
 async def get_leaderboard_service(
-    session: AsyncSession, *, offset: int = 0, limit: int = 100
+    session: AsyncSession,
+    *,
+    window: LeaderboardWindow = "all",
+    offset: int = 0,
+    limit: int = 100,
 ):
-    return await get_users_with_cumulative_earnings(session, offset=offset, limit=limit)
+    return await get_windowed_leaderboard(session, window, offset=offset, limit=limit)
+
+
+async def get_user_rank_service(session: AsyncSession, user_id: int) -> dict:
+    leaderboard = await ensure_leaderboard(session)
+    rank = leaderboard.rank(user_id)
+    if rank is None:
+        raise NotFoundError("User not ranked")
+    return {
+        "id": user_id,
+        "rank": rank,
+        "cumulative_earned": leaderboard.earned(user_id),
+        "total_users": len(leaderboard),
+    }
+
+
+async def get_user_summary_service(
+    session: AsyncSession, user_id: int, *, days: int = 90
+) -> LedgerSummary:
+    """Daily running ledger balance and per-type totals over the last ``days`` UTC days.
+
+    Served entirely from the daily rollups, so the cost depends on the number
+    of days covered, not on how many transactions the user has.
+    """
+    end = datetime.now(timezone.utc).date()
+    start = end - timedelta(days=days - 1)
+
+    opening = await get_net_before(session, user_id, start)
+    net_by_day = {row.day: int(row.net) for row in await get_daily_net_for_user(session, user_id, start)}
+    type_rows = await get_type_totals_for_user(session, user_id, start)
+
+    history = []
+    balance = opening
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        net = net_by_day.get(day, 0)
+        balance += net
+        history.append(BalancePoint(day=day, net=net, balance=balance))
+
+    return LedgerSummary(
+        user_id=user_id,
+        start=start,
+        end=end,
+        opening_balance=opening,
+        closing_balance=balance,
+        balance_history=history,
+        totals_by_type=[
+            TypeTotal(type=row.type, credited=int(row.credited), debited=int(row.debited), count=int(row.count))
+            for row in type_rows
+        ],
+    )
+
+
+trace_module(__name__, "service")
@@ -0,0 +1,241 @@
+"""Durable inbox for Clerk webhooks.
+
+The webhook endpoint only verifies the signature and stores the delivery in
+``webhook_inbox``; retries with a ``svix-id`` already stored are dropped there.
+A background worker drains the inbox in batches: events are grouped by Clerk
+user, collapsed to that user's final state, and applied with a handful of
+set-based statements per batch instead of a round trip per event.
+
+If a batch fails to apply (say, an email change that collides with another
+account), each user in it is retried on its own so one bad event does not
+hold up the rest. Failing events are retried on later runs up to
+``WEBHOOK_INBOX_MAX_ATTEMPTS`` times and then left in the inbox with their
+``last_error`` for inspection.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import get_settings
+from core.tracing import trace_module
+from db.events import LedgerEntry, UserProfile, stage_ledger_entries, stage_user_profiles
+from db.models import WebhookInboxEvent
+from repositories import user_repository, webhook_repository
+from utils.clerk_export import clerk_full_name, extract_primary_email
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLERK_USER_EVENTS = ("user.created", "user.updated", "user.deleted")
+
+# Retry username allocation this many times for users whose generated
+# username collided with one created concurrently
+_USERNAME_RETRIES = 3
+
+
+@dataclass
+class ClerkUserState:
+    """Where a batch of events leaves one Clerk user."""
+
+    clerk_user_id: str
+    email: str | None = None
+    full_name: str = ""
+    created: bool = False
+    updated: bool = False
+    deleted: bool = False
+    event_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class _Applied:
+    profiles: list[UserProfile] = field(default_factory=list)
+    ledger: list[LedgerEntry] = field(default_factory=list)
+
+
+def coalesce_clerk_events(events: Iterable[WebhookInboxEvent]) -> tuple[dict[str, ClerkUserState], list[int]]:
+    """Collapse events into one final state per Clerk user.
+
+    Events are replayed in Clerk's own ``timestamp`` order (receipt order
+    breaks ties), since deliveries can arrive out of order. Returns the states
+    and the ids of events that carry nothing to apply.
+    """
+    states: dict[str, ClerkUserState] = {}
+    ignored: list[int] = []
+    ordered = sorted(events, key=lambda e: (e.payload.get("timestamp") or 0, e.id))
+    for event in ordered:
+        data = event.payload.get("data") or {}
+        clerk_user_id = data.get("id")
+        if event.event_type not in CLERK_USER_EVENTS or not clerk_user_id:
+            ignored.append(event.id)
+            continue
+        state = states.setdefault(clerk_user_id, ClerkUserState(clerk_user_id))
+        state.event_ids.append(event.id)
+        if event.event_type == "user.deleted":
+            state.deleted = True
+            continue
+        state.deleted = False
+        state.email = extract_primary_email(data) or state.email
+        state.full_name = clerk_full_name(data) or state.full_name
+        if event.event_type == "user.created":
+            state.created = True
+        else:
+            state.updated = True
+    return states, ignored
+
+
+async def _insert_new_users(session: AsyncSession, states: list[ClerkUserState], applied: _Applied) -> None:
+    pending = [s for s in states if s.email]
+    for _ in range(_USERNAME_RETRIES):
+        if not pending:
+            return
+        full_names = [s.full_name or s.email.split("@")[0] for s in pending]
+        usernames = await user_repository.allocate_usernames(session, full_names)
+        rows = await user_repository.insert_users(
+            session,
+            [
+                {"clerk_user_id": s.clerk_user_id, "email": s.email, "full_name": name, "username": username}
+                for s, name, username in zip(pending, full_names, usernames)
+            ],
+        )
+        for row in rows:
+            applied.profiles.append(UserProfile(id=row.id, username=row.username, full_name=row.full_name))
+            if row.amount is not None:
+                applied.ledger.append(LedgerEntry(row.id, row.amount, row.type, row.created_at))
+
+        # Rows skipped by a conflict on an existing account are done; only a
+        # username taken in the meantime is worth another try.
+        inserted = {row.clerk_user_id for row in rows}
+        skipped = [s for s in pending if s.clerk_user_id not in inserted]
+        if not skipped:
+            return
+        clerk_ids, emails = await user_repository.get_existing_clerk_identities(
+            session, [s.clerk_user_id for s in skipped], [s.email for s in skipped]
+        )
+        pending = [s for s in skipped if s.clerk_user_id not in clerk_ids and s.email not in emails]
+    if pending:
+        raise RuntimeError(f"Could not allocate usernames for {len(pending)} users")
+
+
+async def _apply_states(session: AsyncSession, states: list[ClerkUserState]) -> _Applied:
+    applied = _Applied()
+    live = [s for s in states if not s.deleted]
+    created = [s for s in live if s.created and s.email]
+    updated = [s for s in live if s.updated]
+
+    # Link accounts that predate clerk_user_id tracking before inserting, so
+    # they are matched instead of colliding on email.
+    await user_repository.link_clerk_ids_by_email(
+        session, [{"clerk_user_id": s.clerk_user_id, "email": s.email} for s in created]
+    )
+    await _insert_new_users(session, created, applied)
+    # Updates for users we have never seen are dropped; they are created on
+    # first login.
+    rows = await user_repository.update_users_by_clerk_id(
+        session,
+        [{"clerk_user_id": s.clerk_user_id, "email": s.email, "full_name": s.full_name} for s in updated],
+    )
+    applied.profiles.extend(UserProfile(id=r.id, username=r.username, full_name=r.full_name) for r in rows)
+    await user_repository.deactivate_users_by_clerk_id(
+        session, [s.clerk_user_id for s in states if s.deleted]
+    )
+    return applied
+
+
+async def receive_clerk_webhook(session: AsyncSession, svix_id: str, payload: dict[str, Any]) -> bool:
+    """Store a verified Clerk delivery. Returns ``False`` for a repeated ``svix-id``."""
+    stored = await webhook_repository.enqueue_webhook_event(
+        session,
+        source="clerk",
+        svix_id=svix_id,
+        event_type=str(payload.get("type") or ""),
+        payload=payload,
+    )
+    await session.commit()
+    return stored
+
+
+async def process_webhook_inbox(session: AsyncSession, *, batch_size: int | None = None) -> int:
+    """Apply one batch of inbox events and commit.
+
+    Returns the number of events claimed, or 0 if the inbox is empty or
+    another worker is draining it.
+    """
+    batch_size = batch_size or settings.WEBHOOK_INBOX_BATCH_SIZE
+    if not await webhook_repository.try_lock_webhook_inbox(session):
+        await session.rollback()
+        return 0
+    events = await webhook_repository.claim_webhook_events(
+        session, batch_size=batch_size, max_attempts=settings.WEBHOOK_INBOX_MAX_ATTEMPTS
+    )
+    if not events:
+        await session.rollback()
+        return 0
+
+    states, done = coalesce_clerk_events(events)
+    applied = _Applied()
+    failed: list[tuple[ClerkUserState, str]] = []
+    try:
+        async with session.begin_nested():
+            applied = await _apply_states(session, list(states.values()))
+        done.extend(i for s in states.values() for i in s.event_ids)
+    except Exception:
+        logger.warning("Webhook batch of %d events failed; applying users one by one", len(events))
+        for state in states.values():
+            try:
+                async with session.begin_nested():
+                    one = await _apply_states(session, [state])
+            except Exception as e:
+                failed.append((state, f"{type(e).__name__}: {e}"[:1000]))
+                continue
+            applied.profiles.extend(one.profiles)
+            applied.ledger.extend(one.ledger)
+            done.extend(state.event_ids)
+
+    await webhook_repository.mark_webhook_events_processed(session, done)
+    for state, error in failed:
+        logger.error("Failed to apply webhook events for %s: %s", state.clerk_user_id, error)
+        await webhook_repository.record_webhook_event_failure(session, state.event_ids, error)
+    stage_user_profiles(session, applied.profiles)
+    stage_ledger_entries(session, applied.ledger)
+    await session.commit()
+    if len(events) > 1:
+        logger.info(
+            "Applied %d webhook events for %d users (%d failed)", len(events), len(states), len(failed)
+        )
+    return len(events)
+
+
+async def drain_webhook_inbox(session: AsyncSession, *, batch_size: int | None = None) -> int:
+    """Apply batches until the inbox has no more work. Returns events claimed."""
+    batch_size = batch_size or settings.WEBHOOK_INBOX_BATCH_SIZE
+    total = 0
+    while True:
+        claimed = await process_webhook_inbox(session, batch_size=batch_size)
+        total += claimed
+        if claimed < batch_size:
+            return total
+
+
+async def purge_webhook_inbox(session: AsyncSession, *, older_than_days: int, batch_size: int = 1000) -> int:
+    """Delete processed events once Svix can no longer redeliver them."""
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        deleted = await webhook_repository.delete_processed_webhook_events(
+            session, before, batch_size=batch_size
+        )
+        await session.commit()
+        total += deleted
+        if deleted < batch_size:
+            break
+    if total:
+        logger.info("Purged %d processed webhook events", total)
+    return total
+
+
+trace_module(__name__, "service")
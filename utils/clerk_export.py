@@ -0,0 +1,121 @@
+"""Reading Clerk user objects and user exports.
+
+Clerk user objects (webhook ``data``, Backend API ``/users`` responses) carry
+their emails as a list plus a ``primary_email_address_id``. The dashboard's
+CSV export flattens that to a ``primary_email_address`` column. Both are
+turned into ``ClerkExportUser`` rows here.
+
+Exports are read as a stream so a large cohort never has to fit in memory.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import re
+from dataclasses import dataclass
+from typing import IO, Any, Iterator, Literal
+
+ExportFormat = Literal["json", "csv"]
+
+_CHUNK_SIZE = 1 << 16
+_EMAIL_SPLIT_RE = re.compile(r"[\s,;|]+")
+_SEPARATORS_RE = re.compile(r"[\s,\[\]]*")
+
+
+@dataclass(frozen=True)
+class ClerkExportUser:
+    clerk_user_id: str
+    email: str
+    # Empty when Clerk has no name for the user
+    full_name: str
+
+
+def extract_primary_email(data: dict) -> str | None:
+    """Extract the primary email address from Clerk user data."""
+    email_addresses = data.get("email_addresses", [])
+    primary_email_id = data.get("primary_email_address_id")
+
+    # Try to find the primary email
+    for email_obj in email_addresses:
+        if email_obj.get("id") == primary_email_id:
+            return email_obj.get("email_address")
+
+    # Fallback to first verified email
+    for email_obj in email_addresses:
+        if email_obj.get("verification", {}).get("status") == "verified":
+            return email_obj.get("email_address")
+
+    # Fallback to first email
+    if email_addresses:
+        return email_addresses[0].get("email_address")
+
+    return None
+
+
+def clerk_full_name(data: dict) -> str:
+    first_name = data.get("first_name") or ""
+    last_name = data.get("last_name") or ""
+    return f"{first_name} {last_name}".strip()
+
+
+def _from_user_object(data: dict[str, Any]) -> ClerkExportUser | None:
+    clerk_user_id = data.get("id")
+    email = extract_primary_email(data)
+    if not clerk_user_id or not email:
+        return None
+    return ClerkExportUser(clerk_user_id, email, clerk_full_name(data))
+
+
+def _from_csv_row(row: dict[str, str]) -> ClerkExportUser | None:
+    clerk_user_id = (row.get("id") or "").strip()
+    email = (row.get("primary_email_address") or row.get("email_address") or row.get("email") or "").strip()
+    if not email:
+        verified = _EMAIL_SPLIT_RE.split((row.get("verified_email_addresses") or "").strip())
+        email = next((e for e in verified if e), "")
+    if not clerk_user_id or not email:
+        return None
+    return ClerkExportUser(clerk_user_id, email, clerk_full_name(row))
+
+
+def _iter_json_objects(f: IO[str]) -> Iterator[dict[str, Any]]:
+    """Objects from a top-level JSON array or from JSON Lines, read in chunks."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    while True:
+        # Skip what sits between objects: array brackets, commas, whitespace
+        pos = _SEPARATORS_RE.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if not isinstance(obj, dict):
+                    raise ValueError("Expected a JSON array of Clerk user objects")
+                yield obj
+                continue
+        elif eof:
+            return
+        # The next object is incomplete: read more
+        chunk = f.read(_CHUNK_SIZE)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def detect_format(path: str) -> ExportFormat:
+    return "csv" if path.lower().endswith(".csv") else "json"
+
+
+def iter_clerk_export(f: IO[str], fmt: ExportFormat) -> Iterator[ClerkExportUser | None]:
+    """Users in a Clerk export, in file order.
+
+    Yields ``None`` for entries without an id or email so callers can count
+    what was skipped.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(f):
+            yield _from_csv_row(row)
+    else:
+        for obj in _iter_json_objects(f):
+            yield _from_user_object(obj)
@@ -0,0 +1,91 @@
+"""Conditional GET: ETags built from cheap version markers.
+
+A route builds its tag from something it already has, or can read with a
+primary-key lookup, *before* running its query: the fields of the
+authenticated user, a per-user version column, a catalog version. When
+``If-None-Match`` matches, ``not_modified`` returns the 304 and the route
+never queries or serializes. Outcomes are counted per route for
+``GET /admin/etags``.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Response, status
+
+from core.metrics import Counter
+
+_CACHE_CONTROL = "private, no-cache"
+
+CONDITIONAL_REQUESTS = Counter(
+    "http_conditional_requests_total",
+    "ETag-enabled GETs by route and result (hit: answered 304, miss: full response).",
+    ("route", "result"),
+)
+
+
+@dataclass
+class ConditionalStats:
+    requests: int = 0
+    not_modified: int = 0
+
+
+# route -> counts, for this process
+conditional_stats: dict[str, ConditionalStats] = defaultdict(ConditionalStats)
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over ``parts`` (version markers and the query parameters
+    that shape the response). Stable across processes."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """``If-None-Match`` comparison (weak, as RFC 9110 specifies for it)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+
+
+def not_modified(route: str, etag: str, if_none_match: str | None) -> Response | None:
+    """The 304 for a client that already has ``etag``, else ``None``."""
+    stats = conditional_stats[route]
+    stats.requests += 1
+    if not etag_matches(if_none_match, etag):
+        CONDITIONAL_REQUESTS.labels(route, "miss").inc()
+        return None
+    stats.not_modified += 1
+    CONDITIONAL_REQUESTS.labels(route, "hit").inc()
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+
+
+def with_etag(result: Any, response: Response, etag: str) -> Any:
+    """Attach ``etag`` to a route's result, whether it is a ready ``Response``
+    (trusted serialization) or a value FastAPI will serialize into ``response``."""
+    target = result if isinstance(result, Response) else response
+    target.headers.update(etag_headers(etag))
+    return result
+
+
+def get_conditional_stats() -> list[dict[str, Any]]:
+    return [
+        {
+            "route": route,
+            "requests": stats.requests,
+            "not_modified": stats.not_modified,
+            "hit_rate": round(stats.not_modified / stats.requests, 4) if stats.requests else 0.0,
+        }
+        for route, stats in sorted(conditional_stats.items())
+    ]
@@ -0,0 +1,69 @@
+"""Image derivative rendering.
+
+Runs inside worker processes (see ``services.media_service``), so it only
+depends on Pillow and must stay picklable: plain bytes in, plain bytes out.
+"""
+from __future__ import annotations
+
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest edge, in pixels, of each derivative. Images are never upscaled.
+DERIVATIVE_SIZES = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1600,
+}
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_CONTENT_TYPE = "image/webp"
+
+# Refuse to decode anything larger; a small compressed upload can still
+# expand to gigabytes of pixels
+MAX_PIXELS = 40_000_000
+
+
+def probe_image(data: bytes) -> None:
+    """Check that ``data`` starts like an image Pillow can read, within
+    ``MAX_PIXELS``, without decoding any pixels.
+
+    Cheap enough for the request path. Raises ``ValueError`` otherwise.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError("Could not decode image") from e
+    if width * height > MAX_PIXELS:
+        raise ValueError(f"Image is larger than {MAX_PIXELS} pixels")
+
+
+def render_derivatives(data: bytes, quality: int = 80) -> dict[str, bytes]:
+    """Decode ``data`` once and return WebP bytes for every derivative size.
+
+    Raises ``ValueError`` if the bytes are not an image Pillow can read.
+    """
+    try:
+        source = Image.open(BytesIO(data))
+        if source.width * source.height > MAX_PIXELS:
+            raise ValueError(f"Image is larger than {MAX_PIXELS} pixels")
+        source = ImageOps.exif_transpose(source)
+        source.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError("Could not decode image") from e
+
+    if source.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in source.getbands() or "transparency" in source.info
+        source = source.convert("RGBA" if has_alpha else "RGB")
+
+    rendered = {}
+    # Largest first, each derived from the previous one to keep resampling cheap
+    image = source
+    for name, edge in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        if max(image.size) > edge:
+            image = image.copy()
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        out = BytesIO()
+        image.save(out, DERIVATIVE_FORMAT, quality=quality, method=4)
+        rendered[name] = out.getvalue()
+    return rendered
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+
+from core.config import get_settings
+
+settings = get_settings()
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_content_type(data: bytes) -> str:
+    for magic, content_type in _MAGIC:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def decode_image(value: str) -> tuple[bytes, str]:
+    """Decode a base64 image, with or without a ``data:<type>;base64,`` prefix.
+
+    Returns the raw bytes and their sniffed content type; any type declared in
+    the data URL is ignored. Raises ``ValueError`` if the value is not valid
+    base64.
+    """
+    if value.startswith("data:"):
+        value = value.partition(",")[2]
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Image is not valid base64") from e
+    if not data:
+        raise ValueError("Image is empty")
+    return data, sniff_content_type(data)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def media_url(digest: str | None) -> str | None:
+    if not digest:
+        return None
+    return f"{settings.API_V1_PREFIX}/media/{digest}"
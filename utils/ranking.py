@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RankedUser:
+    id: int
+    username: str
+    full_name: str | None
+    cumulative_earned: int
+
+
+class RankIndex:
+    """Sorted, array-backed ranking of users by cumulative earnings.
+
+    Keys are ``(-earned, user_id)`` tuples kept in a plain sorted list, so a
+    rank lookup is a bisect (O(log n)) and a page is a slice (O(k)). Updates
+    move one key, which is a bisect plus a memmove of the list tail.
+    Ties are ordered by user id, matching the database query.
+
+    Every update bumps ``generation`` and records it against the user, so
+    ``reconcile`` can tell which entries changed after a snapshot was read.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[tuple[int, int]] = []
+        self._earned: dict[int, int] = {}
+        self._profiles: dict[int, tuple[str, str | None]] = {}
+        # user id -> generation of its last update
+        self._updated: dict[int, int] = {}
+        self.generation = 0
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: list[RankedUser]) -> None:
+        """Replace the whole index with a fresh snapshot."""
+        self._earned = {row.id: row.cumulative_earned for row in rows}
+        self._profiles = {row.id: (row.username, row.full_name) for row in rows}
+        self._keys = sorted((-earned, user_id) for user_id, earned in self._earned.items())
+        self._updated = {}
+        self.generation += 1
+        self.ready = True
+
+    def reconcile(self, rows: list[RankedUser], since: int) -> int:
+        """Bring the index in line with ``rows``, a snapshot read after
+        ``generation`` was ``since``.
+
+        Users updated after that are left alone, since their update may be
+        newer than the snapshot. Returns the number of users corrected.
+        """
+        corrected = 0
+        seen = set()
+        for row in rows:
+            seen.add(row.id)
+            if self._updated.get(row.id, 0) > since:
+                continue
+            self._profiles[row.id] = (row.username, row.full_name)
+            if self._earned.get(row.id) != row.cumulative_earned:
+                self.set_earned(row.id, row.cumulative_earned)
+                corrected += 1
+        for user_id in [u for u in self._earned if u not in seen and self._updated.get(u, 0) <= since]:
+            self.remove(user_id)
+            corrected += 1
+        return corrected
+
+    def _touch(self, user_id: int) -> None:
+        self.generation += 1
+        self._updated[user_id] = self.generation
+
+    def set_profile(self, user_id: int, username: str, full_name: str | None) -> None:
+        self._touch(user_id)
+        self._profiles[user_id] = (username, full_name)
+        if user_id not in self._earned:
+            self.set_earned(user_id, 0)
+
+    def set_earned(self, user_id: int, earned: int) -> None:
+        self._touch(user_id)
+        old = self._earned.get(user_id)
+        if old == earned:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._earned[user_id] = earned
+        insort(self._keys, (-earned, user_id))
+
+    def remove(self, user_id: int) -> None:
+        old = self._earned.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._profiles.pop(user_id, None)
+        self._touch(user_id)
+
+    def add_earned(self, user_id: int, amount: int) -> None:
+        self.set_earned(user_id, self._earned.get(user_id, 0) + amount)
+
+    def earned(self, user_id: int) -> int | None:
+        return self._earned.get(user_id)
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based competition rank: users with equal earnings share a rank."""
+        earned = self._earned.get(user_id)
+        if earned is None:
+            return None
+        return bisect_left(self._keys, (-earned,)) + 1
+
+    def page(self, offset: int = 0, limit: int = 100) -> list[RankedUser]:
+        entries = []
+        for neg_earned, user_id in self._keys[offset:offset + limit]:
+            username, full_name = self._profiles.get(user_id, ("", None))
+            entries.append(RankedUser(user_id, username, full_name, -neg_earned))
+        return entries